@@ -0,0 +1,64 @@
+# coding: utf-8
+"""
+Throughput of chord symbol parsing over a corpus of chord books (U-FRET json):
+the previous `ufret2pyguitar` (``re.sub`` and ``split`` per occurrence) against
+`parse_chord` (compiled grammar, interned `Chord` objects.)
+
+$ python benchmarks/bench_chords.py --repeat 200
+$ python benchmarks/bench_chords.py path/to/songs/*.json
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from guitar.utils.fmt_utils import UFRET2PyGuitar_dict
+from guitar.utils.chord_utils import parse_chord, _parse_chord
+
+def legacy_ufret2pyguitar(chord, sep="_"):
+    if chord == "":
+        return ("", "", [])
+    n, *d = chord.split("/")
+    note, mode_ufret = re.sub(r"([A-G]#?♭?)(.*)", rf"\1{sep}\2", n).split(sep)
+    mode_pyguitar = UFRET2PyGuitar_dict.get(mode_ufret)
+    return (note, mode_pyguitar, d)
+
+def load_symbols(paths):
+    symbols = []
+    for path in paths:
+        with open(path, mode="r") as f:
+            for row in json.load(f).values():
+                symbols.extend(row.get("chord"))
+    return symbols
+
+def timeit(func, symbols):
+    t = time.perf_counter()
+    for symbol in symbols:
+        func(symbol)
+    return time.perf_counter() - t
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths",    type=str, nargs="*", help="Chord books (json). Defaults to examples/*.json")
+    parser.add_argument("--repeat", type=int, default=100, help="Parse the corpus this many times.")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(glob.glob(os.path.join(REPO_DIR, "examples", "*.json")))
+    symbols = load_symbols(paths) * args.repeat
+    print(f"{len(paths)} songs, {len(symbols)} chords ({len(set(symbols))} distinct symbols)")
+
+    _parse_chord.cache_clear()
+    t_legacy = timeit(legacy_ufret2pyguitar, symbols)
+    t_parse  = timeit(parse_chord, symbols)
+    for name,t in [("ufret2pyguitar (legacy)", t_legacy), ("parse_chord", t_parse)]:
+        print(f"{name:<24}: {t:.3f}[s] {len(symbols)/t/1e6:6.2f}[M chords/s]")
+    print(f"speedup: x{t_legacy/t_parse:.1f} {_parse_chord.cache_info()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
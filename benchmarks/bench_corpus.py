@@ -0,0 +1,80 @@
+# coding: utf-8
+"""
+Loading a catalog of chord books: pretty-printed json files (as saved by
+``program/ufret.py``) against one binary corpus (`save_corpus` / `Corpus`.)
+The catalog is the example song repeated with different lyrics.
+
+$ python benchmarks/bench_corpus.py --songs 2000
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from guitar.utils.song_utils import Song, Corpus, save_corpus
+
+def synthetic_catalog(num_songs):
+    path = sorted(glob.glob(os.path.join(REPO_DIR, "examples", "*.json")))[0]
+    with open(path, mode="r") as f:
+        data = json.load(f)
+    for n in range(num_songs):
+        yield {
+            key: {"chord": row["chord"], "lyric": [f"歌詞{n}-{key}-{j}" for j in range(len(row["lyric"]))]}
+            for key,row in data.items()
+        }
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for n,data in enumerate(synthetic_catalog(args.songs)):
+            paths.append(os.path.join(tmpdir, f"{n:06d}.json"))
+            with open(paths[-1], mode="w") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        corpus_path = os.path.join(tmpdir, "corpus.pgc")
+
+        t = time.perf_counter()
+        songs = []
+        for path in paths:
+            with open(path, mode="r") as f:
+                songs.append(json.load(f))
+        num_chords = sum(len(row["chord"]) for data in songs for row in data.values())
+        t_json = time.perf_counter() - t
+
+        t = time.perf_counter()
+        save_corpus(corpus_path, (Song.from_dict(data) for data in songs))
+        t_save = time.perf_counter() - t
+
+        t = time.perf_counter()
+        corpus = Corpus(corpus_path)
+        t_open = time.perf_counter() - t
+        t = time.perf_counter()
+        counts = np.bincount(corpus.chord_ids, minlength=len(corpus.symbols))
+        t_count = time.perf_counter() - t
+        t = time.perf_counter()
+        restored = [song.to_dict() for song in corpus]
+        t_dicts = time.perf_counter() - t
+
+        json_size = sum(os.path.getsize(path) for path in paths)
+        print(f"{args.songs} songs, {num_chords} chords")
+        print(f"json   : {json_size/2**20:7.1f}[MB] load all          {t_json:.3f}[s]")
+        print(f"corpus : {os.path.getsize(corpus_path)/2**20:7.1f}[MB] open {t_open*1e3:.2f}[ms], count all chords {t_count*1e3:.2f}[ms] (save {t_save:.3f}[s])")
+        print(f"corpus -> dicts {t_dicts:.3f}[s], lossless: {restored == songs}")
+        assert counts.sum() == num_chords
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
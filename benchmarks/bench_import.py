@@ -0,0 +1,54 @@
+# coding: utf-8
+"""
+Measure how long `import guitar` takes in a fresh interpreter.
+Exits with status 1 if the best time exceeds the budget, or if any of the
+heavy modules were loaded (scraping-only ones, and PIL,
+which comes with matplotlib: it is imported with `guitar.main` on first use.)
+
+$ python benchmarks/bench_import.py --budget 2.0 --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN_MODULES = ["selenium", "kerasy", "tqdm", "PIL"]
+
+SNIPPET = """
+import sys, time, json
+t = time.perf_counter()
+import guitar
+t = time.perf_counter() - t
+print(json.dumps({"seconds": t, "modules": sorted({m.split('.')[0] for m in sys.modules})}))
+"""
+
+def measure_import(python=sys.executable):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([python, "-c", SNIPPET], check=True, env=env, cwd=REPO_DIR,
+                         stdout=subprocess.PIPE).stdout
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=2.0, help="Maximum allowed seconds.")
+    parser.add_argument("--repeat", type=int,   default=5)
+    args = parser.parse_args(argv)
+
+    results = [measure_import() for _ in range(args.repeat)]
+    times = sorted(r["seconds"] for r in results)
+    loaded = [m for m in FORBIDDEN_MODULES if m in results[0]["modules"]]
+    print(f"import guitar: best={times[0]:.3f}[s] median={times[len(times)//2]:.3f}[s] budget={args.budget:.3f}[s]")
+
+    ok = True
+    if times[0] > args.budget:
+        print("FAIL: import time is over budget.")
+        ok = False
+    if len(loaded) > 0:
+        print(f"FAIL: `import guitar` loaded {', '.join(loaded)}")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# coding: utf-8
+"""
+Build time, incremental update time and query latency of `SongIndex` over a
+synthetic catalog of chord books (json), checked against a scan of every file.
+
+$ python benchmarks/bench_index.py --songs 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar.env import NOTES
+from guitar.utils.index_utils import SongIndex, song_features, parse_progression_token, progression_ngrams
+
+# (semitones from the tonic, suffix) of diatonic chords of a major key.
+DIATONIC = [(0, ""), (2, "m"), (4, "m"), (5, ""), (7, ""), (7, "7"), (9, "m"), (9, "m7"), (5, "maj7")]
+PROGRESSIONS = [[0, 7, 9, 5], [5, 7, 4, 9], [0, 9, 5, 7], [9, 5, 0, 7]]
+
+def synthetic_song(rnd):
+    tonic = rnd.randrange(len(NOTES))
+    chord = lambda interval, suffix: NOTES[(tonic+interval)%len(NOTES)] + suffix
+    suffixes = dict(DIATONIC[::-1])
+    rows = []
+    for _ in range(rnd.randint(10, 40)):
+        if rnd.random() < 0.5:
+            chords = [chord(interval, suffixes[interval]) for interval in rnd.choice(PROGRESSIONS)]
+        else:
+            chords = [chord(*rnd.choice(DIATONIC)) for _ in range(4)]
+        rows.append(chords)
+    return {str(i): {"chord": chords, "lyric": [""]*len(chords)} for i,chords in enumerate(rows)}
+
+def scan(paths, chords=None, progression=None):
+    """ The answer without the index: read and check every file. """
+    hits = []
+    for path in paths:
+        with open(path) as f:
+            song_chords, ngrams = song_features(json.load(f))
+        if chords is not None and song_chords <= chords:
+            hits.append(path)
+        if progression is not None and progression in ngrams:
+            hits.append(path)
+    return sorted(hits)
+
+def timeit(func, repeat=20):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter()-t)/repeat
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(0)
+    tmpdir = tempfile.mkdtemp()
+    songs_dir = os.path.join(tmpdir, "songs")
+    os.makedirs(songs_dir)
+    try:
+        for n in range(args.songs):
+            with open(os.path.join(songs_dir, f"{n:06d}.json"), "w") as f:
+                json.dump(synthetic_song(rnd), f, indent=2)
+        # A few songs only beginners' chords.
+        for n in range(5):
+            with open(os.path.join(songs_dir, f"easy-{n}.json"), "w") as f:
+                json.dump({"0": {"chord": ["G", "C", "D", "Em", "G"][n:], "lyric": [""]*(5-n)}}, f)
+        paths = sorted(os.path.join(songs_dir, fn) for fn in os.listdir(songs_dir))
+        index_path = os.path.join(tmpdir, "index.json")
+
+        t = time.perf_counter(); stats = SongIndex(index_path).update(songs_dir); t_build = time.perf_counter()-t
+        print(f"build  : {t_build:.3f}[s] {stats}")
+        t = time.perf_counter(); index = SongIndex(index_path); t_load = time.perf_counter()-t
+        print(f"load   : {t_load*1e3:.1f}[ms] {index} ({os.path.getsize(index_path)/2**20:.1f}[MB])")
+
+        os.remove(paths[0])
+        with open(os.path.join(songs_dir, "new.json"), "w") as f:
+            json.dump(synthetic_song(rnd), f)
+        t = time.perf_counter(); stats = index.update(songs_dir); t_update = time.perf_counter()-t
+        print(f"update : {t_update*1e3:.1f}[ms] {stats}")
+        paths = sorted(os.path.join(songs_dir, fn) for fn in os.listdir(songs_dir))
+
+        beginner = ["G", "C", "D", "Em"]
+        hits, t_query = timeit(lambda: index.playable_with(beginner))
+        t = time.perf_counter(); expected = scan(paths, chords={f"{c}:{q}" for c,q in [("G","major"), ("C","major"), ("D","major"), ("E","minor")]}); t_scan = time.perf_counter()-t
+        print(f"playable_with({beginner}) : {len(hits)} songs {t_query*1e3:.3f}[ms] (scan {t_scan:.2f}[s], same: {hits==expected})")
+
+        progression = ["I", "V", "vi", "IV"]
+        hits, t_query = timeit(lambda: index.with_progression(progression))
+        ngram, = progression_ngrams([parse_progression_token(token) for token in progression], len(progression))
+        t = time.perf_counter(); expected = scan(paths, progression=ngram); t_scan = time.perf_counter()-t
+        print(f"with_progression({progression}) : {len(hits)} songs {t_query*1e3:.3f}[ms] (scan {t_scan:.2f}[s], same: {hits==expected})")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# coding: utf-8
+"""
+Throughput of the key detection of a whole catalog: `detect_keys_batch` (all keys
+of all scales, every song at once) against `find_key_major_scale` called song by
+song (12 major keys only.) Songs are random diatonic chords of a major key, where
+the tonic is the most frequent chord as in most pop songs.
+
+$ python benchmarks/bench_keys.py --songs 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar.env import NOTES, SCALE2INTERVALS
+from guitar.utils import find_key_major_scale, detect_keys_batch
+from guitar.utils.key_utils import chord_vectors
+
+# Scale degrees (semitones from the root) weighted by how often their chords appear.
+DEGREES = [0]*5 + [5]*3 + [7]*3 + [9]*2 + [2, 4]
+
+def synthetic_components(num_songs, seed=0):
+    """ [(majors, minors), ...] of songs in random major keys, and the keys. """
+    rnd = random.Random(seed)
+    components, keys = [], []
+    for _ in range(num_songs):
+        root = rnd.randrange(len(NOTES))
+        majors, minors = {}, {}
+        for _ in range(rnd.randint(8, 60)):
+            degree = rnd.choice(DEGREES)
+            chords = majors if degree in [0, 5, 7] else minors
+            note = NOTES[(root+degree)%len(NOTES)]
+            chords[note] = chords.get(note, 0) + 1
+        components.append((majors, minors))
+        keys.append(NOTES[root])
+    return components, keys
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs", type=int, default=10000)
+    parser.add_argument("--top",   type=int, default=5)
+    args = parser.parse_args(argv)
+
+    components, keys = synthetic_components(args.songs)
+
+    t = time.perf_counter()
+    legacy = [find_key_major_scale(*chords) for chords in components]
+    t_legacy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    X = chord_vectors(components)
+    t_vectors = time.perf_counter() - t
+    t = time.perf_counter()
+    candidates = detect_keys_batch(X, top=args.top)
+    t_batch = time.perf_counter() - t
+
+    legacy_hits = sum(k==key for k,key in zip(legacy, keys)) / args.songs
+    top1 = sum((c[0].key, c[0].scale)==(key, "major") for c,key in zip(candidates, keys)) / args.songs
+    topk = sum((key, "major") in [(k.key, k.scale) for k in c] for c,key in zip(candidates, keys)) / args.songs
+    print(f"{args.songs} songs")
+    print(f"find_key_major_scale (loop) : {t_legacy:.3f}[s] accuracy={legacy_hits:.3f} (12 keys)")
+    print(f"chord_vectors               : {t_vectors:.3f}[s]")
+    print(f"detect_keys_batch (matrix)  : {t_batch:.3f}[s] accuracy={top1:.3f} (top-{args.top}: {topk:.3f}, {12*len(SCALE2INTERVALS)} keys)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
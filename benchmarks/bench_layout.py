@@ -0,0 +1,99 @@
+# coding: utf-8
+"""
+Compare the number of artists per chord diagram and the savefig time per page
+of the collection-based renderer against the previous one (one artist per
+string/fret/note, with the layout drawn twice per diagram.)
+
+$ python benchmarks/bench_layout.py --pages 3
+"""
+import os
+import sys
+import time
+import argparse
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar import Guitar
+from guitar.env import NUM_STRINGS, NUM_FRETS, LEN_OCTAVES, INIT_KEYS, GUITAR_STRINGS, CHORDS
+from guitar.utils import mpatches
+
+CELLS = [("G#", "minor"), ("D#", "minor"), ("E", "major"), ("B", "major"), ("F#", "major")]
+
+def legacy_plot_chord_layout(guitar, ax, fontsize=20):
+    for i in range(1, NUM_STRINGS+1):
+        ax.plot([i for _ in range(NUM_FRETS+2)], color='gray')
+    for i in range(1, NUM_FRETS+1):
+        if i%LEN_OCTAVES==0:
+            ax.axvline(x=i, color='gray', linewidth=3.5)
+        else:
+            ax.axvline(x=i, color=guitar.linecolor, linewidth=0.5)
+    ax.set_axisbelow(True)
+    ax.set_facecolor(guitar.facecoloer)
+    ax.set_xlim([0.5, 21])
+    ax.set_xticks([i+0.5 for i in range(NUM_FRETS+1)])
+    ax.set_xticklabels(range(NUM_FRETS+1), fontsize=fontsize)
+    ax.set_ylim([0.4, 6.5])
+    ax.set_yticks(range(1, NUM_STRINGS+1))
+    ax.set_yticklabels(INIT_KEYS, fontsize=fontsize)
+    return ax
+
+def legacy_plot_chord_cell(guitar, note, mode, string, root_pos, ax):
+    legacy_plot_chord_layout(guitar, ax)
+    mode = guitar.resolve_mode(note, mode)
+    positions = CHORDS.get(mode).get(str(string))
+    is_mutes  = [isinstance(pos, bool) and pos==False for pos in positions]
+    positions = [pos+root_pos for pos in positions]
+    legacy_plot_chord_layout(guitar, ax)
+    for i,(y_val, pos, is_mute) in enumerate(zip([1,2,3,4,5,6], positions, is_mutes)):
+        x = pos+0.5
+        n = GUITAR_STRINGS.get(INIT_KEYS[i])[pos]
+        bg, fc = guitar.notes2color.get(n)
+        if 7-y_val == string:
+            func = mpatches.star_hexagon
+        elif is_mute:
+            func = mpatches.x_mark
+        else:
+            func = mpatches.Circle
+        ax.add_patch(func(xy=(x, y_val), radius=0.5, color=bg))
+        ax.annotate(text=n, xy=(x, y_val), color=fc, weight='bold', fontsize=25, ha='center', va='center')
+    ax.set_xlim([root_pos, min(root_pos+5, NUM_FRETS+1)])
+    return ax
+
+def current_plot_chord_cell(guitar, note, mode, string, root_pos, ax):
+    return guitar.plot_chord_cell(note, mode, string, root_pos, ax=ax)
+
+def count_artists(ax):
+    return len(ax.lines) + len(ax.patches) + len(ax.collections) + len(ax.texts)
+
+def render_page(guitar, plot_cell, nrows=5, path=os.devnull):
+    fig = plt.figure(figsize=(21.0, 29.7))
+    artists = []
+    for i in range(nrows):
+        for j,(note,mode) in enumerate(CELLS):
+            ax = plt.subplot2grid(shape=(nrows, len(CELLS)), loc=(i, j))
+            string, root_pos = guitar.find_chord_window(note)
+            plot_cell(guitar, note, mode, string, root_pos, ax)
+            artists.append(count_artists(ax))
+    start = time.perf_counter()
+    fig.savefig(path, format="pdf")
+    seconds = time.perf_counter() - start
+    plt.close(fig)
+    return sum(artists)/len(artists), seconds
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    guitar = Guitar(key="B", scale="major")
+    for name, plot_cell in [("legacy", legacy_plot_chord_cell), ("collections", current_plot_chord_cell)]:
+        results = [render_page(guitar, plot_cell) for _ in range(args.pages)]
+        artists = results[0][0]
+        seconds = sorted(s for _,s in results)[len(results)//2]
+        print(f"{name:<12} artists/diagram={artists:5.1f}  savefig/page={seconds:.3f}[s]")
+
+if __name__ == "__main__":
+    main()
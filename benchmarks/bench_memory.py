@@ -0,0 +1,72 @@
+# coding: utf-8
+"""
+Memory regression check for `Guitar.create_chord_book_stream`.
+A synthetic song is rendered from a generator in a fresh interpreter, once with
+``--baseline`` rows and once with ``--rows`` rows. Exits with status 1 if the
+peak RSS of the long song exceeds that of the short one by more than the budget.
+
+$ python benchmarks/bench_memory.py --rows 5000 --budget 20
+$ python benchmarks/bench_memory.py --backend matplotlib --rows 300 --baseline 30
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time, json, resource, itertools
+import matplotlib
+matplotlib.use("Agg")
+from guitar import Guitar
+
+num_rows, backend, cache, filename = int(sys.argv[1]), sys.argv[2], sys.argv[3]=="1", sys.argv[4]
+PROGRESSION = ["G#m", "C#m", "F#", "B", "E", "D#7", "G#m/B", "C#", "", "F#sus4", "Badd9", "Emaj7"]
+
+def synthetic_song(num_rows):
+    chords = itertools.cycle(PROGRESSION)
+    for i in range(num_rows):
+        row = [next(chords) for _ in range(4 + i%3)]
+        yield {"chord": row, "lyric": [f"{i}-{j}" for j in range(len(row))]}
+
+guitar = Guitar(key="B", scale="major", backend=backend, diagram_cache=True if cache else None)
+t = time.perf_counter()
+guitar.create_chord_book_stream(synthetic_song(num_rows), ncols=6, filename=filename, verbose=-1)
+t = time.perf_counter() - t
+print(json.dumps({
+    "rows": num_rows, "seconds": t,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024,
+}))
+"""
+
+def measure(num_rows, backend, cache, filename, python=sys.executable):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([python, "-c", SNIPPET, str(num_rows), backend, str(int(cache)), filename],
+                         check=True, env=env, cwd=REPO_DIR, stdout=subprocess.PIPE).stdout
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows",     type=int,   default=5000)
+    parser.add_argument("--baseline", type=int,   default=50, help="Rows of the reference song.")
+    parser.add_argument("--backend",  type=str,   default="native", choices=["matplotlib", "native"])
+    parser.add_argument("--cache",    action="store_true", help="Use the chord diagram cache.")
+    parser.add_argument("--budget",   type=float, default=20.0, help="Maximum allowed growth of the peak RSS [MB].")
+    parser.add_argument("--output",   type=str,   default=os.devnull)
+    args = parser.parse_args(argv)
+
+    small = measure(args.baseline, args.backend, args.cache, args.output)
+    large = measure(args.rows,     args.backend, args.cache, args.output)
+    growth = large["max_rss_mb"] - small["max_rss_mb"]
+    for r in [small, large]:
+        print(f"{r['rows']:>6} rows: max RSS={r['max_rss_mb']:7.1f}[MB] ({r['seconds']:.2f}[s])")
+    print(f"growth={growth:.1f}[MB] budget={args.budget:.1f}[MB]")
+    if growth > args.budget:
+        print("FAIL: peak memory grows with the number of rows.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
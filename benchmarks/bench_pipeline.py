@@ -0,0 +1,121 @@
+# coding: utf-8
+"""
+Compare scraping -> key detection -> rendering one song after another with the
+pipelined batch mode (`guitar.pipeline`), against a local stand-in of U-FRET:
+an HTTP server which answers ``/song.php?data=<i>`` with a page in the same
+format (the example transposed by i semitones) after ``--latency`` seconds.
+``data=missing`` (404) and ``data=empty`` (a page without chords) are added to
+the URLs, so both stages have a song failing on its own. No network access.
+
+$ python benchmarks/bench_pipeline.py --songs 8 --latency 1.0 --scrapers 4 --jobs 2
+"""
+import os
+import sys
+import json
+import time
+import html
+import shutil
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import matplotlib
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar.pipeline import export_ufret_pipeline, get_ufret_chords_http, render_song
+from guitar.utils import transpose_data
+from guitar.utils.generic_utils import toBLUE, toRED
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "欲望に満ちた青年団  ONE OK ROCK | key-0.json")
+
+def make_page(title, data):
+    """ {i: {'chord': [], 'lyric': []}} -> html laid out like a U-FRET page (see `get_ufret_chords_from_html`) """
+    rows = "\n".join(
+        '<div class="row">' + "".join(
+            f'<p class="chord"><ruby><rt>{html.escape(chord)}</rt></ruby><span class="col">{html.escape(lyric)}</span></p>'
+            for chord,lyric in zip(row["chord"], row["lyric"])
+        ) + '</div>' for row in data.values()
+    )
+    return f"""<html><head><title>{html.escape(title)} ギターコード/ウクレレコード/ピアノコード - U-フレット</title></head>
+<body><select name="keyselect"><option value="0" selected>0</option></select>
+<div id="my-chord-data">
+{rows}
+</div></body></html>"""
+
+def start_stand_in(songs, latency=1.0):
+    """ Start the stand-in server in a thread, and return it. """
+    with open(EXAMPLE) as f:
+        data = json.load(f)
+    pages = {str(i): make_page(f"Song {i}", transpose_data(data, semitones=i)).encode("utf-8") for i in range(songs)}
+    pages["empty"] = make_page("Empty", {}).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            # Pretend to be a slow browser session / network.
+            time.sleep(latency)
+            page = pages.get(parse_qs(urlsplit(self.path).query).get("data", [""])[0])
+            self.send_response(200 if page is not None else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(page or b"Not Found")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_sequential(urls, output_dir, **render_kwargs):
+    """ Same as `export_ufret_chordbooks`: scrape, detect and render, one song at a time. """
+    failed = 0
+    for url in urls:
+        try:
+            title, _, data = get_ufret_chords_http(url)
+            render_song(title, data, output_dir=output_dir, **render_kwargs)
+        except Exception:
+            failed += 1
+    return failed
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--songs",    type=int,   default=8)
+    parser.add_argument("--latency",  type=float, default=1.0, help="Seconds the stand-in takes to answer a page.")
+    parser.add_argument("--scrapers", type=int,   default=4)
+    parser.add_argument("--jobs",     type=int,   default=2)
+    parser.add_argument("--backend",  type=str,   default="native", choices=["matplotlib", "native"])
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = start_stand_in(args.songs, latency=args.latency)
+    base = "http://{}:{}/song.php?data=".format(*server.server_address[:2])
+    urls = [base + str(i) for i in range(args.songs)] + [base + "missing", base + "empty"]
+    render_kwargs = dict(backend=args.backend)
+    output_dir = tempfile.mkdtemp(prefix="pyguitar-pipeline-")
+    try:
+        if not args.skip_sequential:
+            start = time.perf_counter()
+            failed = run_sequential(urls, output_dir, **render_kwargs)
+            print(f"sequential : {time.perf_counter()-start:.2f}[s] ({len(urls)-failed} ok, {failed} failed)")
+
+        start = time.perf_counter()
+        summaries = export_ufret_pipeline(urls, output_dir=output_dir, fetch="http", scrapers=args.scrapers,
+                                          jobs=args.jobs, **render_kwargs)
+        elapsed = time.perf_counter() - start
+        failures = [s for s in summaries if s["status"] != "ok"]
+        print(f"pipeline   : {elapsed:.2f}[s] ({len(summaries)-len(failures)} ok, {len(failures)} failed) "
+              f"scrapers={args.scrapers} jobs={args.jobs}")
+        for s in failures:
+            print(f"  {toRED(s['stage'])} {toBLUE(s['url'])}: {s['error'].strip().splitlines()[-1]}")
+        waited = [s["waited_seconds"] for s in summaries if s["waited_seconds"] is not None]
+        print(f"  songs waited {max(waited):.2f}[s] at most for a worker (backpressure)")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# coding: utf-8
+"""
+Compare the number of rows/pages and the render time of a chord book with and
+without folding repeated blocks of rows (``create_chord_book(repeats=True)``.)
+
+$ python benchmarks/bench_repeats.py --backend native --times 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import matplotlib
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar import Guitar
+from guitar.utils import fold_repeats, RepeatRow
+from guitar.utils.fmt_utils import row2pair, split_row
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "欲望に満ちた青年団  ONE OK ROCK | key-0.json")
+
+def count_rows(data, nrows, **kwargs):
+    ncols = max([len(v.get("chord")) for v in data.values()])
+    rows = [row for chords,lyrics in map(row2pair, data.values()) for row in split_row(chords, lyrics, ncols)]
+    folded = list(fold_repeats(rows, nrows=nrows, **kwargs))
+    return len(rows), len(folded), sum(isinstance(row, RepeatRow) for row in folded)
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input",   type=str, default=EXAMPLE, help="Chord book (json)")
+    parser.add_argument("--backend", type=str, default="matplotlib", choices=["matplotlib", "native"])
+    parser.add_argument("--nrows",   type=int, default=5)
+    parser.add_argument("--times",   type=int, default=1, help="Repeat the song this many times (a longer song.)")
+    args = parser.parse_args(argv)
+
+    with open(args.input) as f:
+        data = json.load(f)
+    values = list(data.values()) * args.times
+    data = {str(i): v for i,v in enumerate(values)}
+
+    for match_lyrics in [False, True]:
+        num_rows, num_folded, num_repeats = count_rows(data, nrows=args.nrows, match_lyrics=match_lyrics)
+        print(f"match_lyrics={match_lyrics!s:<5}: {num_rows} rows -> {num_folded} rows ({num_repeats} repeats)")
+
+    guitar = Guitar(key="B", backend=args.backend)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for repeats in [False, True]:
+            filename = os.path.join(tmpdir, f"repeats-{repeats}.pdf")
+            start = time.perf_counter()
+            guitar.create_chord_book(data=data, nrows=args.nrows, filename=filename, verbose=-1, repeats=repeats)
+            seconds = time.perf_counter() - start
+            print(f"repeats={repeats!s:<5}: {seconds:.2f}[s] {os.path.getsize(filename)/1024:.0f}[KiB]")
+
+if __name__ == "__main__":
+    main()
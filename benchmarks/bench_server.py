@@ -0,0 +1,105 @@
+# coding: utf-8
+"""
+Load test of the rendering server (`guitar.server`): send requests from many
+clients at once and report the latency (p50/p99) and the throughput.
+Requests cycle through ``--unique`` songs (the example transposed), so that
+repeated ones are answered by the result cache or coalesced with the one in
+flight. Without ``--url``, a server is started in this process (offline.)
+
+$ python benchmarks/bench_server.py --requests 40 --concurrency 8 --unique 4 --format png
+$ python benchmarks/bench_server.py --url http://127.0.0.1:8000 --requests 200
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from guitar.utils import transpose_data
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "欲望に満ちた青年団  ONE OK ROCK | key-0.json")
+
+def make_bodies(unique, fmt="pdf", backend="native"):
+    with open(EXAMPLE) as f:
+        data = json.load(f)
+    return [json.dumps({
+        "data": transpose_data(data, semitones=i), "format": fmt,
+        "options": {"backend": backend, "font_family": "DejaVu Sans"},
+    }, ensure_ascii=False).encode("utf-8") for i in range(unique)]
+
+def post(url, body, timeout=600):
+    start = time.perf_counter()
+    request = urllib.request.Request(url + "/render", data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.headers.get("X-PyGuitar-Cache", "?")
+    except urllib.error.HTTPError as e:
+        status = f"HTTP {e.code}"
+    return time.perf_counter()-start, status
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url",         type=str, help="Server to test. Starts one in this process if not given.")
+    parser.add_argument("--requests",    type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients sending requests at once.")
+    parser.add_argument("--unique",      type=int, default=4, help="Number of distinct songs.")
+    parser.add_argument("--format",      type=str, default="pdf", choices=["pdf", "png"])
+    parser.add_argument("--backend",     type=str, default="native", choices=["matplotlib", "native"])
+    parser.add_argument("--workers",     type=int, default=2, help="Workers of the server started here.")
+    parser.add_argument("--no-cache",    action="store_true", help="Disable the result cache of the server started here.")
+    parser.add_argument("--json",        type=str, help="Save the results here.")
+    args = parser.parse_args(argv)
+
+    server, cache_dir = None, None
+    url = args.url
+    if url is None:
+        from guitar.server import create_server
+        cache_dir = tempfile.mkdtemp(prefix="pyguitar-bench-")
+        start = time.perf_counter()
+        server = create_server(port=0, workers=args.workers, cache_dir=cache_dir, no_cache=args.no_cache, verbose=False)
+        print(f"Started the server with {args.workers} warm workers in {time.perf_counter()-start:.2f}[s]")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://{}:{}".format(*server.server_address[:2])
+
+    bodies = make_bodies(args.unique, fmt=args.format, backend=args.backend)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: post(url, bodies[i%len(bodies)]), range(args.requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            server.service.close()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    latencies = np.asarray([seconds for seconds,_ in results])
+    summary = {
+        "requests": args.requests, "concurrency": args.concurrency, "unique": args.unique,
+        "format": args.format, "backend": args.backend,
+        "p50": float(np.percentile(latencies, 50)), "p99": float(np.percentile(latencies, 99)),
+        "mean": float(latencies.mean()), "throughput": args.requests/elapsed,
+        "statuses": dict(Counter(status for _,status in results)),
+    }
+    print(f"{args.requests} requests ({args.unique} unique, {args.concurrency} at once) in {elapsed:.2f}[s]")
+    print(f"  latency    : p50 {summary['p50']*1000:.0f}[ms]  p99 {summary['p99']*1000:.0f}[ms]  mean {summary['mean']*1000:.0f}[ms]")
+    print(f"  throughput : {summary['throughput']:.2f}[req/s]")
+    print(f"  statuses   : {summary['statuses']}")
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# coding: utf-8
+"""
+Benchmark suite of PyGuitar: `import guitar`, parsing, key detection and
+rendering, on the bundled example song and synthetic large songs. Each case
+runs in a fresh interpreter and records its time (first call, best and median
+of ``--repeat``), peak python memory (tracemalloc), peak RSS and the size of
+its output. ``compare`` flags regressions against a stored baseline, and exits
+with status 1 if there are any.
+
+$ python benchmarks/bench_suite.py run -o baseline.json
+$ python benchmarks/bench_suite.py run -o results.json --baseline baseline.json
+$ python benchmarks/bench_suite.py compare baseline.json results.json --threshold 0.15
+$ python benchmarks/bench_suite.py run --cases get_chord_components find_key_major_scale --songs large --rows 2000
+"""
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(REPO_DIR, "examples", "欲望に満ちた青年団  ONE OK ROCK | key-0.json")
+# Bundled with matplotlib, so that every machine draws with the same font.
+FONT_FAMILY = "DejaVu Sans"
+# Chords of `export_chord_book` (same as the README)
+CHORD_BOOK = [
+    ("D#", 5, "minor"), ("G#", 6, "minor"), ("E", 6, "major"), ("B", 5, "major"), ("F#", 6, "minor"),
+    ("C#", 5, "major"), ("F#", 6, "sus4"), ("C#", 5, "7th"), ("D#", 5, "7th"),
+]
+
+# ---------------------------------------------------------------------------------
+# Cases (run in a child interpreter, see `run_case`)
+# ---------------------------------------------------------------------------------
+
+def load_song(song, rows=200):
+    """ "example" is the bundled song, "large" has ``rows`` rows: the example transposed to every key in turn. """
+    from guitar.utils import transpose_data
+    with open(EXAMPLE) as f:
+        data = json.load(f)
+    if song == "example":
+        return data
+    values, semitones = [], 0
+    while len(values) < rows:
+        values.extend(transpose_data(data, semitones=semitones%12).values())
+        semitones += 5
+    return {str(i): row for i,row in enumerate(values[:rows])}
+
+def case_ufret2pyguitar(data, output):
+    from guitar.utils.fmt_utils import ufret2pyguitar
+    chords = [chord for row in data.values() for chord in row["chord"]]
+    return lambda: [ufret2pyguitar(chord) for chord in chords]
+
+def case_get_chord_components(data, output):
+    from guitar.utils import get_chord_components
+    return lambda: get_chord_components(data, fmt="ufret")
+
+def case_find_key_major_scale(data, output):
+    from guitar.utils import get_chord_components, find_key_major_scale
+    majors, minors = get_chord_components(data, fmt="ufret")
+    return lambda: find_key_major_scale(majors=majors, minors=minors)
+
+def case_plot_chord(data, output):
+    from guitar import Guitar
+    guitar = Guitar(key="B", scale="major", font_family=FONT_FAMILY)
+    def run():
+        ax = guitar.plot_chord(chode="G#", string=6, mode="minor")
+        ax.figure.savefig(output + ".png")
+        return output + ".png"
+    return run
+
+def case_export_chord_book(data, output):
+    from guitar import Guitar
+    guitar = Guitar(key="B", scale="major", font_family=FONT_FAMILY)
+    for chode,string,mode in CHORD_BOOK:
+        guitar.set_chord(chode=chode, string=string, mode=mode)
+    def run():
+        guitar.export_chord_book(filename=output + ".pdf", fmt="pdf")
+        return output + ".pdf"
+    return run
+
+def _case_create_chord_book(backend):
+    def case(data, output):
+        from guitar import Guitar
+        from guitar.utils import get_chord_components, find_key_major_scale
+        def run():
+            key = find_key_major_scale(*get_chord_components(data, fmt="ufret"))
+            guitar = Guitar(key=key, scale="major", backend=backend, font_family=FONT_FAMILY)
+            guitar.create_chord_book(data=data, filename=output + ".pdf", verbose=-1)
+            return output + ".pdf"
+        return run
+    return case
+
+# name -> (setup(data, output) -> callable, songs) ("-" : the case doesn't use a song.)
+CASES = {
+    "import"                      : (None, ["-"]),
+    "ufret2pyguitar"              : (case_ufret2pyguitar,       ["example", "large"]),
+    "get_chord_components"        : (case_get_chord_components, ["example", "large"]),
+    "find_key_major_scale"        : (case_find_key_major_scale, ["example", "large"]),
+    "plot_chord"                  : (case_plot_chord,           ["-"]),
+    "export_chord_book"           : (case_export_chord_book,    ["-"]),
+    "create_chord_book"           : (_case_create_chord_book("matplotlib"), ["example", "large"]),
+    "create_chord_book[native]"   : (_case_create_chord_book("native"),     ["example", "large"]),
+}
+SONGS = ["example", "large"]
+
+def run_case(name, song, repeat, rows, output, budget=30):
+    """ Run one case in this (fresh) interpreter and return its measurements.
+    Cases shorter than 0.2[s] are looped (`timeit.Timer.autorange`) and their time is per call.
+    Longer ones stop repeating once they took ``budget`` seconds, and skip tracemalloc if it
+    would take longer than that (``max_rss_mb`` is still recorded.)
+    """
+    import resource
+    import tracemalloc
+    if name == "import":
+        start = time.perf_counter()
+        from guitar import Guitar
+        seconds = time.perf_counter() - start
+        return {"first": seconds, "seconds": [seconds], "number": 1, "peak_mb": None, "output_bytes": None,
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024}
+
+    import matplotlib
+    matplotlib.use("Agg")
+    setup, _ = CASES[name]
+    run = setup(None if song=="-" else load_song(song, rows=rows), output)
+    start = time.perf_counter()
+    result = run()
+    first = time.perf_counter() - start
+    timer = timeit.Timer(run)
+    if first < 0.2:
+        number, _ = timer.autorange()
+        seconds = [t/number for t in timer.repeat(repeat=repeat, number=number)]
+    else:
+        number, seconds = 1, []
+        while len(seconds) < repeat and first+sum(seconds) < budget:
+            seconds.append(timer.timeit(number=1))
+        seconds = seconds or [first]
+    # Separately, as tracing slows everything down (~3x)
+    peak = None
+    if first*3 < budget:
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]/1024**2
+        tracemalloc.stop()
+    output_bytes = os.path.getsize(result) if isinstance(result, str) and os.path.exists(result) else None
+    return {"first": first, "seconds": seconds, "number": number, "peak_mb": peak, "output_bytes": output_bytes,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024}
+
+# ---------------------------------------------------------------------------------
+# run / compare
+# ---------------------------------------------------------------------------------
+
+def measure(name, song, repeat, rows, tmpdir, budget=30):
+    """ Run a case in fresh interpreter(s) (``import`` needs one per repetition) and summarize it. """
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""),
+               PYGUITAR_CACHE_DIR=os.path.join(tmpdir, "cache"))
+    output = os.path.join(tmpdir, f"{name}-{song}")
+    runs = []
+    for _ in range(repeat if name=="import" else 1):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "case", name, song, str(repeat), str(rows), output, str(budget)],
+            check=True, env=env, cwd=REPO_DIR, stdout=subprocess.PIPE,
+        ).stdout
+        runs.append(json.loads(out.decode().strip().splitlines()[-1]))
+    seconds = [s for r in runs for s in r["seconds"]]
+    return {
+        "first"        : runs[0]["first"],
+        "min"          : min(seconds),
+        "median"       : statistics.median(seconds),
+        "repeat"       : len(seconds),
+        "number"       : runs[0]["number"],
+        "peak_mb"      : runs[0]["peak_mb"],
+        "max_rss_mb"   : max(r["max_rss_mb"] for r in runs),
+        "output_bytes" : runs[0]["output_bytes"],
+    }
+
+def environment():
+    import numpy
+    import matplotlib
+    sys.path.insert(0, REPO_DIR)
+    from guitar import __version__
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "version": __version__,
+        "python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+        "cpu_count": os.cpu_count(), "numpy": numpy.__version__, "matplotlib": matplotlib.__version__,
+    }
+
+def run(args):
+    import tempfile
+    cases = args.cases or list(CASES.keys())
+    unknown = [name for name in cases if name not in CASES]
+    if len(unknown)>0:
+        raise ValueError(f"Couldn't find the cases {unknown}. Please chose them from {list(CASES.keys())}")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pyguitar-bench-") as tmpdir:
+        for name in cases:
+            for song in CASES[name][1]:
+                if song != "-" and song not in args.songs:
+                    continue
+                key = name if song=="-" else f"{name}/{song}"
+                results[key] = r = measure(name, song, args.repeat, args.rows, tmpdir, budget=args.budget)
+                size = "" if r["output_bytes"] is None else f"  {r['output_bytes']/1024:>8.1f}[KiB]"
+                peak = "" if r["peak_mb"] is None else f"  peak {r['peak_mb']:>7.2f}[MB]"
+                print(f"{key:<34} min {format_seconds(r['min'])}  median {format_seconds(r['median'])}  first {format_seconds(r['first'])}{peak}  rss {r['max_rss_mb']:>6.1f}[MB]{size}")
+    report = {"environment": environment(), "rows": args.rows, "results": results}
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results at {args.output}")
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return compare_reports(baseline, report, threshold=args.threshold, memory_threshold=args.memory_threshold,
+                               min_seconds=args.min_seconds)
+    return 0
+
+def format_seconds(seconds):
+    return f"{seconds*1000:>9.2f}[ms]" if seconds < 1 else f"{seconds:>10.3f}[s]"
+
+def compare_reports(baseline, current, threshold=0.15, memory_threshold=0.2, min_seconds=0.005):
+    """ Print the ratios (current / baseline) of every case measured in both, and return the number of regressions.
+    A case regresses if its best time is slower by more than ``threshold`` (and ``min_seconds``, the noise of
+    short cases), or its peak memory (tracemalloc or RSS) or output size grew by more than ``memory_threshold``.
+    """
+    for k in ["python", "matplotlib", "numpy", "machine", "cpu_count"]:
+        b, c = baseline["environment"].get(k), current["environment"].get(k)
+        if b != c:
+            print(f"Warning: {k} differs ({b} -> {c}), so the comparison may not be fair.")
+    if baseline.get("rows") != current.get("rows"):
+        print(f"Warning: the large songs have different rows ({baseline.get('rows')} -> {current.get('rows')}).")
+
+    def ratio(b, c):
+        return None if b in (None, 0) or c is None else c/b
+
+    regressions = 0
+    print(f"{'case':<34} {'time':>8} {'peak':>8} {'rss':>8} {'size':>8}")
+    for key,c in current["results"].items():
+        b = baseline["results"].get(key)
+        if b is None:
+            print(f"{key:<34} (not in the baseline)")
+            continue
+        time_ratio, peak_ratio = ratio(b["min"], c["min"]), ratio(b["peak_mb"], c["peak_mb"])
+        rss_ratio, size_ratio  = ratio(b["max_rss_mb"], c["max_rss_mb"]), ratio(b["output_bytes"], c["output_bytes"])
+        flags = []
+        if time_ratio > 1+threshold and c["min"]-b["min"] > min_seconds:
+            flags.append("slower")
+        if (peak_ratio is not None and peak_ratio > 1+memory_threshold and c["peak_mb"]-b["peak_mb"] > 1) or \
+           (rss_ratio > 1+memory_threshold and c["max_rss_mb"]-b["max_rss_mb"] > 5):
+            flags.append("memory")
+        if size_ratio is not None and size_ratio > 1+memory_threshold:
+            flags.append("size")
+        regressions += len(flags) > 0
+        cells = " ".join("       -" if r is None else f"{r:>7.2f}x" for r in [time_ratio, peak_ratio, rss_ratio, size_ratio])
+        print(f"{key:<34} {cells}  {'REGRESSION (' + ', '.join(flags) + ')' if flags else ''}")
+    print(f"\n{regressions} regression(s) against the baseline of {baseline['environment'].get('date')} (commit {baseline['environment'].get('commit')})")
+    return 1 if regressions>0 else 0
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return compare_reports(baseline, current, threshold=args.threshold, memory_threshold=args.memory_threshold,
+                           min_seconds=args.min_seconds)
+
+def main(argv=sys.argv[1:]):
+    if len(argv)>0 and argv[0]=="case":
+        # Child process of `measure`
+        name, song, repeat, rows, output, budget = argv[1:]
+        print(json.dumps(run_case(name, song, int(repeat), int(rows), output, budget=float(budget))))
+        return 0
+
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    def add_thresholds(p):
+        p.add_argument("--threshold",        type=float, default=0.15,  help="Allowed slowdown of the best time (0.15 = 15%%)")
+        p.add_argument("--memory-threshold", type=float, default=0.2,   help="Allowed growth of the peak memory and the output size.")
+        p.add_argument("--min-seconds",      type=float, default=0.005, help="Slowdowns shorter than this are noise.")
+    p = subparsers.add_parser("run", help="Run the cases, and optionally compare them with a baseline.")
+    p.add_argument("-o", "--output", type=str, help="Save the results (json) here.")
+    p.add_argument("--cases",    type=str, nargs="+", help=f"Cases to run (default: all of {list(CASES.keys())})")
+    p.add_argument("--songs",    type=str, nargs="+", default=SONGS, choices=SONGS)
+    p.add_argument("--rows",     type=int, default=200, help="Rows of the large song.")
+    p.add_argument("--repeat",   type=int, default=5)
+    p.add_argument("--budget",   type=float, default=30, help="Stop repeating a slow case after this many seconds.")
+    p.add_argument("--baseline", type=str, help="Compare the results with this file.")
+    add_thresholds(p)
+    p = subparsers.add_parser("compare", help="Compare two results, and exit with 1 if there are regressions.")
+    p.add_argument("baseline", type=str)
+    p.add_argument("current",  type=str)
+    add_thresholds(p)
+    args = parser.parse_args(argv)
+    return run(args) if args.command=="run" else compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
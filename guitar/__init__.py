@@ -1,8 +1,19 @@
 # coding: utf-8
+import importlib
 from . import env
-from . import main
-from . import ufret
-
-from .main import Guitar
 
 __version__ = "0.3.7"
+
+# `main` and `ufret` import matplotlib (and it imports PIL), so they are imported on first use.
+# ``import guitar`` stays cheap, and ``from guitar import Guitar`` works as before.
+_LAZY_ATTRIBUTES = {"main": ("main", None), "ufret": ("ufret", None), "Guitar": ("main", "Guitar")}
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(f".{module_name}", __name__)
+    return module if attr is None else getattr(module, attr)
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -4,10 +4,10 @@ import json
 
 __all__ = [
     # "LIB_DIR_PATH", "REPO_DIR_PATH", "DATA_DIR_PATH",
-    "NUM_FRETS", "NUM_STRINGS", "LEN_OCTAVES", "INIT_KEYS",
+    "NUM_FRETS", "NUM_STRINGS", "LEN_OCTAVES", "INIT_KEYS", "TUNINGS",
     "NOTES", "WHOLE_NOTES", "GUITAR_STRINGS", "MAJOR_MODES", 
     "A4SIZE",
-    "SCALE2INTERVALS", "CHORDS",
+    "SCALE2INTERVALS", "CHORDS", "CHORD_FORMULAS",
 ]
 
 # PATH
@@ -26,7 +26,17 @@ GUITAR_STRINGS = {
     init_key : WHOLE_NOTES[WHOLE_NOTES.index(init_key):][:NUM_FRETS]
     for init_key in INIT_KEYS
 }
-MAJOR_MODES = ["major", "major7th", "major6th", "sus4", "aug", "omit3", "add9"]
+# Open notes from the lowest string.
+TUNINGS = {
+    "standard"  : INIT_KEYS,
+    "half_down" : ['D#', 'G#', 'C#', 'F#', 'A#', 'D#'],
+    "drop_d"    : ['D', 'A', 'D', 'G', 'B', 'E'],
+    "dadgad"    : ['D', 'A', 'D', 'G', 'A', 'D'],
+    "open_g"    : ['D', 'G', 'D', 'G', 'B', 'D'],
+    "7_string"  : ['B', 'E', 'A', 'D', 'G', 'B', 'E'],
+    "8_string"  : ['F#', 'B', 'E', 'A', 'D', 'G', 'B', 'E'],
+}
+MAJOR_MODES = ["major", "major7th", "major6th", "sus4", "aug", "omit3", "add9", "7sus4", "major9th"]
 
 # PDF
 A4SIZE=(21.0, 29.7)
@@ -36,3 +46,6 @@ with open(os.path.join(DATA_DIR_PATH, "scales.json"), mode="r") as f:
     SCALE2INTERVALS = json.load(f)
 with open(os.path.join(DATA_DIR_PATH, "chord.json"), mode="r") as f:
     CHORDS = json.load(f)
+# Intervals (semitones from the root) of each chord quality.
+with open(os.path.join(DATA_DIR_PATH, "chord_formulas.json"), mode="r") as f:
+    CHORD_FORMULAS = json.load(f)
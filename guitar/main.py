@@ -1,34 +1,71 @@
 # coding: utf-8
+import os
 import re
 import sys
+import shutil
 import argparse
+import tempfile
+import itertools
+import multiprocessing
 import warnings
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
+import numpy as np
 from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import LineCollection, PatchCollection
 from matplotlib import rcParams
-from kerasy.utils import toGREEN, toBLUE, ProgressMonitor
 
 from .utils.coloring_utils import get_notes2color, plot_notes_color_theme
-from .utils.decorate_utils import plot_logo, ax_clear
-from .utils.fmt_utils import ufret2pyguitar
-from .utils.guitar_utils  import find_key_major_scale, get_notes, get_intervals, find_notes_positions, get_chord_components
+from .utils.decorate_utils import plot_logo, ax_clear, plot_shared_image, new_figure
+from .utils.chord_utils import parse_chord
+from .utils.fmt_utils import row2pair, split_row
+from .utils.section_utils import RepeatRow, fold_repeats, repeat_text
+from .utils.generic_utils import toBLUE, ProgressMonitor, handleKeyError
+from .utils.guitar_utils  import get_scale_context
+from .utils.key_utils import best_key
 from .utils.mpatches_utils import mpatches
 
 from .env import *
-from .ufret import get_ufret_chords
+from .ufret import get_ufret_chords_many
+from .utils.driver_utils import DriverPool
+from .utils.font_utils import available_fonts, cjk_fallback, font_chain, font_context
+from .utils.cache_utils import ScrapeCache, LRUCache
+from .utils.voicing_utils import get_voicing_table
+from .utils.pdf_utils import PDFDocument, PDFReader
+
+BACKENDS = ["matplotlib", "native"]
+# Chord diagrams shared by every `Guitar(diagram_cache=True)` in this process.
+DIAGRAM_CACHE = LRUCache(maxsize=256)
 
 class Guitar():
-    def __init__(self, key="C", scale="major", dark_mode=False, theme="rainbow", name="", font_family="Comic Sans MS", is_ja=False):
+    def __init__(self, key="C", scale="major", dark_mode=False, theme="rainbow", name="", font_family="Comic Sans MS", is_ja=False, diagram_cache=None, backend="matplotlib", tuning="standard", num_frets=NUM_FRETS):
+        """
+        @params tuning        : (str, list) Name in ``TUNINGS`` (e.g. "drop_d", "7_string"), or open notes
+                                from the lowest string. Chord shapes (``chord.json``) are played on the
+                                highest 6 strings, so they assume standard tuning.
+        @params num_frets     : (int) Number of frets.
+        @params backend       : (str) "matplotlib" renders chord books with matplotlib's PdfPages.
+                                "native" writes the PDF directly, defining each distinct chord
+                                diagram once and referencing it from every page (see `guitar.pdfbook`)
+        @params diagram_cache : (bool, LRUCache) If given, `create_chord_book` renders each distinct
+                                chord diagram once as an image and reuses it for every cell.
+                                True means the process-wide ``DIAGRAM_CACHE``.
+        """
         self.key = key
         self.scale = scale
-        self.intervals = get_intervals(scale)
-        self.notes = get_notes(key, self.intervals)
-        self.notes_pos_in_string = find_notes_positions(self.notes)
+        # Shared by every `Guitar` with the same key, scale and fretboard.
+        context = get_scale_context(key, scale, tuning=tuning, num_frets=num_frets)
+        self.intervals = context.intervals
+        self.notes = list(context.notes)
+        self.fretboard = context.fretboard
+        self.notes_frets = context.frets
+        self.notes_pos_in_string = dict(zip(self.fretboard.tuning, [frets.tolist() for frets in context.frets]))
         self.facecoloer, self.linecolor = {
             True  : ("black", "white"),
             False : ("white", "black")
         }[dark_mode]
+        self.dark_mode = dark_mode
+        handleKeyError(lst=BACKENDS, backend=backend)
+        self.backend = backend
+        self.diagram_cache = DIAGRAM_CACHE if diagram_cache is True else (diagram_cache or None)
         self.chords = []
         self.name_ = name
         self.theme = theme
@@ -36,18 +73,27 @@ class Guitar():
         self.set_font(font_family=font_family, is_ja=is_ja)
 
     def set_font(self, font_family=None, is_ja=False):
+        """ Set the font used to draw. It is passed to every text this guitar draws (``rcParams`` are
+        left as they are), so guitars with different fonts can draw in the same process, even at once.
+        @params font_family : (str, list) None follows ``rcParams['font.family']``
+        @params is_ja       : (bool) Draw with an installed Japanese font (see `cjk_fallback`)
+        """
         if is_ja:
-            font_family="IPAMincho"
-        if font_family!=None:
-            global rcParams
-            rcParams['font.family'] = font_family
-        else:
-            print(f"You can check the available font by {toGREEN('available_fonts')} property, and set it using {toBLUE('set_font')} method.")
-        print(f"The current {toBLUE('font.family')} is {toGREEN(rcParams['font.family'])}.")
+            font_family = cjk_fallback() or "IPAMincho"
+        self.font_family = font_family
+
+    @property
+    def font_families(self):
+        """ `font_chain` of ``font_family`` (the family of every text drawn by this guitar.) """
+        return font_chain(self.font_family)
+
+    def font_context(self):
+        """ with guitar.font_context(): ... makes other code (e.g. pyplot) draw with the font of this guitar, too. """
+        return font_context(self.font_family)
 
     @property
     def available_fonts(self):
-        return fm.findSystemFonts()
+        return available_fonts()
 
     @property
     def name(self):
@@ -64,7 +110,8 @@ class Guitar():
         return name + self.name + ".pdf"
 
     def chord_layout_create(self, n=1):
-        fig, axes = plt.subplots(ncols=1, nrows=n, figsize=(NUM_FRETS, NUM_STRINGS*n))
+        fig = new_figure(figsize=(self.fretboard.num_frets, self.fretboard.num_strings*n))
+        axes = fig.subplots(ncols=1, nrows=n)
         if n > 1:
             for ax in axes:
                 ax = self.plot_chord_layout(ax=ax)
@@ -75,23 +122,47 @@ class Guitar():
     def plot_chord_layout(self, ax=None, fontsize=20):
         if ax is None:
             fig,ax = self.chord_layout_create(n=1)
+        fretboard = self.fretboard
+        num_frets, num_strings = fretboard.num_frets, fretboard.num_strings
+        # Already laid out (by a Guitar with the same colors and fretboard.)
+        layout = (self.facecoloer, self.linecolor, fretboard.tuning, num_frets)
+        if getattr(ax, "_guitar_layout", None) == layout:
+            return ax
         # Plot Strings
-        for i in range(1, NUM_STRINGS+1):
-            ax.plot([i for _ in range(NUM_FRETS+2)], color='gray')
-        # Plot Frets
-        for i in range(1, NUM_FRETS+1):
-            if i%LEN_OCTAVES==0:
-                ax.axvline(x=i, color='gray', linewidth=3.5)
-            else:
-                ax.axvline(x=i, color=self.linecolor, linewidth=0.5)
+        ax.add_collection(LineCollection(
+            segments=[[(0, i), (num_frets+1, i)] for i in range(1, num_strings+1)],
+            colors='gray', linewidths=rcParams['lines.linewidth'], zorder=2,
+        ), autolim=False)
+        # Plot Frets (x: data, y: axes coordinates, like `axvline`)
+        frets = range(1, num_frets+1)
+        ax.add_collection(LineCollection(
+            segments=[[(i, 0), (i, 1)] for i in frets],
+            colors=['gray' if i%LEN_OCTAVES==0 else self.linecolor for i in frets],
+            linewidths=[3.5 if i%LEN_OCTAVES==0 else 0.5 for i in frets],
+            transform=ax.get_xaxis_transform(), zorder=2,
+        ), autolim=False)
         ax.set_axisbelow(True)
         ax.set_facecolor(self.facecoloer)
-        ax.set_xlim([0.5, 21])
-        ax.set_xticks([i+0.5 for i in range(NUM_FRETS+1)])
-        ax.set_xticklabels(range(NUM_FRETS+1), fontsize=fontsize)
-        ax.set_ylim([0.4, 6.5])
-        ax.set_yticks(range(1, NUM_STRINGS+1))
-        ax.set_yticklabels(INIT_KEYS, fontsize=fontsize)
+        ax.set_xlim([0.5, num_frets+1])
+        ax.set_xticks([i+0.5 for i in range(num_frets+1)])
+        ax.set_xticklabels(range(num_frets+1), fontsize=fontsize, family=self.font_families)
+        ax.set_ylim([0.4, num_strings+0.5])
+        ax.set_yticks(range(1, num_strings+1))
+        ax.set_yticklabels(fretboard.tuning, fontsize=fontsize, family=self.font_families)
+        ax._guitar_layout = layout
+        return ax
+
+    def plot_notes(self, ax, markers, radius=0.5, fontsize=25):
+        """ Plot note markers as one `PatchCollection` (and their labels.)
+        @params markers : [(x, y, note, func), ...] where ``func`` creates the patch.
+        """
+        patches = []
+        family = self.font_families
+        for x, y, note, func in markers:
+            bg, fc = self.notes2color.get(note)
+            patches.append(func(xy=(x, y), radius=radius, color=bg))
+            ax.text(x, y, note, color=fc, weight='bold', fontsize=fontsize, ha='center', va='center', zorder=3, family=family)
+        ax.add_collection(PatchCollection(patches, match_original=True, zorder=1), autolim=False)
         return ax
 
     def set_chord(self, chode, string=6, mode="major", set_title=True):
@@ -104,38 +175,43 @@ class Guitar():
 
     def create_book_cover(self, *shape, title_size=70, figsize=A4SIZE):
         nrows, ncols = shape
+        family = self.font_families
         # <Front Cover>
-        fig = plt.figure(figsize=figsize)
+        fig = new_figure(figsize=figsize)
+        grid = fig.add_gridspec(nrows, ncols)
         # Log
-        ax_log = plt.subplot2grid((nrows, ncols), (0, 0), colspan=ncols)
+        ax_log = fig.add_subplot(grid[0, :])
         ax_log = plot_logo(ax_log)
         # Title
         if nrows>=2:
-            ax_title = plt.subplot2grid((nrows, ncols), (1, 0), colspan=ncols)
-            ax_title.annotate(text=self.name_, xy=(0.5, 0.5), color='black', weight='bold', fontsize=title_size, ha='center', va='center')
+            ax_title = fig.add_subplot(grid[1, :])
+            ax_title.annotate(text=self.name_, xy=(0.5, 0.5), color='black', weight='bold', fontsize=title_size, ha='center', va='center', family=family)
             ax_title = ax_clear(ax_title)
         # Key & scale
         if nrows>=3:
-            ax_keyscale = plt.subplot2grid((nrows, ncols), (2, 0), colspan=ncols)
-            ax_keyscale.annotate(text=f"- {self.name} -", xy=(0.5, 0.8), color='black', weight='bold', fontsize=50, ha='center', va='center')
+            ax_keyscale = fig.add_subplot(grid[2, :])
+            ax_keyscale.annotate(text=f"- {self.name} -", xy=(0.5, 0.8), color='black', weight='bold', fontsize=50, ha='center', va='center', family=family)
             ax_keyscale = ax_clear(ax_keyscale)
         # Strings.
         if nrows>=4:
-            ax_strings = plt.subplot2grid((nrows, ncols), (3, 0), colspan=ncols)
+            ax_strings = fig.add_subplot(grid[3, :])
             ax_strings = self.plot_chord_layout(ax=ax_strings)
             ax_strings = self.plot_strings(ax=ax_strings)
 
         if nrows>=5:
-            ax_notes = plt.subplot2grid((nrows, ncols), (4, 0), colspan=ncols)
-            ax_notes = plot_notes_color_theme(theme=self.theme, ax=ax_notes, fig=fig)
+            ax_notes = fig.add_subplot(grid[4, :])
+            ax_notes = plot_notes_color_theme(theme=self.theme, ax=ax_notes, fig=fig, family=family)
             ax_notes = ax_clear(ax_notes)
         return fig
 
-    def create_chord_book(self, data, nrows=5, filename=None, verbose=1, figsize=A4SIZE):
+    def create_chord_book(self, data, nrows=5, filename=None, verbose=1, figsize=A4SIZE, jobs=1, repeats=False):
         """
         @params data     : {i : {'chord': [], 'lyric': []}}
         @params nrows    : 
         @params filename : 
+        @params jobs     : (int) The number of worker processes (see `create_chord_book_stream`)
+        @params repeats  : (bool, dict) Draw repeated blocks of rows once (see `create_chord_book_stream`)
+        @return filename : (str) The file written (see `create_chord_book_stream`)
         ex.)
         4: {'chord': ['G#m', 'C#m', 'F#', 'B'],
             'lyric': ['一度はあの光', 'を見たんだよとて', 'もキレイ', 'で']},
@@ -143,141 +219,397 @@ class Guitar():
             'lyric': ['でも', '今思えば', '汚かったあれは', 'いわゆるBadDay', 'Dreams']},
         """
         ncols = max([len(v.get("chord")) for v in data.values()])
+        return self.create_chord_book_stream(rows=data.values(), ncols=ncols, nrows=nrows, filename=filename, verbose=verbose, figsize=figsize, jobs=jobs, repeats=repeats)
+
+    def create_chord_book_stream(self, rows, ncols=None, nrows=5, filename=None, verbose=1, figsize=A4SIZE, jobs=1, shard_pages=4, repeats=False):
+        """ Same as `create_chord_book`, but ``rows`` can be any iterable (e.g. a generator.)
+        Each page is written out as soon as it is full, so memory doesn't grow with the length of the song.
+        @params rows        : (iterable) of {'chord': [], 'lyric': []} or (chords, lyrics)
+        @params ncols       : (int) Chords per row. If None, the widest row of the first page.
+                              Rows wider than ``ncols`` are continued on the next row.
+        @params jobs        : (int) If more than 1, the pages are split into shards of ``shard_pages`` pages,
+                              rendered by worker processes with the same settings, and merged in order.
+        @params shard_pages : (int) Pages rendered by a worker at a time.
+        @params repeats     : (bool, dict) If True, blocks of rows with the same chords as rows drawn earlier
+                              are drawn as one row referring to them (e.g. "Repeat p.2 rows 1-4 ×2") with
+                              their lyrics. A dict is passed to `fold_repeats` (e.g. {"match_lyrics": True}).
+                              False draws every row (the faithful layout.)
+        @return filename    : (str) The file written. Characters which can't be in a file name
+                              (e.g. "|" of "Song | Artist") are removed from ``filename``.
+        ~~~
+        examples)
+        >>> def rows():
+        >>>     for path in paths:
+        >>>         with open(path) as f:
+        >>>             yield from json.load(f).values()
+        >>> guitar.create_chord_book_stream(rows(), ncols=6, filename="songbook.pdf")
+        """
         filename = filename or self.pdf
-        filename = re.sub(pattern=r'[\\\/\?\*\|<>":;]+', repl='', string=filename)
-        pp = PdfPages(filename)
+        dirname, basename = os.path.split(filename)
+        filename = os.path.join(dirname, re.sub(pattern=r'[\\\/\?\*\|<>":;]+', repl='', string=basename))
+        sized = hasattr(rows, "__len__")
+        rows, ncols = self.chord_book_rows(rows, ncols=ncols, nrows=nrows, repeats=repeats)
+        max_iter = None
+        if sized:
+            # The song is in memory anyway, so the rows as drawn (split and folded) are counted for the progress bar.
+            rows = list(rows)
+            max_iter = len(rows) if jobs <= 1 else max(1, -(-len(rows)//(nrows*shard_pages)))
+        monitor = ProgressMonitor(max_iter=max_iter, verbose=verbose, barname=filename)
+        if jobs > 1:
+            self._create_chord_book_sharded(rows, nrows=nrows, ncols=ncols, filename=filename, monitor=monitor, figsize=figsize, jobs=jobs, shard_pages=shard_pages)
+        elif self.backend == "native":
+            self._create_chord_book_native(rows, nrows=nrows, ncols=ncols, filename=filename, monitor=monitor, figsize=figsize)
+        else:
+            self._create_chord_book_matplotlib(rows, nrows=nrows, ncols=ncols, filename=filename, monitor=monitor, figsize=figsize)
+        monitor.remove()
+        if verbose>0:
+            print(f"Save at {toBLUE(filename)}")
+            if self.diagram_cache is not None and self.backend != "native":
+                print(f"Chord diagram cache: {self.diagram_cache.stats} (hit rate {self.diagram_cache.hit_rate:.1%})")
+        return filename
+
+    def chord_book_rows(self, rows, ncols=None, nrows=5, repeats=False):
+        """ Rows of the chord book as they are drawn, one per row of a page (see `create_chord_book_stream`)
+        @return rows  : Generator of (chords, lyrics) or `RepeatRow`
+        @return ncols : (int) Chords per row.
+        """
+        rows = (row2pair(row) for row in rows)
+        if ncols is None:
+            # Only the first page is read ahead.
+            head = [row for _,row in zip(range(nrows), rows)]
+            ncols = max([len(chords) for chords,_ in head] + [1])
+            rows = itertools.chain(head, rows)
+        rows = (row for chords,lyrics in rows for row in split_row(chords, lyrics, ncols))
+        if repeats:
+            rows = fold_repeats(rows, nrows=nrows, **(repeats if isinstance(repeats, dict) else {}))
+        return rows, ncols
+
+    def chord_book_page(self, data, page=1, nrows=5, figsize=A4SIZE, repeats=False):
+        """ A page of `create_chord_book` as a `Figure` (e.g. to save it as png.)
+        @params page : (int) Page number in the pdf (1 is the cover.)
+        """
+        ncols = max([len(v.get("chord")) for v in data.values()])
+        if page == 1:
+            fig = self.create_book_cover(nrows, ncols, figsize=figsize)
+        else:
+            rows, ncols = self.chord_book_rows(data.values(), ncols=ncols, nrows=nrows, repeats=repeats)
+            rows = list(itertools.islice(rows, max(page-2, 0)*nrows, max(page-1, 0)*nrows))
+            if len(rows) == 0:
+                raise ValueError(f"Couldn't find the page {page} in the chord book.")
+            fig = new_figure(figsize=figsize)
+            grid = fig.add_gridspec(nrows, ncols)
+            for i,row in enumerate(rows):
+                self.plot_chord_book_row(row, fig=fig, grid=grid, i=i, figsize=figsize)
+        fig.tight_layout()
+        return fig
 
-        # <Front Cover>
-        fig = self.create_book_cover(nrows, ncols, figsize=figsize)
-
-        # <Content>
-        n = -1
-        monitor = ProgressMonitor(max_iter=sum([len(e.get('chord')) for e in data.values()]), verbose=verbose, barname=filename)
-        for i,row in enumerate(data.values()):
-            if i%nrows==0:
-                fig.tight_layout()
-                plt.savefig(pp, format="pdf")
-                fig.clf()
-                fig = plt.figure(figsize=figsize)
-            chords = row.get("chord")
-            lyrics = row.get("lyric")
-            for j,(chord,lyric) in enumerate(zip(chords, lyrics)):
-                n+=1
-                monitor.report(n, chord=chord, lyric=lyric)
-                ax = plt.subplot2grid(shape=(nrows, ncols), loc=(i%5, j))
-                ax.set_title(lyric, fontsize=20)
-                ax.set_xlabel(chord, fontsize=30)
-
-                if chord == "": 
-                    ax = ax_clear(ax)
-                    continue
-                note, mode, d = ufret2pyguitar(chord)
-                bg,fc = self.notes2color.get(note)
-                ax.xaxis.label.set_color(bg)
-
-                # Select how to play (string 5, or string 6)
-                root_pos_5  = GUITAR_STRINGS.get(INIT_KEYS[1]).index(note)
-                root_pos_6  = GUITAR_STRINGS.get(INIT_KEYS[0]).index(note)
-                if root_pos_5 < root_pos_6:
-                    root_pos, string = (root_pos_5, 5)
-                else:
-                    root_pos, string = (root_pos_6, 6)
+    def plot_chord_book_row(self, row, fig, grid, i, figsize=A4SIZE):
+        """ Plot a row of the chord book (``(chords, lyrics)`` or `RepeatRow`) on the ``i``-th row of ``grid`` """
+        if isinstance(row, RepeatRow):
+            self.plot_repeat_row(row, ax=fig.add_subplot(grid[i, :]))
+            return
+        nrows, ncols = grid.get_geometry()
+        family = self.font_families
+        chords, lyrics = row
+        for j,(chord,lyric) in enumerate(zip(chords, lyrics)):
+            ax = fig.add_subplot(grid[i, j])
+            ax.set_title(lyric, fontsize=20, family=family)
+            ax.set_xlabel(chord, fontsize=30, family=family)
+
+            if chord == "": 
+                ax = ax_clear(ax)
+                continue
+            note, mode, string, root_pos = self.chord_cell(chord)
+            bg,fc = self.notes2color.get(note)
+            ax.xaxis.label.set_color(bg)
+            if self.diagram_cache is None:
+                ax = self.plot_chord_cell(note, mode, string, root_pos, ax=ax)
+            else:
+                cell_size = (figsize[0]/ncols, figsize[1]/nrows)
+                ax = plot_shared_image(ax, self.chord_diagram_image(note, mode, string, root_pos, figsize=cell_size))
+                ax = ax_clear(ax)
+
+    def _create_chord_book_matplotlib(self, rows, nrows, ncols, filename, monitor, figsize=A4SIZE, cover=True):
+        def flush(fig):
+            fig.tight_layout()
+            pp.savefig(fig)
+
+        with PdfPages(filename) as pp:
+            # <Front Cover>
+            if cover:
+                flush(self.create_book_cover(nrows, ncols, figsize=figsize))
+            # <Content>
+            fig = None
+            for i,row in enumerate(rows):
+                monitor.report(i, page=i//nrows+2)
+                if i%nrows==0:
+                    if fig is not None: flush(fig)
+                    fig = new_figure(figsize=figsize)
+                    grid = fig.add_gridspec(nrows, ncols)
+                self.plot_chord_book_row(row, fig=fig, grid=grid, i=i%nrows, figsize=figsize)
+            if fig is not None: flush(fig)
+
+    def _create_chord_book_native(self, rows, nrows, ncols, filename, monitor, figsize=A4SIZE, cover=True):
+        from .pdfbook import NativeChordBook
+        book = NativeChordBook(self, nrows=nrows, ncols=ncols, figsize=figsize, filename=filename)
+        if cover:
+            book.add_cover()
+        for i,row in enumerate(rows):
+            monitor.report(i, page=i//nrows+2)
+            if isinstance(row, RepeatRow):
+                book.add_repeat(row)
+            else:
+                book.add_row(*row)
+        book.save()
+
+    def _create_chord_book_sharded(self, rows, nrows, ncols, filename, monitor, figsize=A4SIZE, jobs=2, shard_pages=4):
+        tmpdir = tempfile.mkdtemp(prefix="pyguitar-")
+        def shards():
+            rows_ = iter(rows)
+            for index in itertools.count():
+                chunk = list(itertools.islice(rows_, nrows*shard_pages))
+                # The first shard has the cover, even without rows.
+                if index>0 and len(chunk)==0:
+                    return
+                yield dict(index=index, rows=chunk, nrows=nrows, ncols=ncols, figsize=figsize,
+                           filename=os.path.join(tmpdir, f"{index:06d}.pdf"))
+
+        doc = PDFDocument()
+        doc.open(filename)
+        num_pages = 0
+        try:
+            with multiprocessing.Pool(processes=jobs, initializer=_init_shard_worker, initargs=(self.settings,)) as pool:
+                # imap keeps the order of the shards, so pages are appended as soon as possible.
+                for index,path in enumerate(pool.imap(_render_shard, shards())):
+                    num_pages += doc.import_pages(PDFReader(path))
+                    os.remove(path)
+                    monitor.report(index, pages=num_pages)
+            doc.write(mediabox=[0, 0, figsize[0]*72, figsize[1]*72], info={
+                "Producer": "PyGuitar", "Title": self.name_ or self.name,
+            })
+        finally:
+            doc.close()
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
-                ax = self.plot_chord_layout(ax=ax)
-                ax = self.plot_chord(note, string=string, mode=mode, set_title=False, ax=ax)
-                ax.set_xlim([root_pos, min(root_pos+5, NUM_FRETS+1)])
-                ax.set_yticklabels([GUITAR_STRINGS.get(init_key)[root_pos-1] for init_key in INIT_KEYS], fontsize=20)
-        monitor.remove()
-        plt.savefig(pp, format="pdf")
-        fig.clf()
-        pp.close()
-        if verbose: print(f"Save at {toBLUE(filename)}")
+    @property
+    def settings(self):
+        """ Keyword arguments to create a `Guitar` drawing the same chord books (e.g. in worker processes.) """
+        return dict(
+            key=self.key, scale=self.scale, dark_mode=self.dark_mode, theme=self.theme, name=self.name_,
+            font_family=self.font_family, diagram_cache=self.diagram_cache is not None, backend=self.backend,
+            tuning=list(self.fretboard.tuning), num_frets=self.fretboard.num_frets,
+        )
+
+    def chord_cell(self, chord):
+        """ U-FRET chord -> (note, mode, string, root_pos) of its cell in the chord book. """
+        chord = parse_chord(chord)
+        # Flats (e.g. "B♭") are drawn as their sharp (e.g. "A#") like the notes of the scale.
+        note = NOTES[chord.root]
+        string, root_pos = self.find_chord_window(note)
+        return (note, chord.quality, string, root_pos)
+
+    def plot_repeat_row(self, row, ax):
+        """ Plot a `RepeatRow` (a reference to rows drawn earlier) over a whole row of the chord book. """
+        title, lyrics = repeat_text(row)
+        family = self.font_families
+        ax = ax_clear(ax)
+        ax.text(0.5, 0.55, title, fontsize=30, fontweight="bold", ha="center", va="center", transform=ax.transAxes, family=family)
+        ax.text(0.5, 0.3, lyrics, fontsize=16, ha="center", va="center", transform=ax.transAxes, family=family)
+        return ax
+
+    def find_chord_window(self, note):
+        """ Select how to play (string 5, or string 6), and return (string, root_pos) """
+        root_pos_5  = self.fretboard.fret(note, string=5)
+        root_pos_6  = self.fretboard.fret(note, string=6)
+        if root_pos_5 < root_pos_6:
+            return (5, root_pos_5)
+        return (6, root_pos_6)
+
+    def plot_chord_cell(self, note, mode, string, root_pos, ax=None):
+        """ Plot a chord zoomed into the frets around ``root_pos`` (a cell of the chord book) """
+        ax = self.plot_chord_layout(ax=ax)
+        ax = self.plot_chord(note, string=string, mode=mode, set_title=False, ax=ax)
+        ax.set_xlim([root_pos, min(root_pos+5, self.fretboard.num_frets+1)])
+        ax.set_yticklabels(self.fretboard.notes_at(root_pos-1), fontsize=20, family=self.font_families)
+        return ax
+
+    def chord_diagram_image(self, note, mode, string, root_pos, figsize, dpi=150):
+        """ RGBA image of `plot_chord_cell` (bottom row first), rendered once per distinct diagram. """
+        window = (root_pos, min(root_pos+5, self.fretboard.num_frets+1))
+        key = (note, self.resolve_mode(note, mode), string, self.theme, self.dark_mode, self.fretboard.tuning, window,
+               tuple(self.font_families), (round(figsize[0], 2), round(figsize[1], 2)), dpi)
+        def _render():
+            fig = new_figure(figsize=figsize, dpi=dpi)
+            ax = fig.add_subplot(1, 1, 1)
+            self.plot_chord_cell(note, mode, string, root_pos, ax=ax)
+            fig.tight_layout(pad=0.2)
+            fig.canvas.draw()
+            return np.asarray(fig.canvas.buffer_rgba())[::-1].copy()
+        if self.diagram_cache is None:
+            return _render()
+        return self.diagram_cache.get_or_create(key, _render)
 
     def export_chord_book(self, filename=None, fmt="pdf"):
         num_chords = len(self.chords)
         n_rows = num_chords//2+2 if num_chords%2 else num_chords//2+1
-        fig = plt.figure(figsize=(NUM_FRETS, NUM_STRINGS*n_rows))
+        fig = new_figure(figsize=(self.fretboard.num_frets, self.fretboard.num_strings*n_rows))
+        grid = fig.add_gridspec(n_rows, 2)
 
-        ax_strings = plt.subplot2grid((n_rows, 2), (0, 0), colspan=2)
+        ax_strings = fig.add_subplot(grid[0, :])
         ax_strings = self.plot_chord_layout(ax=ax_strings)
         ax_strings = self.plot_strings(ax=ax_strings)
 
         for i,chords in enumerate(self.chords):
-            root_pos  = GUITAR_STRINGS.get(INIT_KEYS[6-chords.get("string")]).index(chords.get("chode"))
+            root_pos  = self.fretboard.fret(chords.get("chode"), string=chords.get("string"))
 
-            ax = plt.subplot2grid(shape=(n_rows, 2), loc=(1+i//2, i%2))
+            ax = fig.add_subplot(grid[1+i//2, i%2])
             ax = self.plot_chord_layout(ax=ax)
             ax = self.plot_chord(**chords, ax=ax)
-            ax.set_xlim([root_pos, min(root_pos+5, 21)])
-            ax.set_yticklabels([GUITAR_STRINGS.get(init_key)[root_pos-1] for init_key in INIT_KEYS], fontsize=20)
+            ax.set_xlim([root_pos, min(root_pos+5, self.fretboard.num_frets+1)])
+            ax.set_yticklabels(self.fretboard.notes_at(root_pos-1), fontsize=20, family=self.font_families)
 
         if fmt.lower() == "pdf":
             fig.savefig(filename or self.pdf)
         else:
             fig.savefig(filename or self.png)
 
-    def plot_chord(self, chode, string=6, mode="major", set_title=True, ax=None):
-        if chode not in self.notes:
-            warnings.warn(f"{chode} is not included in the {self.notes}")
-        elif mode[:5] in ["major", "minor"]:
+    def resolve_mode(self, chode, mode):
+        """ Major/Minor of the chord is decided by its degree in the scale. """
+        if chode in self.notes and mode[:5] in ["major", "minor"]:
             if self.notes.index(chode) in [0,3,4]:
-                mode = "major" + mode[5:]
+                resolved = "major" + mode[5:]
             else:
-                mode = "minor" + mode[5:]
+                resolved = "minor" + mode[5:]
+            # e.g. "minor7th-flatted5th" has no major counterpart.
+            if resolved in CHORD_FORMULAS:
+                mode = resolved
+        return mode
+
+    @property
+    def voicings(self):
+        """ Generated voicings of every chord quality on this fretboard (shared, see `VoicingTable`) """
+        return get_voicing_table(self.fretboard)
 
-        positions = CHORDS.get(mode).get(str(string))
-        root_pos  = GUITAR_STRINGS.get(INIT_KEYS[6-string]).index(chode)
+    def chord_shape(self, mode, string=6):
+        """ Fret offsets from the root fret (False = mute) from the lowest string.
+        The hand-made shape in ``chord.json`` if any (only for standard tuning), otherwise the easiest generated voicing.
+        """
+        if self.fretboard.tuning[-len(INIT_KEYS):] == tuple(INIT_KEYS):
+            shape = CHORDS.get(mode, {}).get(str(string))
+            if shape:
+                return shape
+        shape = self.voicings.get(mode, string)
+        if shape is None:
+            raise ValueError(f"There is no voicing of {mode} with the root on the string {string}.")
+        return shape
+
+    def chord_markers(self, chode, string=6, mode="major"):
+        """ [(x, y, note, func), ...] of the chord (``mode`` should be already resolved.) """
+        fretboard = self.fretboard
+        positions = self.chord_shape(mode, string)
+        root_pos  = fretboard.fret(chode, string=string)
         is_mutes  = [isinstance(pos, bool) and pos==False for pos in positions]
         positions = [pos+root_pos for pos in positions]
-
-        ax = self.plot_chord_layout(ax)
-        for i,(y_val, pos, is_mute) in enumerate(zip([1,2,3,4,5,6], positions, is_mutes)):
-            x = pos+0.5
-            note = GUITAR_STRINGS.get(INIT_KEYS[i])[pos]
-            bg, fc = self.notes2color.get(note)
-            if 7-y_val == string: # Base Keys.
+        # Shapes are for the highest strings (extra low strings are not played.)
+        offset = fretboard.num_strings - len(positions)
+        markers = []
+        for i,(pos, is_mute) in enumerate(zip(positions, is_mutes), start=offset):
+            y_val = i+1
+            note = fretboard.note(i, pos)
+            if fretboard.num_strings-i == string: # Base Keys.
                 func = mpatches.star_hexagon
             elif is_mute: # Mute Keys.
                 func = mpatches.x_mark
             else: # Other Keys.
                 func = mpatches.Circle
-            ax.add_patch(func(xy=(x, y_val), radius=0.5, color=bg))
-            ax.annotate(text=note, xy=(x, y_val), color=fc, weight='bold', fontsize=25, ha='center', va='center')
+            markers.append((pos+0.5, y_val, note, func))
+        return markers
+
+    def plot_chord(self, chode, string=6, mode="major", set_title=True, ax=None):
+        if chode not in self.notes:
+            warnings.warn(f"{chode} is not included in the {self.notes}")
+        mode = self.resolve_mode(chode, mode)
+
+        markers = self.chord_markers(chode, string=string, mode=mode)
+        ax = self.plot_chord_layout(ax)
+        ax = self.plot_notes(ax, markers, radius=0.5, fontsize=25)
 
         if set_title:
-            ax.set_title(self.name + f" [{chode}({string}s){mode}]", fontsize=20)
+            ax.set_title(self.name + f" [{chode}({string}s){mode}]", fontsize=20, family=self.font_families)
         return ax
 
+    def strings_markers(self):
+        """ [(x, y, note, func), ...] of all notes in the scale. """
+        markers = []
+        pitches = self.fretboard.pitches
+        for row, fret in self.fretboard.positions(self.notes).tolist():
+            note = NOTES[pitches[row, fret]]
+            func = mpatches.star_hexagon if note == self.key else mpatches.Circle
+            markers.append((fret+0.5, row+1, note, func))
+        return markers
+
     def plot_strings(self, ax=None, set_title=True, width=20):
         ax = self.plot_chord_layout(ax)
-        for y_val, init_key in zip([1,2,3,4,5,6], INIT_KEYS):
-            string = GUITAR_STRINGS.get(init_key)
-            for i in self.notes_pos_in_string.get(init_key):
-                x = i+0.5
-                note = string[i]
-                bg, fc = self.notes2color.get(note)
-                if note == self.key:
-                    func = mpatches.star_hexagon
-                else:
-                    func = mpatches.Circle
-                ax.add_patch(func(xy=(x, y_val), radius=0.4, color=bg))
-                ax.annotate(text=note, xy=(x, y_val), color=fc, weight='bold', fontsize=20, ha='center', va='center')
+        ax = self.plot_notes(ax, self.strings_markers(), radius=0.4, fontsize=20)
         if set_title:
-            ax.set_title(self.name, fontsize=20)
+            ax.set_title(self.name, fontsize=20, family=self.font_families)
         return ax
 
+# The `Guitar` of each worker process of `Guitar._create_chord_book_sharded`
+_SHARD_GUITAR = None
+
+def _init_shard_worker(settings):
+    import matplotlib
+    matplotlib.use("Agg")
+    global _SHARD_GUITAR
+    _SHARD_GUITAR = Guitar(**settings)
+
+def _render_shard(shard):
+    """ Render the rows of one shard into its own pdf, and return the path. """
+    guitar = _SHARD_GUITAR
+    render = {
+        "matplotlib" : guitar._create_chord_book_matplotlib,
+        "native"     : guitar._create_chord_book_native,
+    }[guitar.backend]
+    render(shard["rows"], nrows=shard["nrows"], ncols=shard["ncols"], filename=shard["filename"],
+           monitor=ProgressMonitor(max_iter=None, verbose=-1), figsize=shard["figsize"], cover=shard["index"]==0)
+    return shard["filename"]
+
 def export_ufret_chordbooks(argv=sys.argv[1:]):
     parser = argparse.ArgumentParser(prog="export-ufret-chordbooks", add_help=True)
-    parser.add_argument("url",   type=str, help="URL of a page you want to create a pdf.")
+    parser.add_argument("url",   type=str, nargs="+", help="URL(s) of a page you want to create a pdf.")
     parser.add_argument("--key",   type=str, help="key of the music")
-    parser.add_argument("--scale", type=str, default="major", choices=["major"], help="The position of a CAPO.")
+    parser.add_argument("--scale", type=str, default="major", choices=["auto"]+list(SCALE2INTERVALS.keys()),
+                        help="Scale of the music. 'auto' detects it together with the key.")
     parser.add_argument("--capo",  type=int, default=0, help="The position of a CAPO.")
+    parser.add_argument("--workers",   type=int, default=1, help="The number of browser sessions used at the same time.")
+    parser.add_argument("--max-pages", type=int, default=100, help="Recycle a browser session after this many pages.")
+    parser.add_argument("--local-capo", action="store_true", help="Scrape at capo 0 and transpose locally.")
+    parser.add_argument("--no-cache",  action="store_true", help="Neither read nor write the scrape cache.")
+    parser.add_argument("--refresh",   action="store_true", help="Scrape again even if the page is cached.")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory of the scrape cache.")
+    parser.add_argument("--repeats",   action="store_true", help="Draw repeated blocks of rows once, as references to the first one.")
     args = parser.parse_args(argv)
 
-    title, key, data = get_ufret_chords(url=args.url, capo=args.capo)
-    find_key = {
-        "major": lambda data: find_key_major_scale(*get_chord_components(data=data))
-    }.get(args.scale)
-
-    guitar = Guitar(key=find_key(data), scale=args.scale, dark_mode=False, name=title, is_ja=True)
-    guitar.create_chord_book(data=data)
\ No newline at end of file
+    cache = None if args.no_cache else ScrapeCache(cache_dir=args.cache_dir)
+    with DriverPool(size=max(1, min(args.workers, len(args.url))), max_pages=args.max_pages) as pool:
+        results = get_ufret_chords_many(args.url, capo=args.capo, workers=args.workers, pool=pool,
+                                        cache=cache, refresh=args.refresh, local_capo=args.local_capo,
+                                        return_exceptions=True)
+        for url, result in results:
+            if isinstance(result, Exception):
+                print(f"Error occured in {toBLUE(url)}: {result}")
+                continue
+            title, capo, data = result
+            key, scale = args.key, args.scale
+            if key is None or scale=="auto":
+                try:
+                    best = best_key(data, key=key, scale=scale)
+                except ValueError as e:
+                    print(f"Error occured in {toBLUE(url)}: {e}")
+                    continue
+                key, scale = best.key, best.scale
+            guitar = Guitar(key=key, scale=scale, dark_mode=False, name=title, is_ja=True)
+            guitar.create_chord_book(data=data, repeats=args.repeats)
+    if cache is not None:
+        print(f"Scrape cache: {cache.stats}")
@@ -0,0 +1,278 @@
+# coding: utf-8
+""" Chord book writer which emits PDF directly (without matplotlib's PdfPages.)
+
+Every distinct chord diagram, the fretboard of the cover and the logo are
+written once as Form/Image XObjects and referenced from each page.
+"""
+from matplotlib import rcParams
+from matplotlib.colors import to_rgb
+
+from .env import LEN_OCTAVES, NOTES, A4SIZE
+from .utils.mpatches_utils import mpatches
+from .utils.font_utils import find_font_paths
+from .utils.section_utils import repeat_text
+from .utils.pdf_utils import PDFDocument, PDFFont, FontSet, Canvas, Name
+
+POINTS_PER_INCH = 72
+TICK_SIZE = 3.5
+TICK_PAD = 3.5
+SPINE_WIDTH = 0.8
+
+class NativeChordBook():
+    """
+    @params guitar  : (Guitar) Supplies colors, scale and chord shapes.
+    @params nrows   : (int) Rows per page.
+    @params ncols   : (int) Chords per row.
+    @params figsize : (tuple) Page size in inches (same as matplotlib's figsize.)
+    @params filename: (str) If given, each page is written to this file as soon as it is full.
+    ~~~
+    examples)
+    >>> book = NativeChordBook(guitar, nrows=5, ncols=6, filename="book.pdf")
+    >>> book.add_cover()
+    >>> for row in data.values():
+    >>>     book.add_row(row["chord"], row["lyric"])
+    >>> book.save()
+    """
+    def __init__(self, guitar, nrows=5, ncols=6, figsize=A4SIZE, filename=None):
+        self.guitar = guitar
+        self.nrows = nrows
+        self.ncols = ncols
+        self.width  = figsize[0]*POINTS_PER_INCH
+        self.height = figsize[1]*POINTS_PER_INCH
+        self.doc = PDFDocument()
+        if filename is not None:
+            self.doc.open(filename)
+        self.resources = self.doc.reserve()
+        self.xobjects = {}
+        self._fonts = {}
+        self.regular = self._fontset("normal")
+        self.bold = self._fontset("bold")
+        self._diagrams = {}
+        self._page = None
+        self._num_rows = 0
+        self.facecolor = to_rgb(guitar.facecoloer)
+        self.linecolor = to_rgb(guitar.linecolor)
+
+    def _fontset(self, weight):
+        fonts = []
+        for path in find_font_paths(self.guitar.font_family, weight=weight):
+            if path not in self._fonts:
+                font = PDFFont(path, resource_name=f"F{len(self._fonts)}")
+                font.ref = self.doc.reserve()
+                self._fonts[path] = font
+            fonts.append(self._fonts[path])
+        return FontSet(fonts)
+
+    # ---- geometry ----
+
+    @property
+    def cell_size(self):
+        return (self.width/self.ncols, self.height/self.nrows)
+
+    @property
+    def cell_axes(self):
+        """ (left, bottom, width, height) of the axes of a cell, relative to the cell. """
+        w, h = self.cell_size
+        left   = 8 + TICK_SIZE + TICK_PAD + 20*1.3
+        bottom = 8 + 30*1.2 + TICK_SIZE + TICK_PAD + 20*1.1
+        top    = 8 + 20*1.4
+        right  = 10
+        return (left, bottom, w-left-right, h-bottom-top)
+
+    # ---- drawing ----
+
+    def _add_form(self, name, canvas, bbox):
+        ref = self.doc.stream(canvas.getvalue(), {
+            "Type": Name("XObject"), "Subtype": Name("Form"), "BBox": bbox, "Resources": self.resources,
+        })
+        self.xobjects[name] = ref
+        return name
+
+    def draw_fretboard(self, canvas, w, h, xlim, markers, radius, fontsize,
+                       xticks=True, yticklabels=None, tick_fontsize=20, ylim=None):
+        """ Same picture as `Guitar.plot_chord_layout` + `Guitar.plot_notes` on a (w x h) axes. """
+        fretboard = self.guitar.fretboard
+        num_frets, num_strings = fretboard.num_frets, fretboard.num_strings
+        yticklabels = yticklabels or fretboard.tuning
+        (x0, x1), (y0, y1) = xlim, ylim or (0.4, num_strings+0.5)
+        X = lambda x: (x-x0)/(x1-x0)*w
+        Y = lambda y: (y-y0)/(y1-y0)*h
+        canvas.fill_color(self.facecolor)
+        canvas.rect(0, 0, w, h)
+
+        canvas.save()
+        canvas.clip_rect(0, 0, w, h)
+        # Markers (zorder 1)
+        for x, y, note, func in markers:
+            bg, fc = self.guitar.notes2color.get(note)
+            canvas.fill_color(bg)
+            canvas.stroke_color(bg)
+            canvas.line_width(1)
+            if func is mpatches.Circle:
+                canvas.ellipse(X(x), Y(y), radius*w/(x1-x0), radius*h/(y1-y0), op="B")
+            else:
+                canvas.polygon([(X(px), Y(py)) for px,py in func(xy=(x, y), radius=radius).get_xy()], op="B")
+        # Strings & Frets (zorder 2)
+        canvas.stroke_color(to_rgb("gray"))
+        canvas.line_width(rcParams['lines.linewidth'])
+        for i in range(1, num_strings+1):
+            canvas.line(X(0), Y(i), X(num_frets+1), Y(i))
+        for i in range(1, num_frets+1):
+            if not x0 <= i <= x1:
+                continue
+            is_octave = i%LEN_OCTAVES==0
+            canvas.stroke_color(to_rgb("gray") if is_octave else self.linecolor)
+            canvas.line_width(3.5 if is_octave else 0.5)
+            canvas.line(X(i), 0, X(i), h)
+        # Labels (zorder 3)
+        for x, y, note, func in markers:
+            bg, fc = self.guitar.notes2color.get(note)
+            canvas.text(X(x), Y(y), note, self.bold, fontsize, color=fc, ha="center", va="center")
+        canvas.restore()
+
+        # Spines & Ticks
+        canvas.stroke_color((0, 0, 0))
+        canvas.line_width(SPINE_WIDTH)
+        canvas.rect(0, 0, w, h, op="S")
+        if xticks:
+            for i in range(num_frets+1):
+                x = i+0.5
+                if not x0 <= x <= x1:
+                    continue
+                canvas.line(X(x), 0, X(x), -TICK_SIZE)
+                canvas.text(X(x), -TICK_SIZE-TICK_PAD, str(i), self.regular, tick_fontsize, ha="center", va="top")
+        for y,label in zip(range(1, num_strings+1), yticklabels):
+            canvas.line(0, Y(y), -TICK_SIZE, Y(y))
+            canvas.text(-TICK_SIZE-TICK_PAD, Y(y), label, self.regular, tick_fontsize, ha="right", va="center")
+
+    def chord_diagram(self, note, mode, string, root_pos):
+        """ Name of the Form XObject of the chord (created on first use.) """
+        mode = self.guitar.resolve_mode(note, mode)
+        key = (note, mode, string, root_pos)
+        if key not in self._diagrams:
+            _, _, w, h = self.cell_axes
+            canvas = Canvas()
+            self.draw_fretboard(
+                canvas, w, h,
+                xlim=(root_pos, min(root_pos+5, self.guitar.fretboard.num_frets+1)),
+                markers=self.guitar.chord_markers(note, string=string, mode=mode),
+                radius=0.5, fontsize=25,
+                yticklabels=self.guitar.fretboard.notes_at(root_pos-1),
+            )
+            margin = 60
+            self._diagrams[key] = self._add_form(f"D{len(self._diagrams)}", canvas, [-margin, -margin, w+margin, h+margin])
+        return self._diagrams[key]
+
+    def _logo(self):
+        if "Logo" not in self.xobjects:
+            import numpy as np
+            from .utils.decorate_utils import load_logo
+            img = load_logo()
+            if img.dtype != np.uint8:
+                img = (np.clip(img, 0, 1)*255).astype(np.uint8)
+            h, w = img.shape[:2]
+            attrs = {"Type": Name("XObject"), "Subtype": Name("Image"), "Width": w, "Height": h,
+                     "ColorSpace": Name("DeviceRGB"), "BitsPerComponent": 8}
+            if img.ndim==3 and img.shape[2]==4:
+                attrs["SMask"] = self.doc.stream(img[:,:,3].tobytes(), {
+                    "Type": Name("XObject"), "Subtype": Name("Image"), "Width": w, "Height": h,
+                    "ColorSpace": Name("DeviceGray"), "BitsPerComponent": 8,
+                })
+            rgb = img[:,:,:3] if img.ndim==3 else np.repeat(img[:,:,None], 3, axis=2)
+            self.xobjects["Logo"] = self.doc.stream(np.ascontiguousarray(rgb).tobytes(), attrs)
+            self._logo_shape = (w, h)
+        return "Logo"
+
+    # ---- pages ----
+
+    def _new_page(self):
+        self._flush_page()
+        self._page = Canvas()
+        self._num_rows = 0
+
+    def _flush_page(self):
+        if self._page is not None:
+            self.doc.add_page(self.doc.stream(self._page.getvalue()), self.resources)
+            self._page = None
+
+    def add_cover(self, title_size=70):
+        """ Same contents as `Guitar.create_book_cover` """
+        self._new_page()
+        canvas = self._page
+        row_h = self.height/self.nrows
+        row_top = lambda r: self.height - r*row_h
+        # Logo
+        name = self._logo()
+        w, h = self._logo_shape
+        scale = min(self.width*0.8/w, row_h*0.9/h)
+        canvas.draw_xobject(name, (self.width-w*scale)/2, row_top(1)+(row_h-h*scale)/2, w*scale, h*scale)
+        # Title
+        if self.nrows>=2:
+            canvas.text(self.width/2, row_top(1)-row_h/2, self.guitar.name_, self.bold, title_size, ha="center", va="center")
+        # Key & scale
+        if self.nrows>=3:
+            canvas.text(self.width/2, row_top(2)-row_h*0.2, f"- {self.guitar.name} -", self.bold, 50, ha="center", va="center")
+        # Strings
+        if self.nrows>=4:
+            left, bottom, right, top = 40, 40, 15, 30
+            w, h = self.width-left-right, row_h-bottom-top
+            strings = Canvas()
+            self.draw_fretboard(strings, w, h, xlim=(0.5, self.guitar.fretboard.num_frets+1), markers=self.guitar.strings_markers(), radius=0.4, fontsize=20)
+            strings.text(w/2, h+6, self.guitar.name, self.regular, 20, ha="center", va="baseline")
+            name = self._add_form("Strings", strings, [-left, -bottom, w+right, h+top])
+            canvas.draw_xobject(name, left, row_top(4)+bottom)
+        # Color theme
+        if self.nrows>=5:
+            y = row_top(5) + row_h/2
+            step = self.width/LEN_OCTAVES
+            canvas.text(self.width/2, y+step*0.5, self.guitar.theme, self.regular, 12, ha="center", va="baseline")
+            for i,note in enumerate(NOTES):
+                bg, fc = self.guitar.notes2color.get(note)
+                x = step*(i+0.5)
+                canvas.fill_color(bg)
+                canvas.ellipse(x, y, step*0.3, step*0.3)
+                canvas.text(x, y, note, self.bold, 20, color=fc, ha="center", va="center")
+        self._flush_page()
+
+    def add_row(self, chords, lyrics):
+        """ Add a row of chords (a new page is started every ``nrows`` rows.) """
+        if self._page is None or self._num_rows == self.nrows:
+            self._new_page()
+        canvas = self._page
+        cw, ch = self.cell_size
+        left, bottom, w, h = self.cell_axes
+        cy = self.height - (self._num_rows+1)*ch
+        for j,(chord,lyric) in enumerate(zip(chords, lyrics)):
+            cx = j*cw
+            canvas.text(cx+left+w/2, cy+bottom+h+6, lyric, self.regular, 20, ha="center", va="baseline")
+            if chord == "":
+                continue
+            note, mode, string, root_pos = self.guitar.chord_cell(chord)
+            bg, fc = self.guitar.notes2color.get(note)
+            canvas.text(cx+left+w/2, cy+8, chord, self.regular, 30, color=bg, ha="center", va="bottom")
+            canvas.draw_xobject(self.chord_diagram(note, mode, string, root_pos), cx+left, cy+bottom)
+        self._num_rows += 1
+
+    def add_repeat(self, row):
+        """ Add a `RepeatRow` (a reference to rows drawn earlier) in place of a row of chords. """
+        if self._page is None or self._num_rows == self.nrows:
+            self._new_page()
+        title, lyrics = repeat_text(row)
+        ch = self.cell_size[1]
+        cy = self.height - (self._num_rows+1)*ch
+        self._page.text(self.width/2, cy+ch*0.55, title, self.bold, 30, ha="center", va="center")
+        self._page.text(self.width/2, cy+ch*0.3, lyrics, self.regular, 16, ha="center", va="center")
+        self._num_rows += 1
+
+    def save(self, filename=None):
+        """ ``filename`` is only needed if it wasn't given to the constructor. """
+        self._flush_page()
+        for font in self._fonts.values():
+            font.embed(self.doc)
+        self.doc.set(self.resources, {
+            "Font"    : {font.resource_name: font.ref for font in self._fonts.values()},
+            "XObject" : self.xobjects,
+        })
+        self.doc.write(filename, mediabox=[0, 0, self.width, self.height], info={
+            "Producer": "PyGuitar", "Title": self.guitar.name_ or self.guitar.name,
+        })
@@ -0,0 +1,283 @@
+# coding: utf-8
+""" Pipelined batch mode of `export_ufret_chordbooks` for a file of URLs. Pages are scraped
+concurrently (asyncio over threads, as browsers and sockets are I/O bound) while earlier songs are
+analyzed and rendered by a pool of worker processes. Scraped songs wait in a bounded queue, so
+scraping pauses when rendering falls behind (backpressure), and a song which fails at any stage is
+reported without stopping the others.
+
+$ ufret-batch urls.txt -o books --scrapers 4 --jobs 2
+$ ufret-batch urls.txt -o books --fetch http --report report.json  # plain HTTP, no browser
+
+urls.txt has one URL per line (blank lines and lines starting with "#" are ignored.)
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import traceback
+import multiprocessing
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .env import SCALE2INTERVALS
+from .ufret import format_capo, get_ufret_chords, get_ufret_chords_from_html
+from .utils.cache_utils import ScrapeCache
+from .utils.driver_utils import DriverPool
+from .utils.generic_utils import toBLUE, toGREEN, toRED, handleKeyError
+from .utils.transpose_utils import transpose_data
+
+FETCHERS = ["browser", "http"]
+
+def read_urls(path):
+    """ URLs in the file at ``path`` ("-" is stdin), skipping blank lines and "#" comments. """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, mode="r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+def get_ufret_chords_http(url, capo="0", cache=None, refresh=False, timeout=30):
+    """ `get_ufret_chords` without a browser: download the page, parse it with `get_ufret_chords_from_html`
+    and transpose it locally for the ``capo`` (the capo can't be chosen in a page which isn't running.)
+    Results are cached in ``cache`` at capo 0, same as ``local_capo=True``.
+    """
+    capo = format_capo(capo)
+    result = None
+    if cache is not None and not refresh:
+        result = cache.get(url, "0")
+    if result is None:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            html = response.read().decode(response.headers.get_content_charset() or "utf-8")
+        result = get_ufret_chords_from_html(html, capo="0")
+        if cache is not None:
+            cache.set(url, "0", result)
+    title, _, data = result
+    return (title, capo, data if capo=="0" else transpose_data(data, int(capo)))
+
+def init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    from . import main
+
+def render_song(title, data, output_dir=".", key=None, scale="major", theme="rainbow", nrows=5,
+                backend="matplotlib", repeats=False):
+    """ Detect the key of a scraped song and render its chord book (in a worker process.)
+    @return (dict) key, scale, output, detect_seconds and render_seconds.
+    """
+    from .main import Guitar
+    from .utils.key_utils import best_key
+
+    start = time.perf_counter()
+    if key is None or scale=="auto":
+        # Same as `export_ufret_chordbooks`
+        best = best_key(data, key=key, scale=scale)
+        key, scale = best.key, best.scale
+    detected = time.perf_counter()
+    guitar = Guitar(key=key, scale=scale, dark_mode=False, theme=theme, name=title.replace("/", "|"),
+                    is_ja=True, backend=backend)
+    filename = guitar.create_chord_book(data=data, nrows=nrows, filename=os.path.join(output_dir, guitar.pdf),
+                                        verbose=-1, repeats=repeats)
+    return {
+        "key": key, "scale": scale, "output": filename,
+        "detect_seconds": detected-start, "render_seconds": time.perf_counter()-detected,
+    }
+
+class _Renderers():
+    """ Process pool of `render_song`, replaced if a worker dies, so that only the song being
+    rendered by it (and those in the same pool at that time) fail.
+    """
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.executor = self._create()
+
+    def _create(self):
+        return ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=init_worker)
+
+    async def run(self, *args, **kwargs):
+        executor = self.executor
+        try:
+            return await asyncio.wrap_future(executor.submit(render_song, *args, **kwargs))
+        except BrokenProcessPool:
+            if self.executor is executor:
+                self.executor = self._create()
+                executor.shutdown(wait=False)
+            raise
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+async def run_pipeline(urls, output_dir=".", capo="0", fetch="browser", scrapers=4, jobs=2, queue_size=None,
+                       pool=None, cache=None, refresh=False, local_capo=False, max_pages=100, timeout=30,
+                       on_result=None, **render_kwargs):
+    """ Scrape, analyze and render every song of ``urls``, overlapping the stages.
+    @params urls         : (list) URLs of U-FRET pages.
+    @params output_dir   : (str)  Chord books are saved here.
+    @params capo         : (str, int) The position of a CAPO (same for all urls.)
+    @params fetch        : (str)  "browser" (`get_ufret_chords`) or "http" (`get_ufret_chords_http`)
+    @params scrapers     : (int)  The number of pages scraped at the same time.
+    @params jobs         : (int)  The number of worker processes analyzing and rendering songs.
+    @params queue_size   : (int)  Scraped songs waiting for a worker. Scraping pauses while it's full. (default: 2*jobs)
+    @params pool         : (DriverPool) Browser sessions. If None, a pool of size ``scrapers`` is created (and closed.)
+    @params cache        : (ScrapeCache) see `get_ufret_chords`
+    @params refresh      : (bool) see `get_ufret_chords`
+    @params local_capo   : (bool) see `get_ufret_chords`
+    @params timeout      : (float) Timeout [s] of downloading a page (``fetch="http"``)
+    @params on_result    : (callable) Called with the summary of each song as soon as it is finished.
+    @params render_kwargs: key, scale, theme, nrows, backend, repeats of `render_song`
+    @return summaries    : (list) A dict per url (in the order of ``urls``) with its "status" ("ok" or "error"),
+                                  the "stage" it failed at ("scrape" or "render"), "error", and seconds of each stage.
+    """
+    handleKeyError(lst=FETCHERS, fetch=fetch)
+    urls = list(urls)
+    scrapers = max(1, min(scrapers, len(urls)))
+    jobs = max(1, min(jobs, len(urls)))
+    loop = asyncio.get_running_loop()
+    url_queue  = asyncio.Queue(maxsize=scrapers)
+    song_queue = asyncio.Queue(maxsize=queue_size or 2*jobs)
+    summaries = {}
+
+    def finish(summary, stage=None, error=None):
+        summary["status"] = "ok" if error is None else "error"
+        summary["stage"]  = stage
+        summary["error"]  = error
+        summaries[summary["index"]] = summary
+        if on_result is not None:
+            on_result(summary)
+
+    own_pool = fetch=="browser" and pool is None
+    if own_pool:
+        pool = DriverPool(size=scrapers, max_pages=max_pages)
+    if fetch=="browser":
+        scrape = lambda url: get_ufret_chords(url, capo=capo, pool=pool, cache=cache, refresh=refresh, local_capo=local_capo)
+    else:
+        scrape = lambda url: get_ufret_chords_http(url, capo=capo, cache=cache, refresh=refresh, timeout=timeout)
+    threads = ThreadPoolExecutor(max_workers=scrapers, thread_name_prefix="pyguitar-scraper")
+    renderers = _Renderers(jobs=jobs)
+
+    async def produce():
+        for i,url in enumerate(urls):
+            await url_queue.put((i, url))
+        for _ in range(scrapers):
+            await url_queue.put(None)
+
+    async def scraper():
+        while True:
+            item = await url_queue.get()
+            if item is None:
+                return
+            i, url = item
+            summary = {"index": i, "url": url, "title": None, "capo": None, "key": None, "scale": None, "output": None,
+                       "scrape_seconds": None, "detect_seconds": None, "render_seconds": None, "waited_seconds": None}
+            start = time.perf_counter()
+            try:
+                title, summary["capo"], data = await loop.run_in_executor(threads, scrape, url)
+            except Exception:
+                summary["scrape_seconds"] = time.perf_counter() - start
+                finish(summary, stage="scrape", error=traceback.format_exc())
+                continue
+            summary["title"] = title
+            summary["scrape_seconds"] = time.perf_counter() - start
+            # Blocks while the workers are behind.
+            await song_queue.put((summary, title, data, time.perf_counter()))
+
+    async def renderer():
+        while True:
+            item = await song_queue.get()
+            if item is None:
+                return
+            summary, title, data, queued = item
+            summary["waited_seconds"] = time.perf_counter() - queued
+            try:
+                summary.update(await renderers.run(title, data, output_dir=output_dir, **render_kwargs))
+            except Exception:
+                finish(summary, stage="render", error=traceback.format_exc())
+            else:
+                finish(summary)
+
+    async def scrape_all():
+        await asyncio.gather(produce(), *[scraper() for _ in range(scrapers)])
+        for _ in range(jobs):
+            await song_queue.put(None)
+
+    try:
+        await asyncio.gather(scrape_all(), *[renderer() for _ in range(jobs)])
+    finally:
+        threads.shutdown(wait=False, cancel_futures=True)
+        renderers.close()
+        if own_pool:
+            pool.close()
+    return [summaries[i] for i in sorted(summaries.keys())]
+
+def export_ufret_pipeline(urls, **kwargs):
+    """ Synchronous `run_pipeline` """
+    return asyncio.run(run_pipeline(urls, **kwargs))
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog="ufret-batch", add_help=True)
+    parser.add_argument("urls",  type=str, help="File with a URL per line ('-' for stdin.)")
+    parser.add_argument("-o", "--output", type=str, default=".", help="Directory of the chord books.")
+    parser.add_argument("--key",   type=str, help="key of the music")
+    parser.add_argument("--scale", type=str, default="major", choices=["auto"]+list(SCALE2INTERVALS.keys()),
+                        help="Scale of the music. 'auto' detects it together with the key.")
+    parser.add_argument("--capo",  type=int, default=0, help="The position of a CAPO.")
+    parser.add_argument("--theme", type=str, default="rainbow")
+    parser.add_argument("--nrows", type=int, default=5)
+    parser.add_argument("--backend",    type=str, default="matplotlib", choices=["matplotlib", "native"])
+    parser.add_argument("--repeats",    action="store_true", help="Draw repeated blocks of rows once, as references to the first one.")
+    parser.add_argument("--fetch",      type=str, default="browser", choices=FETCHERS, help="Scrape with browsers, or download the html.")
+    parser.add_argument("--scrapers",   type=int, default=4, help="The number of pages scraped at the same time.")
+    parser.add_argument("-j", "--jobs", type=int, default=max(1, (os.cpu_count() or 1)-1), help="The number of worker processes.")
+    parser.add_argument("--queue-size", type=int, help="Scraped songs waiting for a worker (default: 2*jobs)")
+    parser.add_argument("--max-pages",  type=int, default=100, help="Recycle a browser session after this many pages.")
+    parser.add_argument("--timeout",    type=float, default=30, help="Timeout [s] of downloading a page (--fetch http)")
+    parser.add_argument("--local-capo", action="store_true", help="Scrape at capo 0 and transpose locally.")
+    parser.add_argument("--no-cache",   action="store_true", help="Neither read nor write the scrape cache.")
+    parser.add_argument("--refresh",    action="store_true", help="Scrape again even if the page is cached.")
+    parser.add_argument("--cache-dir",  type=str, default=None, help="Directory of the scrape cache.")
+    parser.add_argument("--report",     type=str, help="Save the summary as json here.")
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args.urls)
+    if len(urls)==0:
+        print(f"No URLs in {toBLUE(args.urls)}")
+        return 0
+    os.makedirs(args.output, exist_ok=True)
+    cache = None if args.no_cache else ScrapeCache(cache_dir=args.cache_dir)
+    digits = len(str(len(urls)))
+    done = []
+    def on_result(summary):
+        done.append(summary)
+        status = toGREEN(summary["status"]) if summary["status"]=="ok" else toRED(f"{summary['stage']} error")
+        print(f"[{len(done):>{digits}}/{len(urls)}] {status} {toBLUE(summary['url'])} {summary['title'] or ''}")
+
+    start = time.perf_counter()
+    summaries = export_ufret_pipeline(
+        urls, output_dir=args.output, capo=args.capo, fetch=args.fetch, scrapers=args.scrapers, jobs=args.jobs,
+        queue_size=args.queue_size, cache=cache, refresh=args.refresh, local_capo=args.local_capo,
+        max_pages=args.max_pages, timeout=args.timeout, on_result=on_result,
+        key=args.key, scale=args.scale, theme=args.theme, nrows=args.nrows, backend=args.backend, repeats=args.repeats,
+    )
+    wall_time = time.perf_counter() - start
+
+    failures = [s for s in summaries if s["status"] != "ok"]
+    print(f"\n{len(summaries)-len(failures)} succeeded, {len(failures)} failed in {wall_time:.2f}[s]")
+    for s in failures:
+        print(f"\n{toRED(s['stage'])} {toBLUE(s['url'])}\n{s['error']}")
+    if cache is not None:
+        print(f"Scrape cache: {cache.stats}")
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump({
+                "wall_time" : wall_time,
+                "scrapers"  : args.scrapers,
+                "jobs"      : args.jobs,
+                "succeeded" : len(summaries)-len(failures),
+                "failed"    : len(failures),
+                "songs"     : summaries,
+            }, f, indent=2, ensure_ascii=False)
+    return 1 if len(failures)>0 else 0
@@ -0,0 +1,298 @@
+# coding: utf-8
+""" Local HTTP server rendering chord books, so that each song doesn't pay for starting python and
+importing matplotlib. Songs are rendered by warm worker processes, identical requests in flight
+are rendered once, and results are kept in a content-addressed cache (`ResultCache`). No network
+access is needed.
+
+$ pyguitar-server --port 8000 --workers 2
+$ curl -X POST localhost:8000/render -o book.pdf \
+       -d '{"data": {"0": {"chord": ["G", "D"], "lyric": ["la", "la"]}}, "options": {"theme": "viridis"}}'
+
+POST /render  {"data": {i: {"chord": [], "lyric": []}},   # required
+               "options": {...},                          # `Guitar` options, nrows, repeats, figsize
+               "format": "pdf" | "png",                   # png is one page ("page", "dpi")
+               "page": 2, "dpi": 100}
+GET  /health  Status, counters of the service and the cache.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import __version__
+from .env import A4SIZE, NOTES, SCALE2INTERVALS
+from .main import Guitar
+from .utils.cache_utils import ResultCache
+from .utils.generic_utils import toBLUE, toGREEN
+from .utils.key_utils import best_key
+
+# Options of a request -> default (None: `Guitar` decides.)
+GUITAR_OPTIONS = {
+    "key": None, "scale": "major", "dark_mode": False, "theme": "rainbow", "name": "",
+    "font_family": "Comic Sans MS", "is_ja": False, "backend": "matplotlib", "tuning": "standard",
+    "num_frets": None, "diagram_cache": False,
+}
+BOOK_OPTIONS = {"nrows": 5, "repeats": False, "figsize": list(A4SIZE)}
+FORMATS = {"pdf": "application/pdf", "png": "image/png"}
+MAX_BODY_BYTES = 16*1024*1024
+# Song rendered by each worker when it starts, so that the first request doesn't pay for the rest of the imports.
+WARMUP_SONG = {"0": {"chord": ["C", "Am", "F", "G7"], "lyric": ["warm", "up", "the", "worker"]}}
+# Colors of `handleKeyError` (``toBLUE``, ...) are for terminals, not for HTTP clients.
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
+class BadRequest(ValueError):
+    """ The request can't be rendered (400 Bad Request.) """
+
+def normalize_request(body):
+    """ Parsed json of a request -> dict with every option filled in, so that requests for the same
+    output are equal (and share the key of `ResultCache`)
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("data"), dict) or len(body["data"])==0:
+        raise BadRequest("'data' should be {i: {'chord': [], 'lyric': []}} with at least one row.")
+    data = {}
+    for i,row in body["data"].items():
+        if not (isinstance(row, dict) and isinstance(row.get("chord"), list) and isinstance(row.get("lyric"), list)):
+            raise BadRequest(f"Row {i} of 'data' should be {{'chord': [], 'lyric': []}}")
+        for name in ["chord", "lyric"]:
+            invalid = [item for item in row[name] if not isinstance(item, str)]
+            if len(invalid)>0:
+                raise BadRequest(f"Each '{name}' of row {i} should be a string, but got {invalid[0]!r}")
+        data[str(i)] = {"chord": row["chord"], "lyric": row["lyric"]}
+    options = body.get("options", {})
+    if not isinstance(options, dict):
+        raise BadRequest("'options' should be an object.")
+    unknown = [k for k in options.keys() if k not in GUITAR_OPTIONS and k not in BOOK_OPTIONS]
+    if len(unknown)>0:
+        known = ', '.join([f"'{k}'" for k in list(GUITAR_OPTIONS) + list(BOOK_OPTIONS)])
+        raise BadRequest(f"Unknown options {unknown}. Please chose them from {known}.")
+    key = options.get("key")
+    if key is not None and key not in NOTES:
+        raise BadRequest(f"'key' should be one of {NOTES}, but got '{key}'")
+    scale = options.get("scale", GUITAR_OPTIONS["scale"])
+    if scale != "auto" and scale not in SCALE2INTERVALS:
+        raise BadRequest(f"'scale' should be 'auto' or one of {list(SCALE2INTERVALS)}, but got '{scale}'")
+    fmt = body.get("format", "pdf")
+    if fmt not in FORMATS:
+        raise BadRequest(f"'format' should be one of {list(FORMATS)}, but got '{fmt}'")
+    numbers = {}
+    for name,default in [("page", 1), ("dpi", 100)]:
+        try:
+            numbers[name] = int(body.get(name, default))
+        except (TypeError, ValueError):
+            numbers[name] = 0
+        if numbers[name] < 1:
+            raise BadRequest(f"'{name}' should be a positive integer, but got {body.get(name)!r}")
+    return {
+        "data"   : data,
+        "format" : fmt,
+        "page"   : numbers["page"] if fmt=="png" else None,
+        "dpi"    : numbers["dpi"] if fmt=="png" else None,
+        "guitar" : {k: options.get(k, v) for k,v in GUITAR_OPTIONS.items()},
+        "book"   : {k: options.get(k, v) for k,v in BOOK_OPTIONS.items()},
+    }
+
+def render_request(request):
+    """ Render a `normalize_request` and return the bytes of the pdf/png (in a worker process.) """
+    options = {k: v for k,v in request["guitar"].items() if v is not None}
+    data = request["data"]
+    book = dict(request["book"], figsize=tuple(request["book"]["figsize"]))
+    try:
+        if "key" not in options or options["scale"]=="auto":
+            # Same as `export_ufret_chordbooks` (A ValueError is a BadRequest below.)
+            best = best_key(data, key=options.get("key"), scale=options["scale"])
+            options["key"], options["scale"] = best.key, best.scale
+        guitar = Guitar(**options)
+        if request["format"] == "png":
+            fig = guitar.chord_book_page(data, page=request["page"], **book)
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=request["dpi"])
+            return buf.getvalue()
+        with tempfile.TemporaryDirectory(prefix="pyguitar-") as tmpdir:
+            filename = os.path.join(tmpdir, "book.pdf")
+            guitar.create_chord_book(data, filename=filename, verbose=-1, **book)
+            with open(filename, mode="rb") as f:
+                return f.read()
+    except (KeyError, ValueError) as e:
+        # Unknown chords, themes, keys, ... (`handleKeyError` and the parsers.)
+        # (``str`` of a KeyError is the repr of its message.)
+        message = e.args[0] if len(e.args)>0 and isinstance(e.args[0], str) else str(e)
+        raise BadRequest(ANSI_ESCAPE_PATTERN.sub("", message)) from None
+
+def init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    render_request(normalize_request({"data": WARMUP_SONG, "options": {"key": "C"}}))
+
+def _worker_pid():
+    return os.getpid()
+
+class RenderService():
+    """ Renders requests (`normalize_request`) with a pool of warm worker processes.
+    Requests are answered from ``cache`` if possible, and requests identical to one being rendered
+    wait for it instead of being rendered again.
+    @params workers : (int) Number of worker processes.
+    @params cache   : (ResultCache) None renders every request.
+    @params warm    : (bool) Start every worker (and render `WARMUP_SONG`) before returning.
+    ~~~
+    examples)
+    >>> service = RenderService(workers=2, cache=ResultCache())
+    >>> content, status = service.render(normalize_request({"data": data, "options": {"theme": "magma"}}))
+    >>> status
+    'miss'
+    """
+    def __init__(self, workers=2, cache=None, warm=True):
+        self.workers = workers
+        self.cache = cache
+        # Workers are started fresh ("spawn") rather than forked from a process running server threads.
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=init_worker)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hits": 0, "coalesced": 0, "renders": 0, "errors": 0}
+        if warm:
+            self.warm_up()
+
+    def warm_up(self):
+        """ Start all workers, and wait until they are initialized. """
+        return sorted({future.result() for future in [self.executor.submit(_worker_pid) for _ in range(self.workers)]})
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def submit(self, request):
+        """ Return (Future of the bytes, "hit" | "coalesced" | "miss") """
+        self._count("requests")
+        key = ResultCache.make_key({"request": request, "version": __version__})
+        ext = "." + request["format"]
+        if self.cache is not None:
+            content = self.cache.get(key, ext)
+            if content is not None:
+                self._count("hits")
+                future = Future()
+                future.set_result(content)
+                return future, "hit"
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, "coalesced"
+            future = self.executor.submit(render_request, request)
+            self._inflight[key] = future
+            self.stats["renders"] += 1
+        future.add_done_callback(lambda future: self._done(key, ext, future))
+        return future, "miss"
+
+    def _done(self, key, ext, future):
+        if future.cancelled() or future.exception() is not None:
+            self._count("errors")
+        elif self.cache is not None:
+            # Stored before leaving ``_inflight``, so that identical requests find one of them.
+            self.cache.set(key, ext, future.result())
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def render(self, request, timeout=None):
+        """ Return (bytes, status) of `submit`, waiting at most ``timeout`` seconds. """
+        future, status = self.submit(request)
+        return future.result(timeout=timeout), status
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = f"PyGuitar/{__version__}"
+
+    def _send(self, code, content, content_type="application/json", headers={}):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for k,v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, code, obj):
+        self._send(code, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        service = self.server.service
+        self._send_json(200, {
+            "status": "ok", "version": __version__, "workers": service.workers, "stats": service.stats,
+            "cache": None if service.cache is None else service.cache.stats,
+        })
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/render":
+            return self._send_json(404, {"error": f"Unknown path {self.path}"})
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            return self._send_json(413, {"error": f"The request is larger than {MAX_BODY_BYTES} bytes."})
+        start = time.perf_counter()
+        try:
+            request = normalize_request(json.loads(self.rfile.read(length).decode("utf-8")))
+            content, status = self.server.service.render(request, timeout=self.server.render_timeout)
+        except (BadRequest, UnicodeDecodeError, json.JSONDecodeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        except TimeoutError:
+            return self._send_json(504, {"error": f"Rendering took more than {self.server.render_timeout}[s]"})
+        except Exception as e:
+            return self._send_json(500, {"error": f"{e.__class__.__name__}: {e}"})
+        self._send(200, content, content_type=FORMATS[request["format"]], headers={
+            "X-PyGuitar-Cache": status, "X-PyGuitar-Seconds": f"{time.perf_counter()-start:.3f}",
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_server(host="127.0.0.1", port=8000, workers=2, cache_dir=None, max_bytes=512*1024*1024,
+                  no_cache=False, timeout=120, verbose=True):
+    """ Create a `ThreadingHTTPServer` with a warm `RenderService` (``server.service``)
+    Use ``port=0`` for any free port (``server.server_address``). Call ``server.serve_forever()``,
+    and ``server.service.close()`` after ``server.shutdown()``.
+    """
+    service = RenderService(workers=workers, cache=None if no_cache else ResultCache(cache_dir=cache_dir, max_bytes=max_bytes))
+    server = ThreadingHTTPServer((host, port), RenderHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.render_timeout = timeout
+    server.verbose = verbose
+    return server
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog="pyguitar-server", add_help=True)
+    parser.add_argument("--host",      type=str,   default="127.0.0.1")
+    parser.add_argument("--port",      type=int,   default=8000)
+    parser.add_argument("--workers",   type=int,   default=max(1, (os.cpu_count() or 2)-1), help="The number of worker processes.")
+    parser.add_argument("--cache-dir", type=str,   default=None, help="Directory of the result cache.")
+    parser.add_argument("--max-bytes", type=int,   default=512*1024*1024, help="Size of the result cache.")
+    parser.add_argument("--no-cache",  action="store_true", help="Render every request.")
+    parser.add_argument("--timeout",   type=float, default=120, help="Seconds a request waits for its result.")
+    parser.add_argument("--quiet",     action="store_true", help="Don't log requests.")
+    args = parser.parse_args(argv)
+
+    server = create_server(host=args.host, port=args.port, workers=args.workers, cache_dir=args.cache_dir,
+                           max_bytes=args.max_bytes, no_cache=args.no_cache, timeout=args.timeout, verbose=not args.quiet)
+    host, port = server.server_address[:2]
+    print(f"Serving chord books at {toBLUE(f'http://{host}:{port}/render')} with {toGREEN(args.workers)} workers.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,40 @@
 #coding: utf-8
 import os
 import re
-import tqdm
 import json
-from selenium.webdriver.support.ui import Select
 
-from .utils.driver_utils import driver_wrapper
-from kerasy.utils import toBLUE, toGREEN
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .utils.driver_utils import driver_wrapper, DriverPool
+from .utils.generic_utils import toBLUE, toGREEN
+from .utils.html_utils import parse_html
+from .utils.transpose_utils import transpose_data
 
 UFRET_TITLE_PATTERN = r"\sギターコード\/ウクレレコード\/ピアノコード - U-フレット"
 
-def get_ufret_chords_with_driver(driver, url, capo="0"):
-    print(f"Accessing to {toBLUE(url)}...")
-    driver.get(url)
+# Collect every [[chord, ...], [lyric, ...]] row of "#my-chord-data" in one round trip.
+EXTRACT_CHORDS_SCRIPT = """
+var root = document.getElementById("my-chord-data");
+var rows = [];
+if (root === null) return rows;
+var join = function(elements){
+    return Array.prototype.map.call(elements, function(e){ return e.innerText.trim(); }).join("");
+};
+Array.prototype.forEach.call(root.getElementsByClassName("row"), function(row){
+    var chords = row.querySelectorAll(".chord");
+    if (chords.length === 0) return;
+    var notes = [], lyrics = [];
+    Array.prototype.forEach.call(chords, function(chord){
+        notes.push(join(chord.getElementsByTagName("rt")));
+        lyrics.push(join(chord.getElementsByClassName("col")));
+    });
+    rows.push([notes, lyrics]);
+});
+return rows;
+"""
 
-    # capo
+def format_capo(capo):
+    """ 0 -> "0", 2 -> "+2", "2" -> "+2", "-1" -> "-1" """
     if isinstance(capo, int):
         if capo==0:
             capo = "0"
@@ -22,42 +42,154 @@ def get_ufret_chords_with_driver(driver, url, capo="0"):
             capo = f"{capo:+}"
     elif capo != "0" and capo[0] not in ["+", "-"]:
         capo = f"{int(capo):+}"
+    return capo
+
+def format_title(title):
+    title_match = re.search(pattern=UFRET_TITLE_PATTERN, string=title)
+    if title_match is not None:
+        title = title[:title_match.start()]
+    return title
+
+def rows2data(rows):
+    """ [(notes, lyrics), ...] -> {i : {'chord': notes, 'lyric': lyrics}} """
+    return {
+        i: {
+            "chord": list(notes),
+            "lyric": list(lyrics)
+        } for i,(notes,lyrics) in enumerate(rows)
+    }
+
+def get_ufret_chords_with_driver(driver, url, capo="0"):
+    from selenium.webdriver.support.ui import Select
+    print(f"Accessing to {toBLUE(url)}...")
+    driver.get(url)
+
+    # capo
+    capo = format_capo(capo)
     print(f"Set capo to {toGREEN(capo)}")
     capo_select = driver.find_element_by_name('keyselect')
     capo_select = Select(capo_select)
     capo_select.select_by_value(capo)
 
     # title
-    title = driver.title
-    title_match = re.search(pattern=UFRET_TITLE_PATTERN, string=title)
-    if title_match is not None:
-        title = title[:title_match.start()]
+    title = format_title(driver.title)
     print(f"title: {toGREEN(title)}")
 
     # Chord
-    my_chord_data = driver.find_elements_by_id("my-chord-data")
-    NOTES, LYRICS = [], []
-    if len(my_chord_data)>0:
-        my_chord_data = my_chord_data[0]
-        for row in tqdm.tqdm(my_chord_data.find_elements_by_class_name("row")):
-            chords = row.find_elements_by_css_selector(".chord")
-            if len(chords)==0: continue
-            notes, lyrics = [],[]
-            for chord in chords:
-                note = "".join([rt.text for rt in chord.find_elements_by_tag_name("rt")])
-                lyric = "".join([col.text for col in chord.find_elements_by_class_name("col")])
-                notes.append(note)
-                lyrics.append(lyric)
-            NOTES.append(notes)
-            LYRICS.append(lyrics)
-
-    data = {
-        i: {
-            "chord": note,
-            "lyric": lyric
-        } for i,(note,lyric) in enumerate(zip(NOTES, LYRICS))
-    }
+    data = rows2data(driver.execute_script(EXTRACT_CHORDS_SCRIPT))
     return (title, capo, data)
 
-def get_ufret_chords(url, capo="0"):
-    return driver_wrapper(get_ufret_chords_with_driver, url, capo=capo)
+def get_ufret_chords_from_html(html, capo=None):
+    """ Extract chords from a saved U-FRET page without a browser.
+    @params html : (str) HTML source of the page.
+    @params capo : (str, int) Only used as a return value. If None, it is read
+                              from the selected option of the 'keyselect' dropdown.
+                              (The page has to be saved after choosing the capo.)
+    @return (title, capo, data)
+    """
+    document = parse_html(html)
+    titles = document.find_all(tag="title")
+    title = format_title(titles[0].text) if len(titles)>0 else ""
+
+    if capo is None:
+        capo = "0"
+        for select in document.find_all(tag="select"):
+            if select.attrs.get("name") != "keyselect":
+                continue
+            for option in select.find_all(tag="option"):
+                if "selected" in option.attrs:
+                    capo = option.attrs.get("value", "0")
+    capo = format_capo(capo)
+
+    rows = []
+    my_chord_data = document.find_by_id("my-chord-data")
+    if my_chord_data is not None:
+        for row in my_chord_data.find_all(class_name="row"):
+            chords = row.find_all(class_name="chord")
+            if len(chords)==0: continue
+            rows.append((
+                ["".join([rt.text for rt in chord.find_all(tag="rt")]) for chord in chords],
+                ["".join([col.text for col in chord.find_all(class_name="col")]) for chord in chords],
+            ))
+    return (title, capo, rows2data(rows))
+
+def get_ufret_chords_from_file(path, capo=None, encoding="utf-8"):
+    """ `get_ufret_chords_from_html` for a page saved at ``path``
+    ~~~
+    examples)
+    >>> title, capo, data = get_ufret_chords_from_file("examples/ufret-sample.html")
+    >>> title, capo
+    ('サンプル / PyGuitar', '-2')
+    >>> data[0]
+    {'chord': ['G#m', 'E', 'B', 'F#'], 'lyric': ['欲望', 'に', '満ちた', '青年団']}
+    >>> data[1]
+    {'chord': ['C#m7', 'D#7', 'G#m/B'], 'lyric': ['Yeah', '', 'Ohoh']}
+    >>> len(data)  # Rows without chords are skipped.
+    2
+    """
+    with open(path, mode="r", encoding=encoding) as f:
+        return get_ufret_chords_from_html(f.read(), capo=capo)
+
+def get_ufret_chords(url, capo="0", pool=None, cache=None, refresh=False, local_capo=False):
+    """ Scrape chords from U-FRET.
+    @params url     : (str) URL of a U-FRET page.
+    @params capo    : (str, int) The position of a CAPO.
+    @params pool    : (DriverPool) Borrow a browser session from it instead of launching one.
+    @params cache   : (ScrapeCache) Return the cached result if there is one, and store new results.
+    @params refresh : (bool) Ignore (and overwrite) the cached result.
+    @params local_capo : (bool) Scrape (or reuse) the page at capo 0 and transpose it
+                                locally, instead of choosing the capo in the browser.
+    @return (title, capo, data)
+    """
+    capo = format_capo(capo)
+    if local_capo and capo != "0":
+        title, _, data = get_ufret_chords(url, capo="0", pool=pool, cache=cache, refresh=refresh)
+        return (title, capo, transpose_data(data, int(capo)))
+    if cache is not None and not refresh:
+        cached = cache.get(url, capo)
+        if cached is not None:
+            print(f"Use cached data of {toBLUE(url)} (capo={toGREEN(capo)})")
+            return cached
+    if pool is not None:
+        result = pool.run(get_ufret_chords_with_driver, url, capo=capo)
+    else:
+        result = driver_wrapper(get_ufret_chords_with_driver, url, capo=capo)
+    if cache is not None:
+        cache.set(url, capo, result)
+    return result
+
+def get_ufret_chords_many(urls, capo="0", workers=4, pool=None, cache=None, refresh=False, local_capo=False, return_exceptions=False):
+    """ Scrape many pages with pooled browser sessions.
+    @params urls              : (list) URLs of U-FRET pages.
+    @params capo              : (str, int) The position of a CAPO (same for all urls.)
+    @params workers           : (int) The number of pages scraped at the same time.
+    @params pool              : (DriverPool) If None, a pool of size ``workers`` is created (and closed.)
+    @params cache             : (ScrapeCache) see `get_ufret_chords`
+    @params refresh           : (bool) see `get_ufret_chords`
+    @params local_capo        : (bool) see `get_ufret_chords`
+    @params return_exceptions : (bool) Yield the exception instead of raising it.
+    @yield (url, (title, capo, data)) in the order they finish.
+    """
+    urls = list(urls)
+    workers = max(1, min(workers, len(urls)))
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(size=workers)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future2url = {
+                executor.submit(get_ufret_chords, url, capo=capo, pool=pool, cache=cache, refresh=refresh, local_capo=local_capo): url
+                for url in urls
+            }
+            for future in as_completed(future2url):
+                url = future2url[future]
+                try:
+                    yield (url, future.result())
+                except Exception as e:
+                    if not return_exceptions:
+                        for f in future2url: f.cancel()
+                        raise
+                    yield (url, e)
+    finally:
+        if own_pool:
+            pool.close()
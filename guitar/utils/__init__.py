@@ -4,14 +4,31 @@ UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
 MODULE_DIR = os.path.dirname(UTILS_DIR) 
 REPO_DIR = os.path.dirname(MODULE_DIR) 
 
+from . import cache_utils
+from . import chord_utils
 from . import coloring_utils
 from . import decorate_utils
 from . import driver_utils
 from . import fmt_utils
+from . import fretboard_utils
+from . import generic_utils
 from . import font_utils
 from . import guitar_utils
+from . import html_utils
+from . import index_utils
+from . import key_utils
 from . import mpatches_utils
+from . import section_utils
+from . import song_utils
+from . import transpose_utils
 
+from .cache_utils import ScrapeCache
+from .cache_utils import ResultCache
+
+from .chord_utils import Chord
+from .chord_utils import parse_chord
+
+from .coloring_utils import ThemeRegistry
 from .coloring_utils import get_notes2color
 from .coloring_utils import plot_notes_color_theme
 from .coloring_utils import plot_notes_all_color_theme
@@ -20,16 +37,51 @@ from .decorate_utils import plot_logo
 from .decorate_utils import ax_clear
 
 from .driver_utils import driver_wrapper
+from .driver_utils import create_driver
+from .driver_utils import set_driver_type
+from .driver_utils import get_driver_type
+from .driver_utils import DriverPool
 
 from .fmt_utils import UFRET2PyGuitar_dict
 from .fmt_utils import ufret2pyguitar
 
 from .font_utils import japanize
+from .font_utils import font_context
+from .font_utils import register_font
+
+from .fretboard_utils import Fretboard
+from .fretboard_utils import get_fretboard
+
+from .generic_utils import toBLUE
+from .generic_utils import toGREEN
+from .generic_utils import ProgressMonitor
 
 from .guitar_utils import get_notes
 from .guitar_utils import get_intervals
 from .guitar_utils import find_notes_positions
 from .guitar_utils import find_key_major_scale
 from .guitar_utils import get_chord_components
+from .guitar_utils import get_scale_context
+
+from .html_utils import parse_html
+
+from .index_utils import SongIndex
+
+from .key_utils import KeyCandidate
+from .key_utils import best_key
+from .key_utils import detect_keys
+from .key_utils import detect_keys_batch
+
+from .mpatches_utils import mpatches
+
+from .section_utils import RepeatRow
+from .section_utils import fold_repeats
+
+from .song_utils import Song
+from .song_utils import Corpus
+from .song_utils import save_corpus
 
-from .mpatches_utils import mpatches
\ No newline at end of file
+from .transpose_utils import transpose_note
+from .transpose_utils import transpose_chord
+from .transpose_utils import transpose_data
+from .transpose_utils import transpose_all
\ No newline at end of file
@@ -0,0 +1,345 @@
+# coding: utf-8
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CACHE_DIR = os.environ.get(
+    "PYGUITAR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pyguitar")
+)
+
+def normalize_url(url):
+    """ Normalize ``url`` so that trivially different spellings share one cache entry.
+    (lower-cased scheme & host, sorted query, no fragment, no trailing slash.)
+    """
+    scheme, netloc, path, query, fragment = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return urlunsplit((scheme.lower(), netloc.lower(), path.rstrip("/") or "/", query, ""))
+
+def atomic_write(path, text, encoding="utf-8"):
+    """ Write ``text`` (str or bytes) to a temporary file and rename it, so readers never see half-written files. """
+    dirname = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+    try:
+        binary = isinstance(text, bytes)
+        with os.fdopen(fd, mode="wb" if binary else "w", encoding=None if binary else encoding) as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ScrapeCache():
+    """ On-disk cache of scraped ``(title, capo, data)``, keyed by normalized URL and capo.
+    @params cache_dir : (str)   Directory of the cache. Can be shared by concurrent processes.
+    @params ttl       : (float) Seconds an entry stays valid. None means forever.
+    @params max_bytes : (int)   Least recently used entries are evicted above this size.
+    ~~~
+    examples)
+    >>> cache = ScrapeCache(ttl=7*24*60*60)
+    >>> title, capo, data = get_ufret_chords(url, capo=2, cache=cache)
+    >>> cache.stats
+    {'hits': 0, 'misses': 1, 'writes': 1, 'evictions': 0}
+    """
+    # Sub-directory of the cache, and files of entries (others, e.g. temporary files of `atomic_write`, are left alone.)
+    NAME = "ufret"
+    SUFFIXES = (".json",)
+    # Expired entries are swept (by a scan of the directory) at most this often [s]
+    SWEEP_INTERVAL = 60*60
+    # Eviction goes down to this fraction of ``max_bytes``, so that a full cache isn't scanned on every write.
+    LOW_WATER = 0.9
+
+    def __init__(self, cache_dir=None, ttl=30*24*60*60, max_bytes=256*1024*1024):
+        self.cache_dir = os.path.join(cache_dir or CACHE_DIR, self.NAME)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        # Running size of the entries, so that writes don't scan the directory. It is loaded by the
+        # first `evict`, and corrected by every later one (other processes may share the directory.)
+        self._total_bytes = None
+        self._last_sweep = 0.
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def make_key(url, capo):
+        return hashlib.sha1(f"{normalize_url(url)}\t{capo}".encode("utf-8")).hexdigest()
+
+    def path(self, url, capo):
+        return os.path.join(self.cache_dir, self.make_key(url, capo) + ".json")
+
+    def get(self, url, capo):
+        """ Return the cached ``(title, capo, data)`` or None. """
+        path = self.path(url, capo)
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                self._remove(path, size=stat.st_size)
+                raise FileNotFoundError(path)
+            with open(path, mode="r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Mark as recently used.
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        data = {int(i): row for i,row in entry["data"].items()}
+        return (entry["title"], entry["capo"], data)
+
+    def set(self, url, capo, value):
+        title, capo_, data = value
+        entry = {"url": url, "title": title, "capo": capo_, "data": data}
+        self._store(self.path(url, capo), json.dumps(entry, ensure_ascii=False))
+
+    def _store(self, path, content):
+        """ Write an entry, and `evict` only if the running size is over ``max_bytes`` or a sweep is due. """
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        atomic_write(path, content)
+        size = os.path.getsize(path)
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._total_bytes is not None:
+                self._total_bytes += size - previous
+            total = self._total_bytes
+        sweep_due = self.ttl is not None and time.time() - self._last_sweep > self.SWEEP_INTERVAL
+        if total is None or sweep_due or (self.max_bytes is not None and total > self.max_bytes):
+            self.evict()
+
+    def evict(self):
+        """ Remove expired entries, then (if over ``max_bytes``) least recently used ones down to
+        ``LOW_WATER * max_bytes``. This scans the whole directory, and resets the running size. """
+        entries = []
+        now = time.time()
+        self._last_sweep = now
+        for fn in os.listdir(self.cache_dir):
+            if not fn.endswith(self.SUFFIXES):
+                continue
+            path = os.path.join(self.cache_dir, fn)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                self._remove(path, size=stat.st_size, counted=False)
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _,size,_ in entries)
+        if self.max_bytes is not None and total > self.max_bytes:
+            for _,size,path in sorted(entries):
+                if total <= self.max_bytes*self.LOW_WATER:
+                    break
+                if self._remove(path, size=size, counted=False):
+                    total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    def _remove(self, path, size=None, counted=True):
+        """ Remove an entry (of ``size`` bytes) and subtract it from the running size if it was ``counted``. """
+        try:
+            if size is None:
+                size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            # Already removed by another worker.
+            return False
+        with self._lock:
+            self.stats["evictions"] += 1
+            if counted and self._total_bytes is not None:
+                self._total_bytes = max(0, self._total_bytes - size)
+        return True
+
+    def clear(self):
+        for fn in os.listdir(self.cache_dir):
+            if fn.endswith(self.SUFFIXES):
+                self._remove(os.path.join(self.cache_dir, fn))
+
+class ResultCache(ScrapeCache):
+    """ Content-addressed on-disk cache of rendered files (e.g. chord books served by `guitar.server`)
+    Entries are keyed by the hash of everything that decides the output (`make_key`), so they never
+    go stale, and least recently used ones are evicted above ``max_bytes``.
+    ~~~
+    examples)
+    >>> cache = ResultCache()
+    >>> key = cache.make_key({"data": data, "options": options, "version": __version__})
+    >>> content = cache.get(key, ".pdf") or render(data, options)
+    """
+    NAME = "renders"
+    SUFFIXES = (".pdf", ".png")
+
+    def __init__(self, cache_dir=None, max_bytes=512*1024*1024):
+        super().__init__(cache_dir=cache_dir, ttl=None, max_bytes=max_bytes)
+
+    @staticmethod
+    def make_key(obj):
+        return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def path(self, key, ext):
+        return os.path.join(self.cache_dir, key + ext)
+
+    def get(self, key, ext):
+        """ Return the cached bytes or None. """
+        path = self.path(key, ext)
+        try:
+            with open(path, mode="rb") as f:
+                content = f.read()
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except OSError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return content
+
+    def set(self, key, ext, content):
+        self._store(self.path(key, ext), content)
+
+def file_hash(path, chunk_size=1<<20):
+    """ sha1 of the content of a file """
+    sha1 = hashlib.sha1()
+    with open(path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+class RenderManifest():
+    """ Record of rendered files, saved next to the outputs, for incremental rebuilds.
+    Each input has the hash of its content and of the render parameters, and its output.
+    An output is fresh if both hashes are the same and the output still exists.
+    Inputs and outputs are recorded by absolute path, so "songs/a.json" and "./songs/a.json" are the
+    same input, and inputs of other directories rendered into the same place are left alone.
+    @params path   : (str)  json file of the manifest.
+    @params params : (dict) Render parameters (theme, scale, fonts, library version, ...)
+    ~~~
+    examples)
+    >>> manifest = RenderManifest("out/.pyguitar-manifest.json", params={"theme": "rainbow", "version": "0.3.7"})
+    >>> digest = file_hash(path)
+    >>> if not manifest.is_fresh(path, digest):
+    ...     manifest.set(path, digest, output=render(path))
+    >>> manifest.prune()
+    >>> manifest.save()
+    """
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.params_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        self.entries = {}
+        try:
+            with open(path, mode="r", encoding="utf-8") as f:
+                self.entries = {os.path.abspath(input): entry for input,entry in json.load(f)["entries"].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def is_fresh(self, input, digest):
+        entry = self.entries.get(os.path.abspath(input))
+        return (
+            entry is not None and entry["hash"] == digest and entry["params"] == self.params_hash
+            and os.path.exists(entry["output"])
+        )
+
+    def set(self, input, digest, output):
+        """ Record ``output`` of ``input``. The previous output is removed if it has another name. """
+        input, output = os.path.abspath(input), os.path.abspath(output)
+        previous = self.entries.pop(input, {}).get("output")
+        if previous is not None and previous != output:
+            self._remove_output(previous)
+        self.entries[input] = {"hash": digest, "params": self.params_hash, "output": output}
+
+    def invalidate(self, input):
+        """ Render ``input`` next time (e.g. its render failed.) Its last output is still tracked. """
+        input = os.path.abspath(input)
+        if input in self.entries:
+            self.entries[input]["hash"] = None
+
+    def prune(self):
+        """ Remove the outputs of inputs which no longer exist, and return them. """
+        removed = []
+        for input in [input for input in self.entries.keys() if not os.path.exists(input)]:
+            output = self.entries.pop(input)["output"]
+            if self._remove_output(output):
+                removed.append(output)
+        return removed
+
+    def _remove_output(self, output):
+        # Another input may have produced the same output.
+        if any(entry["output"]==output for entry in self.entries.values()):
+            return False
+        try:
+            os.remove(output)
+        except OSError:
+            return False
+        return True
+
+    def save(self):
+        atomic_write(self.path, json.dumps({"params": self.params, "entries": self.entries}, indent=2, ensure_ascii=False))
+
+class LRUCache():
+    """ Thread-safe in-memory LRU cache with hit/miss counters.
+    @params maxsize : (int) Maximum number of entries. None means unbounded.
+    ~~~
+    examples)
+    >>> cache = LRUCache(maxsize=128)
+    >>> img = cache.get_or_create(key, lambda: render(key))
+    >>> cache.hit_rate
+    0.875
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def hit_rate(self):
+        n = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"]/n if n>0 else 0.
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._data[key]
+            self.stats["misses"] += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_or_create(self, key, func):
+        """ Return the cached value of ``key``, or cache and return ``func()`` """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            # Created outside the lock, so that slow renders don't block other keys.
+            value = func()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.stats = {"hits": 0, "misses": 0, "evictions": 0}
@@ -0,0 +1,115 @@
+# coding: utf-8
+import re
+import functools
+
+from ..env import NOTES, LEN_OCTAVES
+
+ACCIDENTALS = {"#": 1, "♯": 1, "♭": -1, "b": -1}
+# root (e.g. "G#", "B♭", "Bb"), quality (e.g. "m7-5"), and optional slash bass (e.g. "/D#")
+CHORD_SYMBOL_PATTERN = re.compile(r"^([A-G](?:#|♯|♭|b)?)([^/]*)(?:/([A-G](?:#|♯|♭|b)?))?$")
+
+# Quality of a chord symbol (U-FRET and common spellings) -> key of ``CHORD_FORMULAS``
+QUALITY_ALIASES = {
+    ""        : "major",
+    "M"       : "major",
+    "m"       : "minor",
+    "7"       : "7th",
+    "m7"      : "minor7th",
+    "maj7"    : "major7th",
+    "M7"      : "major7th",
+    "△7"      : "major7th",
+    "m7-5"    : "minor7th-flatted5th",
+    "m7(♭5)"  : "minor7th-flatted5th",
+    "m7(b5)"  : "minor7th-flatted5th",
+    "6"       : "major6th",
+    "m6"      : "minor6th",
+    "sus4"    : "sus4",
+    "dim"     : "dim",
+    "aug"     : "aug",
+    "+"       : "aug",
+    "omit3"   : "omit3",
+    "5"       : "omit3",
+    "add9"    : "add9",
+    "add2"    : "add9",
+    "(9)"     : "add9",
+    "7sus4"   : "7sus4",
+    "dim7"    : "dim7",
+    "mM7"     : "minor-major7th",
+    "m(maj7)" : "minor-major7th",
+    "9"       : "9th",
+    "7(9)"    : "9th",
+    "maj9"    : "major9th",
+    "M9"      : "major9th",
+    "M7(9)"   : "major9th",
+    "m9"      : "minor9th",
+    "m7(9)"   : "minor9th",
+}
+
+def note2pitch(note):
+    """ "C" -> 0, "C#" -> 1, "D♭" -> 1, "Db" -> 1, "B#" -> 0 """
+    pitch = NOTES.index(note[0])
+    for accidental in note[1:]:
+        pitch += ACCIDENTALS[accidental]
+    return pitch % LEN_OCTAVES
+
+class Chord():
+    """ An immutable, parsed chord symbol. Use `parse_chord` to get the shared instance of a symbol.
+    @params symbol  : (str) e.g. "G#m7/D#"
+    @params note    : (str) Root as written (e.g. "G#", "B♭")
+    @params root    : (int) Pitch class of the root (C=0, ..., B=11)
+    @params quality : (str) Key of ``CHORD_FORMULAS`` (e.g. "minor7th")
+    @params bass    : (int) Pitch class of the slash bass, or None.
+    """
+    __slots__ = ("symbol", "note", "root", "quality", "bass")
+
+    def __init__(self, symbol, note, root, quality, bass=None):
+        for name,value in zip(self.__slots__, (symbol, note, root, quality, bass)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable.")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return f"Chord('{self.symbol}')"
+
+    def __eq__(self, other):
+        if not isinstance(other, Chord):
+            return NotImplemented
+        return (self.root, self.quality, self.bass) == (other.root, other.quality, other.bass)
+
+    def __hash__(self):
+        return hash((self.root, self.quality, self.bass))
+
+    def __reduce__(self):
+        # Unpickled chords are interned again.
+        return (parse_chord, (self.symbol,))
+
+@functools.lru_cache(maxsize=4096)
+def _parse_chord(symbol):
+    match = CHORD_SYMBOL_PATTERN.match(symbol)
+    if match is None:
+        raise ValueError(f"Couldn't parse the chord '{symbol}'")
+    note, quality, bass = match.groups()
+    if quality not in QUALITY_ALIASES:
+        known = ', '.join([f"'{q}'" for q in QUALITY_ALIASES.keys()])
+        raise ValueError(f"Unknown quality '{quality}' of the chord '{symbol}'. Please chose it from {known}.")
+    return Chord(symbol=symbol, note=note.replace("b", "♭"), root=note2pitch(note),
+                 quality=QUALITY_ALIASES[quality], bass=None if bass is None else note2pitch(bass))
+
+def parse_chord(symbol):
+    """ Parse a chord symbol. The same symbol gives the same (interned) `Chord` while it is in the cache.
+    @params symbol : (str) e.g. "G#m7-5", "B♭/D", "Cadd9". "" (no chord) gives None.
+    @return chord  : (Chord)
+    ~~~
+    examples)
+    >>> chord = parse_chord("G#m7/D#")
+    >>> chord.note, chord.root, chord.quality, chord.bass
+    ('G#', 8, 'minor7th', 3)
+    >>> parse_chord("G#m7/D#") is chord
+    True
+    """
+    if symbol == "":
+        return None
+    return _parse_chord(symbol)
@@ -1,40 +1,125 @@
 # coding: utf-8
+import os
+import json
+import threading
 import matplotlib
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.cm as cm
 from guitar.env import *
-from kerasy.utils import chooseTextColor, handleTypeError
+from .cache_utils import CACHE_DIR, atomic_write
+from .decorate_utils import new_figure
+from .generic_utils import chooseTextColor, handleKeyError, handleTypeError
 
 from ..env import LEN_OCTAVES
 
+def get_colormaps():
+    """ Registry of colormaps (name -> Colormap). ``cm.cmap_d`` was removed in matplotlib 3.6 """
+    if hasattr(matplotlib, "colormaps"):
+        return matplotlib.colormaps
+    return cm.cmap_d
+
+def get_cmap(theme):
+    """ Name of a registered colormap -> Colormap """
+    colormaps = get_colormaps()
+    handleKeyError(lst=list(colormaps), theme=theme)
+    return colormaps[theme]
+
+def make_palette(cmap):
+    """ Colormap -> [(background rgba, text rgb), ...] of the 12 notes from ``NOTES[0]`` """
+    palette = []
+    for i in range(LEN_OCTAVES):
+        rgba = tuple(float(e) for e in cmap(i/LEN_OCTAVES))
+        palette.append((rgba, chooseTextColor(rgb=rgba[:3], ctype="rgb", max_val=1)))
+    return palette
+
+class ThemeRegistry():
+    """ Note colors (`make_palette`) of every registered colormap, computed once and cached on disk
+    (evaluating ~200 colormaps takes ~0.5[s], loading the cache a few [ms].) Colormaps registered
+    after the table was built are computed when they are first used.
+    @params path : (str) json file of the cache. None keeps the table in memory only.
+    ~~~
+    examples)
+    >>> themes = ThemeRegistry()
+    >>> themes.notes2color("rainbow")["C"]
+    ((0.5, 0.0, 1.0, 1.0), (1, 1, 1))
+    >>> len(themes.names)
+    182
+    """
+    def __init__(self, path=os.path.join(CACHE_DIR, f"themes-matplotlib-{matplotlib.__version__}.json")):
+        self.path = path
+        self.palettes = None
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        self.load()
+        return list(self.palettes.keys())
+
+    def load(self, rebuild=False):
+        """ Read the table from the disk cache, or build (and save) it if there is none. """
+        with self._lock:
+            if self.palettes is not None and not rebuild:
+                return
+            if self.path is not None and os.path.exists(self.path) and not rebuild:
+                try:
+                    with open(self.path, mode="r", encoding="utf-8") as f:
+                        table = json.load(f)
+                    self.palettes = {
+                        name: [(tuple(bg), tuple(fc)) for bg,fc in palette] for name,palette in table.items()
+                    }
+                    return
+                except (OSError, ValueError):
+                    pass
+            self.palettes = {name: make_palette(cmap) for name,cmap in get_colormaps().items()}
+            self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write(self.path, json.dumps(self.palettes))
+        except OSError:
+            # A read-only cache directory only costs rebuilding the table next time.
+            pass
+
+    def palette(self, theme):
+        """ [(bg, fc), ...] of the 12 notes of the theme (the name of a colormap.) """
+        self.load()
+        palette = self.palettes.get(theme)
+        if palette is None:
+            palette = make_palette(get_cmap(theme))
+            with self._lock:
+                self.palettes[theme] = palette
+        return palette
+
+    def notes2color(self, theme):
+        """ {note: (bg, fc)} of the theme. """
+        return dict(zip(NOTES, self.palette(theme)))
+
+THEMES = ThemeRegistry()
+
 def get_notes2color(theme="rainbow"):
-    notes2color={}
-    for i,note in enumerate(NOTES):
-        rgba = cm.cmap_d.get(theme)(i/LEN_OCTAVES)
-        notes2color[note] = (rgba, chooseTextColor(rgb=rgba[:3], ctype="rgb", max_val=1))
-    return notes2color
-
-def plot_notes_color_theme(theme="rainbow", radius=0.3, fontsize=20, title=True, ax=None, fig=None):
-    if isinstance(theme, matplotlib.colors.ListedColormap) or \
-        isinstance(theme, matplotlib.colors.LinearSegmentedColormap):
-        cmap = theme
-        theme = cmap.name
+    return THEMES.notes2color(theme)
+
+def plot_notes_color_theme(theme="rainbow", radius=0.3, fontsize=20, title=True, ax=None, fig=None, family=None):
+    if isinstance(theme, matplotlib.colors.Colormap):
+        palette = make_palette(theme)
+        theme = theme.name
     elif isinstance(theme, str):
-        cmap = cm.cmap_d.get(theme)
+        palette = THEMES.palette(theme)
     else:
-        handleTypeError(types=[str, matplotlib.colors.ListedColormap, matplotlib.colors.LinearSegmentedColormap], theme=theme)
+        handleTypeError(types=[str, matplotlib.colors.Colormap], theme=theme)
 
     if ax is None:
-        fig, ax = plt.subplots(figsize=(LEN_OCTAVES,1))
+        fig = new_figure(figsize=(LEN_OCTAVES,1))
+        ax = fig.add_subplot(1, 1, 1)
     ax.set_xlim(-0.5, 11.5)
-    if title: ax.set_title(theme)
+    if title: ax.set_title(theme, family=family)
     # Plot notes with color.
-    for i,note in enumerate(NOTES):   
-        rgba = cmap(i/LEN_OCTAVES)
-        fc = chooseTextColor(rgba[:3], ctype="rgb", max_val=1)
+    for i,(note,(rgba,fc)) in enumerate(zip(NOTES, palette)):
         ax.add_patch(mpatches.Circle(xy=(i, 0), radius=radius, color=rgba))
-        ax.annotate(text=note, xy=(i, 0), color=fc, weight='bold', fontsize=fontsize, ha='center', va='center')
+        ax.annotate(text=note, xy=(i, 0), color=fc, weight='bold', fontsize=fontsize, ha='center', va='center', family=family)
     # Adjust for different sized figures.
     if fig is not None:
         bbox = ax.get_window_extent().transformed(fig.dpi_scale_trans.inverted())
@@ -42,7 +127,23 @@ def plot_notes_color_theme(theme="rainbow", radius=0.3, fontsize=20, title=True,
         height = 1/2 * h * (LEN_OCTAVES/w)
         ax.set_ylim(-height, height)
     return ax
-    
-def plot_notes_all_color_theme(radius=0.3, fontsize=20):
-    for name, cmap in cm.cmap_d.items():
-        plot_notes_color_theme(cmap, radius=radius, fontsize=fontsize)
\ No newline at end of file
+
+def plot_notes_all_color_theme(radius=0.3, fontsize=20, themes=None, ncols=3, filename=None, dpi=50):
+    """ Plot every theme into one figure (a row per theme), and save it with one savefig.
+    The figure isn't managed by pyplot (see `new_figure`), so nothing stays open.
+    @params themes   : (list) Names of colormaps. Defaults to all of them.
+    @params ncols    : (int) Number of themes per row of the sheet.
+    @params filename : (str) Save the sheet here (e.g. "themes.png", "themes.pdf")
+    @return fig      : (Figure)
+    """
+    themes = THEMES.names if themes is None else list(themes)
+    nrows = max(1, -(-len(themes)//ncols))
+    fig = new_figure(figsize=(LEN_OCTAVES*ncols, 1.5*nrows))
+    fig.subplots_adjust(left=0.01, right=0.99, bottom=0.2/nrows, top=1-0.4/nrows, wspace=0.05, hspace=0.6)
+    for i,theme in enumerate(themes):
+        ax = fig.add_subplot(nrows, ncols, i+1)
+        plot_notes_color_theme(theme, radius=radius, fontsize=fontsize, ax=ax, fig=fig)
+        ax.axis("off")
+    if filename is not None:
+        fig.savefig(filename, dpi=dpi)
+    return fig
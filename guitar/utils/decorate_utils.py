@@ -1,18 +1,34 @@
 #coding: utf-8
 import os
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
+import functools
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import AxesImage
+from matplotlib.transforms import Affine2D
 
 from . import MODULE_DIR
 
 logo_path = os.path.join(MODULE_DIR, "data/logo.png")
-logo_img  = np.asarray(Image.open(logo_path))
+
+@functools.lru_cache(maxsize=1)
+def load_logo():
+    """ Read the logo image only when a book cover is actually drawn. """
+    import numpy as np
+    from PIL import Image
+    return np.asarray(Image.open(logo_path))
+
+def new_figure(figsize=None, dpi=None):
+    """ A `Figure` with its own Agg canvas. It isn't managed by pyplot (no "current" figure, nothing to close),
+    so figures can be created and drawn by many threads at once.
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
 
 def plot_logo(ax=None):
     if ax is None:
-        fig, ax = plt.subplots()
-    ax.imshow(logo_img)
+        ax = new_figure().add_subplot(1, 1, 1)
+    ax.imshow(load_logo())
     ax = ax_clear(ax)
     return ax
 
@@ -25,3 +41,31 @@ def ax_clear(ax, spines=True, label=True, scale=True):
     if scale:
         ax.tick_params(bottom=False, left=False, right=False, top=False)
     return ax
+
+class SharedImage(AxesImage):
+    """ An image filling its axes, passed as the very same array to vector renderers.
+    matplotlib's PDF backend keeps every image until the file is closed, but only once per array
+    object, so each chord diagram shared by many cells is stored (and written) once.
+    """
+    def draw(self, renderer, *args, **kwargs):
+        if not (self.get_visible() and renderer.option_scale_image()):
+            return super().draw(renderer, *args, **kwargs)
+        bbox = self.axes.bbox
+        gc = renderer.new_gc()
+        gc.set_clip_rectangle(bbox.frozen())
+        renderer.draw_image(gc, bbox.x0, bbox.y0, self.shared, Affine2D().scale(bbox.width, bbox.height))
+        gc.restore()
+        self.stale = False
+
+def plot_shared_image(ax, img):
+    """ Fill ``ax`` with ``img`` (an RGBA uint8 array whose first row is the bottom of the image.) """
+    im = SharedImage(ax, origin="lower", interpolation="none")
+    # `set_data` copies the array, so keep the original for `draw`
+    im.shared = img
+    im.set_data(img)
+    im.set_extent((-0.5, img.shape[1]-0.5, -0.5, img.shape[0]-0.5))
+    ax.add_image(im)
+    ax.set_xlim(-0.5, img.shape[1]-0.5)
+    ax.set_ylim(-0.5, img.shape[0]-0.5)
+    ax.set_aspect("auto")
+    return ax
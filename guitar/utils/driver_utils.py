@@ -1,45 +1,198 @@
 # coding: utf-8
-from selenium import webdriver
-from selenium.webdriver import DesiredCapabilities
-from selenium.webdriver.chrome.options import Options
-
-from .coloring_utils import *
-
-chrome_options = Options()
-chrome_options.add_argument('--no-sandbox')
-chrome_options.add_argument('--ignore-certificate-errors')
-chrome_options.add_argument('--headless')
-chrome_options.add_argument('--disable-dev-shm-usage')
-
-DRIVER_TYPE = "none"
-try:
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.quit()
-    DRIVER_TYPE = "local"
-except:
-    pass
-
-try:
-    driver = webdriver.Remote(command_executor='http://selenium:4444/wd/hub',
-                              desired_capabilities=DesiredCapabilities.CHROME.copy(),
-                              options=chrome_options)
-    driver.quit()
-    DRIVER_TYPE = "remote"
-except:
-    pass
+import os
+import queue
+import threading
+import contextlib
 
+from .generic_utils import toBLUE, handleKeyError
+
+DRIVER_TYPES = ["auto", "local", "remote", "none"]
+# Both can be overridden from the environment, e.g. `PYGUITAR_DRIVER_TYPE=remote`.
+DRIVER_TYPE = os.environ.get("PYGUITAR_DRIVER_TYPE", "auto").lower()
+REMOTE_EXECUTOR = os.environ.get("PYGUITAR_REMOTE_EXECUTOR", "http://selenium:4444/wd/hub")
+
+_detected_driver_type = None
+_detect_lock = threading.Lock()
+
+def get_chrome_options():
+    from selenium.webdriver.chrome.options import Options
+    chrome_options = Options()
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    return chrome_options
+
+def _create_local_driver():
+    from selenium import webdriver
+    return webdriver.Chrome(options=get_chrome_options())
+
+def _create_remote_driver():
+    from selenium import webdriver
+    from selenium.webdriver import DesiredCapabilities
+    return webdriver.Remote(command_executor=REMOTE_EXECUTOR,
+                            desired_capabilities=DesiredCapabilities.CHROME.copy(),
+                            options=get_chrome_options())
+
+DRIVER_CREATORS = {
+    "remote" : _create_remote_driver,
+    "local"  : _create_local_driver,
+}
+
+def set_driver_type(driver_type="auto", remote_executor=None):
+    """ Set which WebDriver backend `driver_wrapper` uses.
+    @params driver_type     : (str) One of "auto", "local", "remote", "none".
+                                    "auto" detects the backend on first use.
+    @params remote_executor : (str) URL of the Selenium hub.
+    """
+    global DRIVER_TYPE, REMOTE_EXECUTOR, _detected_driver_type
+    handleKeyError(lst=DRIVER_TYPES, driver_type=driver_type)
+    with _detect_lock:
+        DRIVER_TYPE = driver_type
+        if remote_executor is not None:
+            REMOTE_EXECUTOR = remote_executor
+        _detected_driver_type = None
+
+def create_driver():
+    """ Create a WebDriver instance.
+    The backend is detected only once (on the first call) unless it was
+    specified by `set_driver_type` or ``PYGUITAR_DRIVER_TYPE``, and the
+    driver launched while detecting is returned instead of thrown away.
+    """
+    global _detected_driver_type
+    if DRIVER_TYPE in DRIVER_CREATORS:
+        return DRIVER_CREATORS[DRIVER_TYPE]()
+    with _detect_lock:
+        if _detected_driver_type is None and DRIVER_TYPE == "auto":
+            for driver_type, creator in DRIVER_CREATORS.items():
+                try:
+                    driver = creator()
+                except Exception:
+                    continue
+                _detected_driver_type = driver_type
+                return driver
+            _detected_driver_type = "none"
+    if _detected_driver_type in DRIVER_CREATORS:
+        return DRIVER_CREATORS[_detected_driver_type]()
+    msg = "Could not create an instance of the 'chromedriver'. " + \
+    "If you can not prepare 'chromedriver' executable locally, " + \
+    "please build the environment with Dockerfile. Please see " + \
+    toBLUE("https://github.com/iwasakishuto/PyGuitar/tree/master/docker")
+    raise RuntimeError(msg)
+
+def get_driver_type():
+    """ Return the backend `create_driver` has settled on (``None`` if not detected yet.) """
+    if DRIVER_TYPE != "auto":
+        return DRIVER_TYPE
+    return _detected_driver_type
 
 def driver_wrapper(func, *args, **kwargs):
-    if DRIVER_TYPE=="remote":
-        with webdriver.Remote(command_executor='http://selenium:4444/wd/hub',
-                              desired_capabilities=DesiredCapabilities.CHROME.copy(),
-                              options=chrome_options) as driver:
-            return func(driver, *args, **kwargs)
-    elif DRIVER_TYPE=="local":
-        with webdriver.Chrome(options=chrome_options) as driver:
+    with create_driver() as driver:
+        return func(driver, *args, **kwargs)
+
+class DriverPool():
+    """ A pool of reusable WebDriver sessions.
+    @params size          : (int)  Maximum number of live sessions.
+    @params driver_types  : (list) Backend of each slot, e.g. ["local", "remote"].
+                                   Slots are assigned round-robin. ``None`` means
+                                   whatever `create_driver` detects.
+    @params max_pages     : (int)  Recycle a session after it served this many pages.
+    ~~~
+    examples)
+    >>> with DriverPool(size=4, max_pages=50) as pool:
+    >>>     with pool.driver() as driver:
+    >>>         driver.get(url)
+    """
+    def __init__(self, size=1, driver_types=None, max_pages=100):
+        self.size = size
+        self.driver_types = driver_types or [None]
+        for driver_type in self.driver_types:
+            if driver_type is not None:
+                handleKeyError(lst=list(DRIVER_CREATORS.keys()), driver_type=driver_type)
+        self.max_pages = max_pages
+        # Each slot holds [driver or None, driver_type, num_pages]
+        self._slots = queue.Queue()
+        for i in range(size):
+            self._slots.put([None, self.driver_types[i%len(self.driver_types)], 0])
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _launch(self, driver_type):
+        if driver_type is None:
+            return create_driver()
+        return DRIVER_CREATORS[driver_type]()
+
+    def acquire(self):
+        """ Take a healthy session out of the pool (blocks while all are in use.) """
+        if self._closed:
+            raise RuntimeError("DriverPool is already closed.")
+        slot = self._slots.get()
+        driver, driver_type, num_pages = slot
+        try:
+            if driver is not None and (num_pages >= self.max_pages or not self._is_alive(driver)):
+                self._quit(driver)
+                driver = None
+            if driver is None:
+                slot[0] = driver = self._launch(driver_type)
+                slot[2] = 0
+        except Exception:
+            slot[0] = None
+            self._slots.put(slot)
+            raise
+        return slot
+
+    def release(self, slot, broken=False):
+        """ Give a session back. ``broken`` sessions are quit immediately. """
+        slot[2] += 1
+        if broken or self._closed:
+            self._quit(slot[0])
+            slot[0] = None
+        self._slots.put(slot)
+
+    @contextlib.contextmanager
+    def driver(self):
+        """ Context manager which lends a session for one page. """
+        slot = self.acquire()
+        try:
+            yield slot[0]
+        except Exception:
+            self.release(slot, broken=not self._is_alive(slot[0]))
+            raise
+        else:
+            self.release(slot)
+
+    def run(self, func, *args, **kwargs):
+        """ Same as `driver_wrapper`, but with a pooled session. """
+        with self.driver() as driver:
             return func(driver, *args, **kwargs)
-    else:
-        msg = "Could not create an instance of the 'chromedriver'. " + \
-        "If you can not prepare 'chromedriver' executable locally, " + \
-        "please build the environment with Dockerfile. Please see" + \
-        toBLUE("https://github.com/iwasakishuto/PyGuitar/tree/master/docker")
+
+    def close(self):
+        """ Quit every idle session. Sessions in use are quit when released. """
+        self._closed = True
+        while True:
+            try:
+                slot = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if slot[0] is not None:
+                self._quit(slot[0])
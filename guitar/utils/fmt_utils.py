@@ -1,5 +1,5 @@
 # coding: utf-8
-import re
+from .chord_utils import parse_chord
 
 UFRET2PyGuitar_dict = {
     ""      : "major",
@@ -19,13 +19,22 @@ UFRET2PyGuitar_dict = {
 
 def ufret2pyguitar(chord, sep="_"):
     """
-    U-FRET format -> PyGuitar format.
-    TODE: I want to deal with it by adding an alias for `chord.json`
+    U-FRET format -> PyGuitar format. (note, mode, [bass]) See `parse_chord`
+    Unknown chords raise ValueError.
     """
     if chord == "":
         return ("", "", [])
-    # numerator / denominator
-    n, *d = chord.split("/")
-    note, mode_ufret = re.sub(r"([A-G]#?♭?)(.*)", rf"\1{sep}\2", n).split(sep)
-    mode_pyguitar = UFRET2PyGuitar_dict.get(mode_ufret)
-    return (note, mode_pyguitar, d)
+    parsed = parse_chord(chord)
+    return (parsed.note, parsed.quality, chord.split("/")[1:])
+
+def row2pair(row):
+    """ {'chord': [], 'lyric': []} or (chords, lyrics) -> (chords, lyrics) """
+    if isinstance(row, dict):
+        return (row.get("chord"), row.get("lyric"))
+    chords, lyrics = row
+    return (chords, lyrics)
+
+def split_row(chords, lyrics, ncols):
+    """ Split a row into rows of at most ``ncols`` chords. (An empty row stays as it is.) """
+    for i in range(0, max(len(chords), 1), ncols):
+        yield (chords[i:i+ncols], lyrics[i:i+ncols])
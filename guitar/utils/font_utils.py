@@ -1,22 +1,118 @@
 #coding: utf-8
 import os
 import getpass
+import functools
+import contextlib
+import threading
+from collections import defaultdict
 from matplotlib import font_manager as fm
-from matplotlib import rc
+from matplotlib import rcParams, rc_context
 
-def japanize(font_path="/font/ipam.ttf", family="IPAPMincho"):
+# Families which can draw Japanese lyrics, tried in this order (See `cjk_fallback`)
+CJK_FAMILIES = [
+    "IPAPMincho", "IPAMincho", "IPAexMincho", "IPAPGothic", "IPAGothic", "IPAexGothic",
+    "Noto Sans CJK JP", "Noto Serif CJK JP", "Hiragino Sans", "Hiragino Mincho ProN",
+    "Yu Gothic", "MS Gothic", "TakaoPGothic", "VL PGothic",
+]
+
+_lock = threading.RLock()
+
+@functools.lru_cache(maxsize=None)
+def font_index():
+    """ {family: [(weight, style, path), ...]} of the fonts known to matplotlib. Built once per process
+    from ``fm.fontManager`` (matplotlib scans the system once and persists it in its fontlist cache),
+    so nothing is rescanned. `register_font` resets it.
+    """
+    index = defaultdict(list)
+    for entry in fm.fontManager.ttflist:
+        index[entry.name].append((entry.weight, entry.style, entry.fname))
+    return dict(index)
+
+def available_fonts():
+    """ Sorted font files of `font_index` """
+    return sorted({path for fonts in font_index().values() for _,_,path in fonts})
+
+def register_font(font_path):
+    """ Add a font file to matplotlib once per process, and return its family (None if it doesn't exist.) """
+    if not os.path.exists(font_path):
+        return None
+    with _lock:
+        for entry in fm.fontManager.ttflist:
+            if os.path.abspath(entry.fname) == os.path.abspath(font_path):
+                return entry.name
+        fm.fontManager.addfont(font_path)
+        font_index.cache_clear()
+        cjk_fallback.cache_clear()
+        _find_font_paths.cache_clear()
+        return fm.fontManager.ttflist[-1].name
+
+@functools.lru_cache(maxsize=None)
+def cjk_fallback():
+    """ The first installed family of ``CJK_FAMILIES`` (resolved once per process), or None. """
+    index = font_index()
+    return next((family for family in CJK_FAMILIES if family in index), None)
+
+def font_chain(family=None):
+    """ ``family`` (str, list), or ``rcParams['font.family']`` if None, followed by `cjk_fallback`.
+    matplotlib (>=3.6) draws each glyph with the first family of the chain which has it.
+    """
+    families = rcParams['font.family'] if family is None else family
+    families = [families] if isinstance(families, str) else list(families)
+    fallback = cjk_fallback()
+    if fallback is not None and fallback not in families:
+        families.append(fallback)
+    return families
+
+@contextlib.contextmanager
+def font_context(family=None):
+    """ Draw with the `font_chain` of ``family`` only inside the with block (``rcParams`` are restored.)
+    Artists take their font when they are created, so figures can be saved outside of it.
+    ~~~
+    examples)
+    >>> with font_context("IPAexGothic"):
+    ...     ax.set_title("歌詞")
     """
+    families = font_chain(family)
+    if list(rcParams['font.family']) == families:
+        # Already inside the same context.
+        yield families
+        return
+    with rc_context({"font.family": families}):
+        yield families
+
+def find_font_paths(family=None, weight="normal"):
+    """ Font files of the `font_chain` of ``family``, followed by the default font. """
+    return _find_font_paths(tuple(font_chain(family)), weight)
+
+@functools.lru_cache(maxsize=None)
+def _find_font_paths(families, weight):
+    paths = []
+    for f in families:
+        try:
+            path = fm.findfont(fm.FontProperties(family=f, weight=weight), fallback_to_default=False)
+        except ValueError:
+            continue
+        if path not in paths:
+            paths.append(path)
+    default = fm.findfont(fm.FontProperties(weight=weight))
+    if default not in paths:
+        paths.append(default)
+    return tuple(paths)
+
+def japanize(font_path="/font/ipam.ttf", family="IPAPMincho"):
+    """ Register a Japanese font (in the docker image) and return the family to draw with, or None.
+    It is also used by `font_chain` as the CJK fallback of any family.
     example Args)
     |     font_dir       |   family     |
     =====================================
-    | path/to/ipaexm.ttf | IPAexMincho  |  
-    | path/to/ipam.ttf   | IPAMincho    |  
-    | path/to/ipagp.ttf  | IPAPGothic   |  
-    | path/to/ipamp.ttf  | IPAPMincho   |  
-    | path/to/ipag.ttf   | IPAGothic    |  
-    | path/to/ipaexg.ttf | IPAexGothic  |  
+    | path/to/ipaexm.ttf | IPAexMincho  |
+    | path/to/ipam.ttf   | IPAMincho    |
+    | path/to/ipagp.ttf  | IPAPGothic   |
+    | path/to/ipamp.ttf  | IPAPMincho   |
+    | path/to/ipag.ttf   | IPAGothic    |
+    | path/to/ipaexg.ttf | IPAexGothic  |
     """
     username = getpass.getuser()
     if username=="pyguitar" and os.path.exists(font_path):
-        fm.fontManager.addfont(font_path)
-        rc('font', family=family)
+        return register_font(font_path) or family
+    return None
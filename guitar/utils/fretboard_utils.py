@@ -0,0 +1,86 @@
+# coding: utf-8
+import functools
+import numpy as np
+
+from .generic_utils import handleKeyError
+from .chord_utils import note2pitch
+from ..env import NOTES, LEN_OCTAVES, NUM_FRETS, TUNINGS
+
+class Fretboard():
+    """ Pitch classes (C=0, C#=1, ..., B=11) of every (string, fret) as an integer matrix.
+    Rows are strings from the lowest one (same order as ``INIT_KEYS``), and columns are frets
+    (0 is the open string.) String numbers (``string=6``) count from the highest string as usual.
+    Use `get_fretboard` to share one instance per tuning.
+    @params tuning    : (str, list) Name in ``TUNINGS``, or open notes from the lowest string.
+    @params num_frets : (int) Number of positions on each string.
+    ~~~
+    examples)
+    >>> fretboard = Fretboard(tuning="drop_d", num_frets=24)
+    >>> fretboard.pitches.shape
+    (6, 24)
+    >>> fretboard.fret("E", string=6)
+    2
+    >>> fretboard.positions(["C", "E", "G"])[:3]
+    array([[0, 2], [0, 5], [0, 10]])
+    """
+    def __init__(self, tuning="standard", num_frets=NUM_FRETS):
+        if isinstance(tuning, str):
+            handleKeyError(lst=list(TUNINGS.keys()), tuning=tuning)
+            tuning = TUNINGS.get(tuning)
+        self.tuning = tuple(tuning)
+        self.num_frets = num_frets
+        self.open_pitches = np.asarray([note2pitch(note) for note in self.tuning], dtype=np.int64)
+        self.pitches = (self.open_pitches[:,None] + np.arange(num_frets)[None,:]) % LEN_OCTAVES
+        # Reverse index: pitch class -> [(row, fret), ...]
+        self.note_positions = [np.argwhere(self.pitches == pitch) for pitch in range(LEN_OCTAVES)]
+        for array in [self.open_pitches, self.pitches] + self.note_positions:
+            array.flags.writeable = False
+
+    def __repr__(self):
+        return f"Fretboard(tuning={list(self.tuning)}, num_frets={self.num_frets})"
+
+    @property
+    def num_strings(self):
+        return len(self.tuning)
+
+    def row(self, string):
+        """ String number (1 is the highest string) -> row of `pitches` """
+        if not 1 <= string <= self.num_strings:
+            raise ValueError(f"string should be in [1, {self.num_strings}], but got {string}")
+        return self.num_strings - string
+
+    def note(self, row, fret):
+        """ Note at ``fret`` of the string in ``row`` (any fret, even off the fretboard.) """
+        return NOTES[(int(self.open_pitches[row]) + fret) % LEN_OCTAVES]
+
+    def notes_at(self, fret):
+        """ Notes at ``fret`` of every string, from the lowest string. """
+        return [NOTES[pitch] for pitch in ((self.open_pitches + fret) % LEN_OCTAVES).tolist()]
+
+    def fret(self, note, string, start=0):
+        """ The lowest fret (>= ``start``) where ``note`` is on the ``string``. """
+        open_pitch = int(self.open_pitches[self.row(string)])
+        return start + (note2pitch(note) - open_pitch - start) % LEN_OCTAVES
+
+    def mask(self, notes):
+        """ Boolean matrix of the positions whose note is in ``notes`` """
+        return np.isin(self.pitches, [note2pitch(note) for note in notes])
+
+    def positions(self, notes):
+        """ (row, fret) of every position whose note is in ``notes``, ordered by string and fret. """
+        return np.argwhere(self.mask(notes))
+
+    def frets_per_string(self, notes):
+        """ [frets of the lowest string, ..., frets of the highest string] of ``notes`` """
+        mask = self.mask(notes)
+        return [np.flatnonzero(row) for row in mask]
+
+def get_fretboard(tuning="standard", num_frets=NUM_FRETS):
+    """ Shared (memoized) `Fretboard` """
+    if not isinstance(tuning, str):
+        tuning = tuple(tuning)
+    return _get_fretboard(tuning, num_frets)
+
+@functools.lru_cache(maxsize=None)
+def _get_fretboard(tuning, num_frets):
+    return Fretboard(tuning=tuning, num_frets=num_frets)
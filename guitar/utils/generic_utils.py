@@ -0,0 +1,111 @@
+# coding: utf-8
+import re
+import sys
+import time
+
+def _toCOLOR_create(color):
+    code = {
+        "BLACK"  : "\033[30m",
+        "RED"    : "\033[31m",
+        "GREEN"  : "\033[32m",
+        "YELLOW" : "\033[33m",
+        "BLUE"   : "\033[34m",
+        "PURPLE" : "\033[35m",
+        "CYAN"   : "\033[36m",
+        "WHITE"  : "\033[37m",
+    }.get(color)
+    return lambda x: f"{code}{x}\033[0m"
+
+toBLACK  = _toCOLOR_create("BLACK")
+toRED    = _toCOLOR_create("RED")
+toGREEN  = _toCOLOR_create("GREEN")
+toYELLOW = _toCOLOR_create("YELLOW")
+toBLUE   = _toCOLOR_create("BLUE")
+toPURPLE = _toCOLOR_create("PURPLE")
+toCYAN   = _toCOLOR_create("CYAN")
+toWHITE  = _toCOLOR_create("WHITE")
+
+def handleKeyError(lst, msg_="", **kwargs):
+    k,v = kwargs.popitem()
+    if v not in lst:
+        lst = ', '.join([f"'{e}'" for e in lst])
+        raise KeyError(f"Please chose the argment `{k}` from {lst}.\n{toGREEN(msg_)}")
+
+def handleTypeError(types, msg_="", **kwargs):
+    type2str = lambda t: re.sub(r"<class '(.*?)'>", toBLUE(r"\1"), str(t))
+    k,v = kwargs.popitem()
+    if not any([isinstance(v,t) for t in types]):
+        str_true_types  = ', '.join([type2str(t) for t in types])
+        srt_false_type = type2str(type(v))
+        if len(types)==1:
+            err_msg = f"must be {str_true_types}"
+        else:
+            err_msg = f"must be one of {str_true_types}"
+        raise TypeError(f"`{k}` {err_msg}, not {srt_false_type}.\n{toGREEN(msg_)}")
+
+def chooseTextColor(rgb, ctype="rgb", max_val=1):
+    """ Choose black or white text for the background ``rgb``.
+    Ref: WCAG (https://www.w3.org/TR/WCAG20/)
+    """
+    R,G,B = [e/max_val for e in rgb]
+    # Relative Brightness BackGround.
+    Lbg = 0.2126*R + 0.7152*G + 0.0722*B
+    Lw = 1 # Relative Brightness of White
+    Lb = 0 # Relative Brightness of Black
+    Cw = (Lw + 0.05) / (Lbg + 0.05)
+    Cb = (Lbg + 0.05) / (Lb + 0.05)
+    return (0,0,0) if Cb>Cw else (max_val,max_val,max_val)
+
+class ProgressMonitor():
+    """
+    Monitor the loop progress.
+    @params max_iter: (int) Maximum number of iterations. None if unknown (only the count is shown.)
+    @params verbose : (int) -1, 0, 1
+        -1 = silent
+        0  = only progress bar
+        1  = progress bar and metrics
+    @params barname : (str)
+    ~~~
+    examples)
+    >>> max_iter = 100
+    >>> monitor = ProgressMonitor(max_iter=max_iter, verbose=1, barname="NAME")
+    >>> for it in range(max_iter):
+    >>>     monitor.report(it, loop=it)
+    >>> monitor.remove()
+
+    NAME 100/100[####################]100.00% - 0.010[s]  loop: 99
+    """
+    def __init__(self, max_iter, verbose=1, barname=""):
+        self.max_iter = None if max_iter is None else max(max_iter, 1)
+        self.digit = len(str(max_iter or 0))
+        self.verbose = verbose
+        self.barname = barname + " " if len(barname)>0 else ""
+        self.initial_seconds_since_epoch = time.time()
+        self.report = {
+            -1 : self._report_silent,
+             0 : self._report_only_progress_bar,
+             1 : self._report_progress_bar_and_metrics,
+        }.get(verbose, self._report_progress_bar_and_metrics)
+        self.report(it=-1)
+
+    def _progress_bar(self, it):
+        it += 1
+        if self.max_iter is None:
+            return f"\r{self.barname}{it} - {time.time()-self.initial_seconds_since_epoch:.3f}[s]"
+        return f"\r{self.barname}{it:>0{self.digit}}/{self.max_iter}" + \
+               f"[{('#' * int((it/self.max_iter)/0.05)).ljust(20, '-')}]" + \
+               f"{it/self.max_iter:>7.2%} - {time.time()-self.initial_seconds_since_epoch:.3f}[s]"
+
+    def _report_silent(self, it, **metrics):
+        pass
+
+    def _report_only_progress_bar(self, it, **metrics):
+        sys.stdout.write(self._progress_bar(it))
+
+    def _report_progress_bar_and_metrics(self, it, **metrics):
+        metric = ", ".join([f"{k}: {toBLUE(v)}" for k,v in metrics.items()])
+        sys.stdout.write(self._progress_bar(it) + "   " + metric)
+
+    def remove(self):
+        if self.verbose >= 0:
+            print()
@@ -1,9 +1,14 @@
 # coding: utf-8
-from collections import defaultdict
+import functools
+from collections import defaultdict, namedtuple
 
-from .fmt_utils import ufret2pyguitar
-from ..env import (NUM_FRETS, LEN_OCTAVES, MAJOR_MODES,
-                   SCALE2INTERVALS, WHOLE_NOTES, GUITAR_STRINGS)
+from .chord_utils import parse_chord
+from .fretboard_utils import get_fretboard
+from .key_utils import detect_keys
+from ..env import (NUM_FRETS, LEN_OCTAVES, MAJOR_MODES, NOTES,
+                   SCALE2INTERVALS, WHOLE_NOTES)
+
+ScaleContext = namedtuple("ScaleContext", ["key", "scale", "intervals", "notes", "fretboard", "frets"])
 
 def get_intervals(scale):
     """ Get intervals from scale. """
@@ -21,70 +26,52 @@ def get_notes(key, scale):
     octave = WHOLE_NOTES[root:root+LEN_OCTAVES]
     return [octave[i] for i in scale]
 
-def find_notes_positions(notes):
-    """ Find Notes positions in guitar strings. """
-    notes_positions = dict()
-    for init_key, string in GUITAR_STRINGS.items():
-        indexes = []
-        for note in notes:
-            idx = string.index(note)
-            while idx < NUM_FRETS:
-                indexes.append(idx)
-                idx += LEN_OCTAVES
-        notes_positions[init_key] = indexes
-    return notes_positions
+def find_notes_positions(notes, tuning="standard", num_frets=NUM_FRETS):
+    """ Find Notes positions in guitar strings. {open note: [frets]} """
+    fretboard = get_fretboard(tuning, num_frets)
+    return {
+        init_key : frets.tolist()
+        for init_key, frets in zip(fretboard.tuning, fretboard.frets_per_string(notes))
+    }
+
+@functools.lru_cache(maxsize=None)
+def _get_scale_context(key, scale, tuning, num_frets):
+    intervals = get_intervals(scale)
+    notes = tuple(get_notes(key, intervals))
+    fretboard = get_fretboard(tuning, num_frets)
+    return ScaleContext(key=key, scale=scale, intervals=intervals, notes=notes,
+                        fretboard=fretboard, frets=tuple(fretboard.frets_per_string(notes)))
+
+def get_scale_context(key, scale, tuning="standard", num_frets=NUM_FRETS):
+    """ Notes of the scale and their frets on each string, computed once per (key, scale, tuning, num_frets)
+    @return context : (ScaleContext) ``context.frets[row]`` are the frets of the scale on the string in ``row``
+    """
+    if not isinstance(tuning, str):
+        tuning = tuple(tuning)
+    return _get_scale_context(key, scale, tuning, num_frets)
 
 def find_key_major_scale(majors=[], minors=[]):
     """
     Find key based on the 'chords' that appear in the music and the specified 'scale'
+    (The best major key of `detect_keys` without the tonic weight.)
     """
-    is_majors  = [1,0,0,1,1,0,0]
-    num_majors = len(majors); num_minors = len(minors)
-    if num_majors+num_minors==0:
-        raise ValueError("Couldn't find key from nothing.")
-
-    # If majors/minors is dict, they have the frequencies, and we can use them as weights.
-    if not isinstance(majors, dict):
-        majors = dict(zip(majors, [1 for _ in range(len(majors))]))
-    if not isinstance(minors, dict):
-        minors = dict(zip(minors, [1 for _ in range(len(minors))]))
-    
-    get_score = {
-        (True, True)  : lambda maj,min : maj/num_majors + min/num_minors,
-        (True, False) : lambda maj,min : maj/num_majors,
-        (False, True) : lambda maj,min : min/num_minors,
-    }[(num_majors>0, num_minors>0)]
-
-    best_score = -1
-    for key in WHOLE_NOTES[:LEN_OCTAVES]:
-        maj = min = 0
-        notes = get_notes(key, SCALE2INTERVALS.get("major"))
-        for is_maj,note in zip(is_majors, notes):
-            if is_maj and note in majors: 
-                maj+=majors.get(note)
-            elif (not is_maj) and note in minors: 
-                min+=minors.get(note)
-        score = get_score(maj, min)
-        if score > best_score:
-            best_score=score
-            best_key=key
-    return best_key
+    return detect_keys(majors=majors, minors=minors, scales=["major"], top=1, tonic_weight=0)[0].key
 
 def get_chord_components(data, fmt="ufret"):
     majors = defaultdict(int)
     minors = defaultdict(int)
 
-    chord_convertor = {
-        "ufret" : ufret2pyguitar
-    }.get(fmt, ufret2pyguitar)
+    chord_parser = {
+        "ufret" : parse_chord
+    }.get(fmt, parse_chord)
 
     for row in data.values():
-        for chord in row.get("chord"):
-            if chord == "": 
+        for symbol in row.get("chord"):
+            if symbol == "": 
                 continue
-            note, mode, d = chord_convertor(chord)
-            if mode in MAJOR_MODES:
-                majors[note] += 1
+            chord = chord_parser(symbol)
+            if chord.quality in MAJOR_MODES:
+                majors[NOTES[chord.root]] += 1
             else:
-                minors[note] += 1
-    return majors, minors
\ No newline at end of file
+                minors[NOTES[chord.root]] += 1
+    return majors, minors
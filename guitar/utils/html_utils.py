@@ -0,0 +1,92 @@
+# coding: utf-8
+import re
+from html.parser import HTMLParser
+
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+class Element():
+    """ Minimal DOM node built by `parse_html`. """
+    __slots__ = ("tag", "attrs", "children", "parent")
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        self.children = []
+        self.parent = parent
+
+    def __repr__(self):
+        return f"<{self.tag} {self.attrs}>"
+
+    @property
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def iter(self):
+        """ Iterate over all descendant elements in document order. """
+        stack = [c for c in reversed(self.children) if isinstance(c, Element)]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(c for c in reversed(node.children) if isinstance(c, Element))
+
+    def find_by_id(self, id_):
+        for node in self.iter():
+            if node.attrs.get("id") == id_:
+                return node
+        return None
+
+    def find_all(self, tag=None, class_name=None):
+        return [
+            node for node in self.iter()
+            if (tag is None or node.tag == tag) and (class_name is None or class_name in node.classes)
+        ]
+
+    @property
+    def text(self):
+        """ Whitespace-collapsed text content (close to WebElement.text) """
+        chunks = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                chunks.append(node)
+            elif node.tag == "br":
+                chunks.append("\n")
+            elif node.tag not in ("script", "style"):
+                stack.extend(reversed(node.children))
+        return re.sub(r"[ \t\r\f\v]+", " ", "".join(chunks)).strip()
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document")
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Element(tag, attrs, parent=self.current)
+        self.current.children.append(node)
+        if tag not in VOID_ELEMENTS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Element(tag, attrs, parent=self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element, ignoring stray end tags.
+        node = self.current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+def parse_html(html):
+    """ Parse ``html`` (str) and return the document root `Element`. """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
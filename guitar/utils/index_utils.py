@@ -0,0 +1,229 @@
+# coding: utf-8
+import os
+import re
+import json
+from collections import defaultdict
+
+from .cache_utils import atomic_write
+from .chord_utils import parse_chord
+from .guitar_utils import get_chord_components
+from .key_utils import detect_keys
+from ..env import NOTES, LEN_OCTAVES, CHORD_FORMULAS, SCALE2INTERVALS
+
+INDEX_VERSION = 1
+MINOR_THIRD = 3
+MAJOR_THIRD = 4
+# Roman numeral of a degree of the major scale (e.g. "I", "vi", "♭VII", "V7")
+ROMAN_PATTERN = re.compile(r"^([#♯b♭]?)(VII|VI|V|IV|III|II|I|vii|vi|v|iv|iii|ii|i)(.*)$")
+ROMAN_NUMERALS = ["I", "II", "III", "IV", "V", "VI", "VII"]
+
+def chord_key(chord):
+    """ `Chord` -> "G:major" (the bass of slash chords doesn't change how to play the chord.) """
+    return f"{NOTES[chord.root]}:{chord.quality}"
+
+def chord_family(quality):
+    """ "m" if the chord has a minor third (and no major third), otherwise "M" """
+    intervals = CHORD_FORMULAS.get(quality)
+    return "m" if (MINOR_THIRD in intervals and MAJOR_THIRD not in intervals) else "M"
+
+def parse_progression_token(token):
+    """ Chord symbol (e.g. "Em") or roman numeral (e.g. "vi") -> (pitch, family) """
+    match = ROMAN_PATTERN.match(token)
+    if match is None:
+        chord = parse_chord(token)
+        return (chord.root, chord_family(chord.quality))
+    accidental, numeral, suffix = match.groups()
+    pitch = SCALE2INTERVALS.get("major")[ROMAN_NUMERALS.index(numeral.upper())]
+    pitch += {"": 0, "#": 1, "♯": 1, "b": -1, "♭": -1}[accidental]
+    family = "M" if numeral.isupper() and suffix not in ["m", "°", "dim"] else "m"
+    return (pitch % LEN_OCTAVES, family)
+
+def progression_ngrams(steps, n):
+    """ Transposition-invariant n-grams: each chord is "<semitones from the first chord><family>"
+    @params steps : [(pitch, family), ...] (repeated chords already merged)
+    """
+    for i in range(len(steps)-n+1):
+        window = steps[i:i+n]
+        yield "-".join([f"{(pitch-window[0][0])%LEN_OCTAVES}{family}" for pitch,family in window])
+
+def song_features(data, max_n=4):
+    """ Index entries of a song in the dict format.
+    @return chords : (set) `chord_key` of every chord ("?<symbol>" if it couldn't be parsed.)
+    @return ngrams : (set) `progression_ngrams` for n = 2, ..., ``max_n``
+    """
+    chords = set()
+    steps = []
+    for row in data.values():
+        for symbol in row.get("chord"):
+            if symbol == "":
+                continue
+            try:
+                chord = parse_chord(symbol)
+            except ValueError:
+                chords.add(f"?{symbol}")
+                continue
+            chords.add(chord_key(chord))
+            step = (chord.root, chord_family(chord.quality))
+            # The same chord over several bars is one step of the progression.
+            if len(steps)==0 or steps[-1] != step:
+                steps.append(step)
+    ngrams = set()
+    for n in range(2, max_n+1):
+        ngrams.update(progression_ngrams(steps, n))
+    return chords, ngrams
+
+def find_key(data):
+    """ (key, scale) of the best `detect_keys` candidate, or (None, None) """
+    try:
+        best = detect_keys(*get_chord_components(data), top=1)[0]
+    except ValueError:
+        return (None, None)
+    return (best.key, best.scale)
+
+class SongIndex():
+    """ On-disk inverted index of chord books (json): chord -> songs, and transposition-invariant
+    chord progression n-grams -> songs. Postings are kept as sets in memory, so queries are a few
+    set operations. Files are re-indexed only if their size or mtime changed.
+    @params path  : (str) json file of the index.
+    @params max_n : (int) Longest progression that can be queried.
+    ~~~
+    examples)
+    >>> index = SongIndex("songs.index.json")
+    >>> index.update("path/to/jsons")
+    {'added': 2000, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    >>> index.playable_with(["G", "C", "D", "Em"])
+    ['path/to/jsons/song1.json', ...]
+    >>> index.with_progression(["I", "V", "vi", "IV"])
+    ['path/to/jsons/song2.json', ...]
+    """
+    def __init__(self, path, max_n=4):
+        self.path = path
+        self.max_n = max_n
+        self.songs = {}
+        self.ids = {}
+        self.chords = defaultdict(set)
+        self.ngrams = defaultdict(set)
+        self.next_id = 0
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.songs)
+
+    def __repr__(self):
+        return f"SongIndex({repr(self.path)}, songs={len(self)}, chords={len(self.chords)}, ngrams={len(self.ngrams)})"
+
+    def load(self):
+        with open(self.path, mode="r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {index.get('version')} of {self.path}")
+        self.max_n = index["max_n"]
+        self.next_id = index["next_id"]
+        self.songs = {int(id_): song for id_,song in index["songs"].items()}
+        self.ids = {song["path"]: id_ for id_,song in self.songs.items()}
+        self.chords = defaultdict(set, {key: set(ids) for key,ids in index["chords"].items()})
+        self.ngrams = defaultdict(set, {key: set(ids) for key,ids in index["ngrams"].items()})
+
+    def save(self):
+        atomic_write(self.path, json.dumps({
+            "version" : INDEX_VERSION,
+            "max_n"   : self.max_n,
+            "next_id" : self.next_id,
+            "songs"   : self.songs,
+            "chords"  : {key: sorted(ids) for key,ids in self.chords.items()},
+            "ngrams"  : {key: sorted(ids) for key,ids in self.ngrams.items()},
+        }, ensure_ascii=False))
+
+    def add(self, path, data=None):
+        """ (Re-)index a chord book, and return its id. """
+        stat = os.stat(path)
+        if data is None:
+            with open(path, mode="r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.remove(path)
+        chords, ngrams = song_features(data, max_n=self.max_n)
+        key, scale = find_key(data)
+        id_ = self.next_id
+        self.next_id += 1
+        self.ids[path] = id_
+        self.songs[id_] = {
+            "path": path, "mtime": stat.st_mtime_ns, "size": stat.st_size,
+            "key": key, "scale": scale, "num_chords": len(chords),
+        }
+        for chord in chords:
+            self.chords[chord].add(id_)
+        for ngram in ngrams:
+            self.ngrams[ngram].add(id_)
+        return id_
+
+    def remove(self, path):
+        """ Remove a chord book from the index (if indexed.) """
+        id_ = self.ids.pop(path, None)
+        if id_ is None:
+            return False
+        for postings in [self.chords, self.ngrams]:
+            for key in list(postings.keys()):
+                postings[key].discard(id_)
+                if len(postings[key])==0:
+                    del postings[key]
+        del self.songs[id_]
+        return True
+
+    def update(self, input, save=True):
+        """ Index new and modified json files of the directory ``input``, and drop the deleted ones.
+        @return stats : (dict) The number of added / updated / removed / unchanged songs.
+        """
+        input = os.path.normpath(input)
+        paths = sorted(
+            os.path.join(input, fn) for fn in os.listdir(input)
+            if os.path.splitext(fn)[1] == ".json"
+        )
+        indexed = {path: self.songs[id_] for path,id_ in self.ids.items()}
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        for path in paths:
+            song = indexed.get(path)
+            stat = os.stat(path)
+            if song is not None and (song["mtime"], song["size"]) == (stat.st_mtime_ns, stat.st_size):
+                stats["unchanged"] += 1
+                continue
+            self.add(path)
+            stats["added" if song is None else "updated"] += 1
+        paths = set(paths)
+        for path in indexed.keys():
+            if os.path.dirname(path) == input and path not in paths:
+                self.remove(path)
+                stats["removed"] += 1
+        if save:
+            self.save()
+        return stats
+
+    def _paths(self, ids):
+        return sorted(self.songs[id_]["path"] for id_ in ids)
+
+    def with_chords(self, chords):
+        """ Songs which use all of ``chords`` (e.g. ["F#m", "Bm7"]) """
+        keys = [chord_key(parse_chord(chord)) for chord in chords]
+        ids = set.intersection(*[self.chords.get(key, set()) for key in keys]) if len(keys)>0 else set()
+        return self._paths(ids)
+
+    def playable_with(self, chords):
+        """ Songs which use only ``chords`` (e.g. ["G", "C", "D", "Em"] for beginners.) """
+        counts = defaultdict(int)
+        for key in {chord_key(parse_chord(chord)) for chord in chords}:
+            for id_ in self.chords.get(key, ()):
+                counts[id_] += 1
+        return self._paths(id_ for id_,count in counts.items() if count==self.songs[id_]["num_chords"])
+
+    def with_progression(self, progression):
+        """ Songs which contain ``progression`` in any key.
+        @params progression : (list) Chord symbols (e.g. ["G", "D", "Em", "C"]) or roman numerals (e.g. ["I", "V", "vi", "IV"])
+        """
+        steps = []
+        for step in map(parse_progression_token, progression):
+            if len(steps)==0 or steps[-1] != step:
+                steps.append(step)
+        if not 2 <= len(steps) <= self.max_n:
+            raise ValueError(f"progression should have 2 to {self.max_n} chords, but got {len(steps)}")
+        ngram, = progression_ngrams(steps, len(steps))
+        return self._paths(self.ngrams.get(ngram, ()))
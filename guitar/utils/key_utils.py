@@ -0,0 +1,154 @@
+# coding: utf-8
+import functools
+from collections import namedtuple
+import numpy as np
+
+from .generic_utils import handleKeyError
+from .chord_utils import note2pitch
+from ..env import NOTES, LEN_OCTAVES, SCALE2INTERVALS
+
+MAJOR_THIRD = 4
+MINOR_THIRD = 3
+
+KeyCandidate = namedtuple("KeyCandidate", ["key", "scale", "score", "confidence"])
+
+@functools.lru_cache(maxsize=None)
+def _get_key_templates(scales):
+    """ (24, len(scales)*12) matrix. Column ``s*12+root`` is the key (``NOTES[root]``, ``scales[s]``),
+    and its rows 0-11 (12-23) are 1 where a major (minor) chord on that pitch belongs to the key.
+    A chord on a scale degree is major (minor) if the major (minor) third above it is in the scale,
+    so the major scale gives I, IV, V (major) and ii, iii, vi, vii (minor), as in `find_key_major_scale`.
+    """
+    templates = np.zeros(shape=(2, LEN_OCTAVES, len(scales), LEN_OCTAVES), dtype=np.float64)
+    pitches = np.arange(LEN_OCTAVES)
+    for s,scale in enumerate(scales):
+        in_scale = np.isin(pitches, SCALE2INTERVALS.get(scale))
+        degrees = np.flatnonzero(in_scale)
+        majors = degrees[in_scale[(degrees+MAJOR_THIRD)%LEN_OCTAVES]]
+        minors = degrees[in_scale[(degrees+MINOR_THIRD)%LEN_OCTAVES]]
+        for root in range(LEN_OCTAVES):
+            templates[0, (majors+root)%LEN_OCTAVES, s, root] = 1
+            templates[1, (minors+root)%LEN_OCTAVES, s, root] = 1
+    templates = templates.reshape(2*LEN_OCTAVES, len(scales)*LEN_OCTAVES)
+    templates.flags.writeable = False
+    return templates
+
+def get_key_templates(scales=None):
+    """ Chord templates of every (scale, root), built once per ``scales``. See `_get_key_templates` """
+    scales = tuple(SCALE2INTERVALS.keys()) if scales is None else tuple(scales)
+    for scale in scales:
+        handleKeyError(lst=list(SCALE2INTERVALS.keys()), scale=scale)
+    return scales, _get_key_templates(scales)
+
+_note2pitch = functools.lru_cache(maxsize=None)(note2pitch)
+
+def chord_vectors(components):
+    """ [(majors, minors), ...] from `get_chord_components` -> (N, 24) chord frequencies.
+    Columns 0-11 (12-23) are the major (minor) chords on C, C#, ..., B. Lists count each chord once.
+    """
+    X = np.zeros(shape=(len(components), 2*LEN_OCTAVES), dtype=np.float64)
+    for i,chords in enumerate(components):
+        for offset,notes in zip([0, LEN_OCTAVES], chords):
+            if not isinstance(notes, dict):
+                notes = dict.fromkeys(notes, 1)
+            for note,freq in notes.items():
+                X[i, offset+_note2pitch(note)] += freq
+    return X
+
+def score_keys(X, templates, tonic_weight=0.0):
+    """ Scores of every key for every song, as matrix products over all keys at once.
+    @params X            : (ndarray) (N, 24) Chord frequencies from `chord_vectors`
+    @params templates    : (ndarray) (24, K) from `get_key_templates`
+    @params tonic_weight : (float) Weight of the share of the tonic chord. Relative keys (e.g. C major
+                           and A minor) contain the same chords, and only the tonic tells them apart.
+    @return scores       : (ndarray) (N, K) Sum of the frequencies of the majors (minors) in the key,
+                           divided by the number of distinct majors (minors) in the song.
+    @return confidences  : (ndarray) (N, K) Share of the chords (with their frequencies) in the key.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    majors, minors = X[:,:LEN_OCTAVES], X[:,LEN_OCTAVES:]
+    # Numerators are 0 where the denominators are, so 1 can stand in for them.
+    num_majors = np.maximum(np.count_nonzero(majors, axis=1)[:,None], 1)
+    num_minors = np.maximum(np.count_nonzero(minors, axis=1)[:,None], 1)
+    totals = np.maximum(X.sum(axis=1, keepdims=True), 1)
+    scores = (majors @ templates[:LEN_OCTAVES]) / num_majors + (minors @ templates[LEN_OCTAVES:]) / num_minors
+    confidences = (X @ templates) / totals
+    if tonic_weight:
+        # The tonic chord is the one on the root (row ``root`` or ``12+root``) in the template.
+        roots = np.arange(templates.shape[1]) % LEN_OCTAVES
+        tonic = X @ (templates * (np.arange(2*LEN_OCTAVES)[:,None] % LEN_OCTAVES == roots[None,:]))
+        scores += tonic_weight * tonic / totals
+    return scores, confidences
+
+def rank_keys(scales, scores, confidences, top=5):
+    """ (N, K) scores -> [[KeyCandidate, ...], ...] The best ``top`` keys of each song. """
+    # Stable sort: ties keep the order of ``scales`` and then roots from C.
+    order = np.argsort(-scores, axis=1, kind="stable")[:,:top]
+    names = [(NOTES[k%LEN_OCTAVES], scales[k//LEN_OCTAVES]) for k in range(scores.shape[1])]
+    return [
+        [KeyCandidate(*names[k], score, confidence) for k,score,confidence in zip(*row)]
+        for row in zip(order.tolist(),
+                       np.take_along_axis(scores, order, axis=1).tolist(),
+                       np.take_along_axis(confidences, order, axis=1).tolist())
+    ]
+
+def detect_keys(majors=[], minors=[], scales=None, top=5, tonic_weight=0.1):
+    """ Rank the keys (12 roots x ``scales``) of a song by the chords that appear in it.
+    @params majors, minors : (dict) Frequencies of the major/minor chords (`get_chord_components`), or (list)
+    @params scales         : (list) Keys of ``SCALE2INTERVALS``. Defaults to all of them.
+    @params top            : (int) Number of candidates to return (None for all of them.)
+    @params tonic_weight   : (float) See `score_keys`
+    @return candidates     : [KeyCandidate(key, scale, score, confidence), ...] from the best one.
+    ~~~
+    examples)
+    >>> detect_keys(*get_chord_components(data), top=2)
+    [KeyCandidate(key='B', scale='major', score=3.43, confidence=0.92),
+     KeyCandidate(key='G#', scale='minor', score=3.37, confidence=0.92)]
+    """
+    if len(majors)+len(minors)==0:
+        raise ValueError("Couldn't find key from nothing.")
+    return detect_keys_batch([(majors, minors)], scales=scales, top=top, tonic_weight=tonic_weight)[0]
+
+def detect_keys_batch(components, scales=None, top=5, tonic_weight=0.1):
+    """ `detect_keys` of many songs at once. All songs are scored together by `score_keys`
+    @params components : [(majors, minors), ...] or (ndarray) (N, 24) from `chord_vectors`
+    @return candidates : [[KeyCandidate, ...], ...] Songs without chords get ``[]``
+    ~~~
+    examples)
+    >>> components = [get_chord_components(data) for data in catalog]
+    >>> [candidates[0].key for candidates in detect_keys_batch(components, scales=["major"])]
+    ['B', 'C', 'F#', ...]
+    """
+    X = components if isinstance(components, np.ndarray) else chord_vectors(components)
+    scales, templates = get_key_templates(scales)
+    scores, confidences = score_keys(X, templates, tonic_weight=tonic_weight)
+    has_chords = X.any(axis=1).tolist()
+    return [
+        candidates if has_chords[i] else []
+        for i,candidates in enumerate(rank_keys(scales, scores, confidences, top=top))
+    ]
+
+def best_key(data, key=None, scale="major"):
+    """ The key of a song, as `export_ufret_chordbooks` chooses it: the best candidate of `detect_keys`
+    in ``scale``, whose root is ``key`` if it is given.
+    @params data  : (dict) Chords and lyrics of a song (``fmt="ufret"`` of `get_chord_components`)
+    @params key   : (str) Root of the key if it is known (then only its scale is detected.)
+    @params scale : (str) A key of ``SCALE2INTERVALS``, or "auto" to detect it too.
+    @return best  : (KeyCandidate)
+    ~~~
+    examples)
+    >>> best_key(data, scale="auto")
+    KeyCandidate(key='B', scale='major', score=3.43, confidence=0.92)
+    >>> best_key(data, key="H")
+    ValueError: Couldn't find the key 'H' of the scale(s) ['major']
+    """
+    # `guitar_utils` imports this module.
+    from .guitar_utils import get_chord_components
+    scales = None if scale=="auto" else [scale]
+    best = next((
+        candidate for candidate in detect_keys(*get_chord_components(data=data), scales=scales, top=None)
+        if key in (None, candidate.key)
+    ), None)
+    if best is None:
+        raise ValueError(f"Couldn't find the key '{key}' of the scale(s) {scales or 'auto'}")
+    return best
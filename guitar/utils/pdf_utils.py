@@ -0,0 +1,465 @@
+# coding: utf-8
+""" A small PDF writer (objects, content streams and embedded TrueType/OpenType fonts.) """
+import io
+import re
+import zlib
+import math
+
+class Name(str):
+    """ PDF name object (``/Name``) """
+
+class Ref():
+    __slots__ = ("id",)
+    def __init__(self, id):
+        self.id = id
+
+def pdf_repr(value):
+    """ Serialize a python value as a PDF object. """
+    if isinstance(value, Ref):
+        return f"{value.id} 0 R".encode()
+    if isinstance(value, Name):
+        return b"/" + re.sub(r"[^!-~]|[()<>\[\]{}/%#]", lambda m: "#%02X" % ord(m.group()), value).encode()
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int):
+        return str(value).encode()
+    if isinstance(value, float):
+        return fmt_num(value).encode()
+    if value is None:
+        return b"null"
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        if not all(ord(c) < 128 for c in value):
+            return b"<FEFF" + value.encode("utf-16-be").hex().upper().encode() + b">"
+        escaped = value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return b"(" + escaped.encode("ascii") + b")"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b" ".join(pdf_repr(v) for v in value) + b"]"
+    if isinstance(value, dict):
+        return b"<<" + b"".join(pdf_repr(Name(k)) + b" " + pdf_repr(v) for k,v in value.items()) + b">>"
+    raise TypeError(f"Can't serialize {type(value)} as a PDF object.")
+
+def fmt_num(x):
+    if x == int(x):
+        return str(int(x))
+    return f"{x:.3f}".rstrip("0").rstrip(".")
+
+class PDFDocument():
+    """ Collects numbered objects and writes them with a cross-reference table.
+    After `open`, every finished object is written out right away and only its
+    offset is kept, so memory doesn't grow with the number of pages.
+    ~~~
+    examples)
+    >>> doc = PDFDocument()
+    >>> doc.open("out.pdf")
+    >>> doc.add_page(doc.stream(canvas.getvalue()), resources)
+    >>> doc.write("out.pdf", mediabox=[0, 0, 595, 842])
+    """
+    HEADER = b"%PDF-1.6\n%\xe2\xe3\xcf\xd3\n"
+
+    def __init__(self, compress=True):
+        self.compress = compress
+        # bytes (not yet written), int (offset in the file) or None (reserved.)
+        self._objects = [None]
+        self._fp = None
+        self._own_fp = False
+        self.pages = []
+        self.pages_ref = self.reserve()
+
+    def open(self, f):
+        """ Start writing to ``f`` (a path or a binary file object.) """
+        if self._fp is not None:
+            raise RuntimeError("The document is already open.")
+        if isinstance(f, str):
+            self._fp, self._own_fp = open(f, mode="wb"), True
+        else:
+            self._fp, self._own_fp = f, False
+        self._start = self._fp.tell() if self._fp.seekable() else 0
+        self._fp.write(self.HEADER)
+        for i,obj in enumerate(self._objects):
+            if isinstance(obj, bytes):
+                self._write_object(i, obj)
+        return self
+
+    def _write_object(self, i, obj):
+        self._objects[i] = self._tell()
+        self._fp.write(f"{i} 0 obj\n".encode() + obj + b"\nendobj\n")
+
+    def _tell(self):
+        return self._fp.tell() - self._start
+
+    def reserve(self):
+        """ Reserve an object number, to be filled later by `set` """
+        self._objects.append(None)
+        return Ref(len(self._objects)-1)
+
+    def _set_bytes(self, ref, obj):
+        if isinstance(self._objects[ref.id], int):
+            raise ValueError(f"Object {ref.id} has already been written.")
+        if self._fp is None:
+            self._objects[ref.id] = obj
+        else:
+            self._write_object(ref.id, obj)
+        return ref
+
+    def set(self, ref, value):
+        return self._set_bytes(ref, pdf_repr(value))
+
+    def add(self, value):
+        return self.set(self.reserve(), value)
+
+    def stream(self, data, attrs=None, ref=None, compress=None):
+        """ Add a stream object. """
+        attrs = dict(attrs or {})
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        if self.compress if compress is None else compress:
+            data = zlib.compress(data)
+            attrs["Filter"] = Name("FlateDecode")
+        attrs["Length"] = len(data)
+        return self._set_bytes(ref or self.reserve(), pdf_repr(attrs) + b"\nstream\n" + data + b"\nendstream")
+
+    def add_page(self, contents, resources):
+        page = self.add({"Type": Name("Page"), "Parent": self.pages_ref, "Contents": contents, "Resources": resources})
+        self.pages.append(page)
+        return page
+
+    def import_pages(self, reader):
+        """ Append the pages of ``reader`` (`PDFReader`) with every object they use.
+        Attributes inherited from the source page tree (e.g. MediaBox) are not copied.
+        """
+        refs, pending = {}, []
+        def renumber(m):
+            id = int(m.group(1))
+            if id not in refs:
+                refs[id] = self.reserve()
+                pending.append(id)
+            return pdf_repr(refs[id])
+
+        page_ids = reader.page_ids()
+        for page in page_ids:
+            refs[page] = self.reserve()
+            self.pages.append(refs[page])
+        for page in page_ids:
+            head, body = reader.split_stream(reader.object(page))
+            head = PDFReader.REF_PATTERN.sub(renumber, PDFReader.PARENT_PATTERN.sub(b"", head))
+            head = head.rstrip()[:-2] + b"/Parent " + pdf_repr(self.pages_ref) + b">>"
+            self._set_bytes(refs[page], head + body)
+            while len(pending)>0:
+                id = pending.pop()
+                head, body = reader.split_stream(reader.object(id))
+                self._set_bytes(refs[id], PDFReader.REF_PATTERN.sub(renumber, head) + body)
+        return len(page_ids)
+
+    def write(self, f=None, mediabox=None, info=None):
+        """ Finish the document. ``f`` (a path or a binary file object) is only needed if not `open` yet. """
+        if self._fp is None:
+            if f is None:
+                raise ValueError("Specify where to write the document.")
+            self.open(f)
+        self.set(self.pages_ref, {"Type": Name("Pages"), "Kids": self.pages, "Count": len(self.pages), "MediaBox": mediabox})
+        catalog = self.add({"Type": Name("Catalog"), "Pages": self.pages_ref})
+        info = self.add(info or {"Producer": "PyGuitar"})
+        # Objects reserved but never filled.
+        for i,obj in enumerate(self._objects[1:], start=1):
+            if obj is None:
+                self._write_object(i, b"null")
+        xref = self._tell()
+        fp = self._fp
+        fp.write(f"xref\n0 {len(self._objects)}\n0000000000 65535 f \n".encode())
+        fp.write(b"".join(f"{offset:010d} 00000 n \n".encode() for offset in self._objects[1:]))
+        fp.write(b"trailer\n" + pdf_repr({"Size": len(self._objects), "Root": catalog, "Info": info}))
+        fp.write(f"\nstartxref\n{xref}\n%%EOF\n".encode())
+        self.close()
+
+    def close(self):
+        if self._own_fp:
+            self._fp.close()
+        self._fp, self._own_fp = None, False
+
+class PDFReader():
+    """ Reads a PDF with plain cross-reference tables, as written by `PDFDocument` and matplotlib.
+    Only enough to copy pages into another document (see `PDFDocument.import_pages`)
+    """
+    REF_PATTERN    = re.compile(rb"(\d+)\s+0\s+R\b")
+    PARENT_PATTERN = re.compile(rb"/Parent\s+\d+\s+0\s+R\b")
+    STREAM_PATTERN = re.compile(rb"\bstream\r?\n")
+
+    def __init__(self, path):
+        with open(path, mode="rb") as f:
+            self.data = f.read()
+        startxref = int(re.search(rb"startxref\s+(\d+)\s+%%EOF\s*$", self.data).group(1))
+        xref, trailer = self.data[startxref:].split(b"trailer", 1)
+        self.trailer = trailer
+        self.offsets = {}
+        lines = iter(xref.split(b"\n")[1:])
+        for line in lines:
+            fields = line.split()
+            if len(fields) != 2:
+                continue
+            start, num = map(int, fields)
+            for id in range(start, start+num):
+                offset, _, kind = next(lines).split()
+                if kind == b"n":
+                    self.offsets[id] = int(offset)
+        # Objects end before the next one (or the xref table) starts.
+        ends = sorted(self.offsets.values()) + [startxref]
+        self._ends = {offset: end for offset,end in zip(ends, ends[1:])}
+
+    def object(self, id):
+        """ Raw bytes of object ``id`` (between ``obj`` and ``endobj``) """
+        start = self.offsets[id]
+        end = self.data.rindex(b"endobj", start, self._ends[start])
+        start = self.data.index(b"obj", start) + 3
+        return self.data[start:end].strip()
+
+    def split_stream(self, obj):
+        """ -> (dictionary part, stream part) of an object. References are only in the former. """
+        m = self.STREAM_PATTERN.search(obj)
+        if m is None:
+            return (obj, b"")
+        return (obj[:m.start()], b"\n" + obj[m.start():])
+
+    def _ref(self, obj, key):
+        return int(re.search(rb"/" + key + rb"\s+(\d+)\s+0\s+R", obj).group(1))
+
+    def page_ids(self):
+        """ Object numbers of the pages, in order. """
+        root = self._ref(self.trailer, b"Root")
+        ids = []
+        def walk(id):
+            node = self.split_stream(self.object(id))[0]
+            if re.search(rb"/Type\s*/Pages\b", node) is None:
+                ids.append(id)
+                return
+            kids = re.search(rb"/Kids\s*\[(.*?)\]", node, flags=re.S).group(1)
+            for m in self.REF_PATTERN.finditer(kids):
+                walk(int(m.group(1)))
+        walk(self._ref(self.split_stream(self.object(root))[0], b"Pages"))
+        return ids
+
+class PDFFont():
+    """ A TrueType/OpenType font embedded as a CID-keyed (Type0, Identity-H) font.
+    Only the glyphs actually used are embedded (glyph ids are kept.)
+    """
+    def __init__(self, path, resource_name):
+        from fontTools.ttLib import TTFont
+        self.path = path
+        self.resource_name = resource_name
+        self.font = TTFont(path, fontNumber=0, lazy=True)
+        self.cmap = self.font.getBestCmap() or {}
+        self.units_per_em = self.font["head"].unitsPerEm
+        self.hmtx = self.font["hmtx"]
+        self.is_cff = "CFF " in self.font
+        self.ref = None
+        self._used = {}
+        self._widths = {}
+
+    def has_char(self, char):
+        return ord(char) in self.cmap
+
+    def _glyph(self, char):
+        name = self.cmap.get(ord(char), ".notdef")
+        gid = self.font.getGlyphID(name)
+        if gid not in self._widths:
+            self._widths[gid] = self.hmtx[name][0] * 1000 / self.units_per_em
+        self._used.setdefault(gid, char)
+        return gid
+
+    def encode(self, text):
+        """ Hex string (Identity-H) of ``text`` to be used with ``Tj`` """
+        return "<" + "".join(f"{self._glyph(c):04X}" for c in text) + ">"
+
+    def width(self, text, size):
+        return sum(self._widths[self._glyph(c)] for c in text) * size / 1000
+
+    @property
+    def ascent(self):
+        return self.font["hhea"].ascent / self.units_per_em
+
+    @property
+    def descent(self):
+        return self.font["hhea"].descent / self.units_per_em
+
+    def embed(self, doc):
+        """ Write the font objects into ``doc`` (call after all text was encoded.) """
+        from fontTools import subset
+        options = subset.Options()
+        options.retain_gids = True
+        options.notdef_outline = True
+        options.name_IDs = ["*"]
+        options.layout_features = []
+        options.drop_tables += ["FFTM"]
+        subsetter = subset.Subsetter(options=options)
+        subsetter.populate(gids=sorted(set(self._used) | {0}))
+        subsetter.subset(self.font)
+        buf = io.BytesIO()
+        self.font.save(buf)
+        data = buf.getvalue()
+
+        ps_name = re.sub(r"[^A-Za-z0-9\-]", "", self.font["name"].getDebugName(6) or "Font") or "Font"
+        tag = "".join(chr(ord("A") + (sum(map(ord, self.path)) // 26**i) % 26) for i in range(6))
+        base_font = Name(f"{tag}+{ps_name}")
+        head = self.font["head"]
+        scale = 1000 / self.units_per_em
+        if self.is_cff:
+            font_file = doc.stream(data, {"Subtype": Name("OpenType")})
+            font_file_key = "FontFile3"
+        else:
+            font_file = doc.stream(data, {"Length1": len(data)})
+            font_file_key = "FontFile2"
+        descriptor = doc.add({
+            "Type"        : Name("FontDescriptor"),
+            "FontName"    : base_font,
+            "Flags"       : 4,
+            "FontBBox"    : [int(head.xMin*scale), int(head.yMin*scale), int(head.xMax*scale), int(head.yMax*scale)],
+            "ItalicAngle" : 0,
+            "Ascent"      : int(self.ascent*1000),
+            "Descent"     : int(self.descent*1000),
+            "CapHeight"   : int(self.ascent*700),
+            "StemV"       : 80,
+            font_file_key : font_file,
+        })
+        widths = []
+        for gid in sorted(self._widths):
+            widths += [gid, [round(self._widths[gid])]]
+        cid_font = {
+            "Type"           : Name("Font"),
+            "Subtype"        : Name("CIDFontType0" if self.is_cff else "CIDFontType2"),
+            "BaseFont"       : base_font,
+            "CIDSystemInfo"  : {"Registry": "Adobe", "Ordering": "Identity", "Supplement": 0},
+            "FontDescriptor" : descriptor,
+            "W"              : widths,
+        }
+        if not self.is_cff:
+            cid_font["CIDToGIDMap"] = Name("Identity")
+        to_unicode = doc.stream(self._to_unicode_cmap())
+        doc.set(self.ref, {
+            "Type"            : Name("Font"),
+            "Subtype"         : Name("Type0"),
+            "BaseFont"        : base_font,
+            "Encoding"        : Name("Identity-H"),
+            "DescendantFonts" : [doc.add(cid_font)],
+            "ToUnicode"       : to_unicode,
+        })
+
+    def _to_unicode_cmap(self):
+        items = sorted((gid, char) for gid,char in self._used.items() if gid != 0)
+        lines = [
+            "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+            "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange",
+        ]
+        for i in range(0, len(items), 100):
+            chunk = items[i:i+100]
+            lines.append(f"{len(chunk)} beginbfchar")
+            lines += [f"<{gid:04X}> <{c.encode('utf-16-be').hex().upper()}>" for gid,c in chunk]
+            lines.append("endbfchar")
+        lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+        return "\n".join(lines)
+
+class FontSet():
+    """ Fonts tried in order for each character (e.g. a latin font, then a CJK font.) """
+    def __init__(self, fonts):
+        self.fonts = fonts
+
+    def runs(self, text):
+        """ Split ``text`` into [(font, substring), ...] """
+        runs = []
+        for char in text:
+            font = next((f for f in self.fonts if f.has_char(char)), self.fonts[0])
+            if len(runs)>0 and runs[-1][0] is font:
+                runs[-1][1].append(char)
+            else:
+                runs.append((font, [char]))
+        return [(font, "".join(chars)) for font,chars in runs]
+
+    def width(self, text, size):
+        return sum(font.width(s, size) for font,s in self.runs(text))
+
+    @property
+    def ascent(self):
+        return self.fonts[0].ascent
+
+    @property
+    def descent(self):
+        return self.fonts[0].descent
+
+# Bezier control distance to approximate a quarter circle.
+KAPPA = 4*(math.sqrt(2)-1)/3
+
+class Canvas():
+    """ Builds a PDF content stream. Coordinates are in points, origin at the bottom left. """
+    def __init__(self):
+        self.ops = []
+
+    def getvalue(self):
+        return "\n".join(self.ops)
+
+    def save(self):
+        self.ops.append("q")
+
+    def restore(self):
+        self.ops.append("Q")
+
+    def transform(self, a, b, c, d, e, f):
+        self.ops.append(" ".join(fmt_num(v) for v in (a, b, c, d, e, f)) + " cm")
+
+    def fill_color(self, rgb):
+        self.ops.append(" ".join(fmt_num(v) for v in rgb[:3]) + " rg")
+
+    def stroke_color(self, rgb):
+        self.ops.append(" ".join(fmt_num(v) for v in rgb[:3]) + " RG")
+
+    def line_width(self, w):
+        self.ops.append(f"{fmt_num(w)} w")
+
+    def line(self, x0, y0, x1, y1):
+        self.ops.append(f"{fmt_num(x0)} {fmt_num(y0)} m {fmt_num(x1)} {fmt_num(y1)} l S")
+
+    def rect(self, x, y, w, h, op="f"):
+        self.ops.append(f"{fmt_num(x)} {fmt_num(y)} {fmt_num(w)} {fmt_num(h)} re {op}")
+
+    def clip_rect(self, x, y, w, h):
+        self.rect(x, y, w, h, op="W n")
+
+    def polygon(self, points, op="f"):
+        (x,y), *rest = points
+        path = [f"{fmt_num(x)} {fmt_num(y)} m"] + [f"{fmt_num(x)} {fmt_num(y)} l" for x,y in rest]
+        self.ops.append(" ".join(path) + f" h {op}")
+
+    def ellipse(self, cx, cy, rx, ry, op="f"):
+        kx, ky = rx*KAPPA, ry*KAPPA
+        n = fmt_num
+        self.ops.append(" ".join([
+            f"{n(cx+rx)} {n(cy)} m",
+            f"{n(cx+rx)} {n(cy+ky)} {n(cx+kx)} {n(cy+ry)} {n(cx)} {n(cy+ry)} c",
+            f"{n(cx-kx)} {n(cy+ry)} {n(cx-rx)} {n(cy+ky)} {n(cx-rx)} {n(cy)} c",
+            f"{n(cx-rx)} {n(cy-ky)} {n(cx-kx)} {n(cy-ry)} {n(cx)} {n(cy-ry)} c",
+            f"{n(cx+kx)} {n(cy-ry)} {n(cx+rx)} {n(cy-ky)} {n(cx+rx)} {n(cy)} c",
+            f"h {op}",
+        ]))
+
+    def text(self, x, y, text, fontset, size, color=(0,0,0), ha="left", va="baseline"):
+        """ Draw ``text`` aligned like matplotlib's ``ha``/``va`` """
+        if text == "":
+            return
+        width = fontset.width(text, size)
+        x -= {"left": 0, "center": width/2, "right": width}[ha]
+        y -= {
+            "baseline" : 0,
+            "bottom"   : size*fontset.descent,
+            "top"      : size*fontset.ascent,
+            "center"   : size*(fontset.ascent+fontset.descent)/2,
+        }[va]
+        self.fill_color(color)
+        ops = ["BT", f"{fmt_num(x)} {fmt_num(y)} Td"]
+        for font,s in fontset.runs(text):
+            ops.append(f"/{font.resource_name} {fmt_num(size)} Tf {font.encode(s)} Tj")
+        ops.append("ET")
+        self.ops.append(" ".join(ops))
+
+    def draw_xobject(self, name, x=0, y=0, sx=1, sy=1):
+        self.ops.append(f"q {fmt_num(sx)} 0 0 {fmt_num(sy)} {fmt_num(x)} {fmt_num(y)} cm /{name} Do Q")
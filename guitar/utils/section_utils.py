@@ -0,0 +1,108 @@
+# coding: utf-8
+import itertools
+from collections import deque, defaultdict, namedtuple
+
+# A reference to rows drawn earlier in the chord book, drawn in one row instead of the repeated rows.
+# ``source`` are the (first, last) positions of the referenced rows, ``times`` the number of repeats,
+# and ``lyrics`` the lyrics of each folded row.
+RepeatRow = namedtuple("RepeatRow", ["label", "lyrics", "times", "source"])
+
+def row_position(position, nrows, first_page=2):
+    """ Position of a row in the chord book -> (page, row) numbers (The cover is page 1.) """
+    return (first_page + position//nrows, position%nrows + 1)
+
+def repeat_label(first, last, nrows, first_page=2):
+    """ e.g. "p.2 rows 1-4", "p.2 row 5 - p.3 row 2" """
+    (p0, r0), (p1, r1) = row_position(first, nrows, first_page), row_position(last, nrows, first_page)
+    if p0 != p1:
+        return f"p.{p0} row {r0} - p.{p1} row {r1}"
+    return f"p.{p0} row {r0}" if r0==r1 else f"p.{p0} rows {r0}-{r1}"
+
+def repeat_text(row, max_chars=80):
+    """ `RepeatRow` -> (title, lyrics) to draw, e.g. ("Repeat p.2 rows 1-4 ×2", "lyrics / of / rows") """
+    title = f"Repeat {row.label}" + (f" ×{row.times}" if row.times>1 else "")
+    lyrics = " / ".join([lyric for lyric in row.lyrics if lyric.strip() != ""])
+    if len(lyrics) > max_chars:
+        lyrics = lyrics[:max_chars-1] + "…"
+    return (title, lyrics)
+
+def fold_repeats(rows, nrows, min_rows=2, max_rows=16, max_candidates=16, match_lyrics=False, first_page=2):
+    """ Replace blocks of rows whose chords are the same as rows drawn earlier by a `RepeatRow`.
+    Blocks are found greedily (the longest block at each row) from a hash of the chords of ``min_rows``
+    consecutive rows, so it takes O(rows x max_candidates x max_rows) time, and only ``max_rows`` rows are
+    read ahead. Consecutive repeats of the same block are merged (``times``.)
+    @params rows           : (iterable) of (chords, lyrics), each drawn as one row (see `split_row`)
+    @params nrows          : (int) Rows per page, to label the referenced rows with their pages.
+    @params min_rows       : (int) Shortest block to fold.
+    @params max_rows       : (int) Longest block to fold.
+    @params max_candidates : (int) Earlier occurrences of a block which are compared.
+    @params match_lyrics   : (bool) Fold rows only if the lyrics are the same, too.
+    @return rows           : Generator of (chords, lyrics) or `RepeatRow`
+    ~~~
+    examples)
+    >>> rows = [(["C", "G"], ["a", "b"]), (["Am", "F"], ["c", "d"])] * 3
+    >>> folded = list(fold_repeats(rows, nrows=5))
+    >>> folded[:2]
+    [(['C', 'G'], ['a', 'b']), (['Am', 'F'], ['c', 'd'])]
+    >>> folded[2]
+    RepeatRow(label='p.2 rows 1-2', lyrics=['ab', 'cd', 'ab', 'cd'], times=2, source=(0, 1))
+    """
+    rows = iter(rows)
+    ahead = deque()
+    key = (lambda row: (tuple(row[0]), tuple(row[1]))) if match_lyrics else (lambda row: tuple(row[0]))
+    keys = []       # key of every row read so far
+    positions = []  # position in the chord book of every row read so far (None if folded)
+    windows = defaultdict(list)
+    pending = None
+    num_drawn = 0
+
+    def find_block(i):
+        if len(ahead) < min_rows:
+            return (0, None)
+        best = (0, None)
+        window = tuple(key(row) for row in itertools.islice(ahead, min_rows))
+        for j in windows.get(window, [])[:max_candidates]:
+            length = min_rows
+            while (length < len(ahead) and j+length < i and positions[j+length] == positions[j]+length
+                   and keys[j+length] == key(ahead[length])):
+                length += 1
+            if length > best[0]:
+                best = (length, j)
+        return best
+
+    while True:
+        ahead.extend(itertools.islice(rows, max_rows-len(ahead)))
+        if len(ahead)==0:
+            break
+        i = len(keys)
+        length, j = find_block(i)
+        if j is not None:
+            block = [ahead.popleft() for _ in range(length)]
+            keys.extend(key(row) for row in block)
+            positions.extend([None]*length)
+            lyrics = ["".join(lyrics_) for _,lyrics_ in block]
+            source = (positions[j], positions[j]+length-1)
+            if pending is not None and pending.source == source:
+                pending = pending._replace(times=pending.times+1, lyrics=pending.lyrics+lyrics)
+                continue
+            if pending is not None:
+                yield pending
+                num_drawn += 1
+            pending = RepeatRow(label=repeat_label(*source, nrows=nrows, first_page=first_page),
+                                lyrics=lyrics, times=1, source=source)
+            continue
+        if pending is not None:
+            yield pending
+            num_drawn += 1
+            pending = None
+        row = ahead.popleft()
+        keys.append(key(row))
+        positions.append(num_drawn)
+        yield row
+        num_drawn += 1
+        # Index the block of ``min_rows`` rows ending here, if they are drawn one after another.
+        start = i-min_rows+1
+        if start >= 0 and None not in positions[start:] and positions[i]-positions[start] == min_rows-1:
+            windows[tuple(keys[start:i+1])].append(start)
+    if pending is not None:
+        yield pending
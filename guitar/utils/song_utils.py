@@ -0,0 +1,294 @@
+# coding: utf-8
+import json
+import numpy as np
+
+from .fmt_utils import row2pair
+
+CORPUS_MAGIC = b"PYGUITAR-CORPUS\0"
+CORPUS_VERSION = 1
+ALIGNMENT = 8
+
+class StringPool():
+    """ Strings in one UTF-8 buffer. ``offsets[i]:offsets[i+1]`` are the bytes of the i-th string.
+    Offsets are absolute, so a slice of a pool is a view sharing the same buffer.
+    @params offsets : (ndarray) int64 (n+1)
+    @params data    : (ndarray) uint8
+    """
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded)+1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets)-1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("StringPool only supports contiguous slices.")
+            return StringPool(self.offsets[start:max(start, stop)+1], self.data)
+        if i < 0:
+            i += len(self)
+        return self.data[self.offsets[i]:self.offsets[i+1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        if len(self) == 0:
+            return []
+        # Decode the whole range at once, and cut it by the byte offsets.
+        offsets = self.offsets.tolist()
+        raw = self.data[offsets[0]:offsets[-1]].tobytes()
+        return [raw[a-offsets[0]:b-offsets[0]].decode("utf-8") for a,b in zip(offsets[:-1], offsets[1:])]
+
+def encode_rows(data, vocabulary):
+    """ {i: {"chord": [...], "lyric": [...]}} -> Column arrays of `Song`
+    @params vocabulary : (dict) Chord symbol -> id. New symbols are added to it.
+    """
+    keys, chord_ids, lyrics = [], [], []
+    chord_offsets = [0]; lyric_offsets = [0]
+    for key,row in data.items():
+        chords, lyrics_ = row2pair(row)
+        keys.append(key)
+        for symbol in chords:
+            chord_ids.append(vocabulary.setdefault(symbol, len(vocabulary)))
+        lyrics.extend(lyrics_)
+        chord_offsets.append(len(chord_ids))
+        lyric_offsets.append(len(lyrics))
+    return dict(
+        keys=StringPool.from_strings([str(key) for key in keys]),
+        int_keys=len(keys)>0 and all(isinstance(key, int) for key in keys),
+        chord_offsets=np.asarray(chord_offsets, dtype=np.int64),
+        chord_ids=np.asarray(chord_ids, dtype=np.int32),
+        lyric_offsets=np.asarray(lyric_offsets, dtype=np.int64),
+        lyrics=StringPool.from_strings(lyrics),
+    )
+
+class Song():
+    """ A chord book in columns: chord ids and lyrics of all rows in flat arrays, instead of
+    ``{i: {"chord": [...], "lyric": [...]}}`` (millions of small objects for a large corpus.)
+    Offsets are absolute, so songs of a `Corpus` are views of its (memory-mapped) arrays.
+    @params symbols       : (tuple) Chord symbols. ``symbols[id]`` is the chord of an id.
+    @params chord_offsets : (ndarray) int64 (rows+1) Chords of row i are ``chord_ids[chord_offsets[i]:chord_offsets[i+1]]``
+    @params chord_ids     : (ndarray) int32
+    @params lyric_offsets : (ndarray) int64 (rows+1) Lyrics of row i are ``lyrics[lyric_offsets[i]:lyric_offsets[i+1]]``
+    @params lyrics        : (StringPool)
+    @params keys          : (StringPool) Keys of the rows in the dict format.
+    @params int_keys      : (bool) Whether the keys are int (scraped data) or str (loaded from json.)
+    @params title         : (str)
+    ~~~
+    examples)
+    >>> song = Song.from_dict(data, title="Song")
+    >>> song.to_dict() == data
+    True
+    >>> guitar.create_chord_book_stream(song.rows(), filename="song.pdf")
+    """
+    def __init__(self, symbols, chord_offsets, chord_ids, lyric_offsets, lyrics, keys, int_keys=False, title=""):
+        self.symbols = symbols
+        self.chord_offsets = chord_offsets
+        self.chord_ids = chord_ids
+        self.lyric_offsets = lyric_offsets
+        self.lyrics = lyrics
+        self.keys = keys
+        self.int_keys = int_keys
+        self.title = title
+
+    @classmethod
+    def from_dict(cls, data, title=""):
+        vocabulary = {}
+        columns = encode_rows(data, vocabulary)
+        return cls(symbols=tuple(vocabulary.keys()), title=title, **columns)
+
+    def to_dict(self):
+        keys = self.keys.tolist()
+        if self.int_keys:
+            keys = [int(key) for key in keys]
+        return {
+            key: {"chord": chords, "lyric": lyrics}
+            for key,(chords,lyrics) in zip(keys, self.rows())
+        }
+
+    def __len__(self):
+        return len(self.chord_offsets)-1
+
+    def __repr__(self):
+        return f"Song(title={repr(self.title)}, rows={len(self)}, chords={self.num_chords})"
+
+    @property
+    def ids(self):
+        """ Chord ids of the whole song (a view.) """
+        return self.chord_ids[self.chord_offsets[0]:self.chord_offsets[-1]]
+
+    @property
+    def num_chords(self):
+        return int(self.chord_offsets[-1]-self.chord_offsets[0])
+
+    def row(self, i):
+        """ (chords, lyrics) of the i-th row """
+        if i < 0:
+            i += len(self)
+        chords = [self.symbols[id_] for id_ in self.chord_ids[self.chord_offsets[i]:self.chord_offsets[i+1]].tolist()]
+        lyrics = self.lyrics[int(self.lyric_offsets[i]):int(self.lyric_offsets[i+1])].tolist()
+        return (chords, lyrics)
+
+    def rows(self):
+        """ Generate (chords, lyrics) of each row, e.g. for `Guitar.create_chord_book_stream` """
+        symbols = self.symbols
+        chord_offsets = self.chord_offsets.tolist()
+        lyric_offsets = self.lyric_offsets.tolist()
+        ids = self.chord_ids[chord_offsets[0]:chord_offsets[-1]].tolist()
+        lyrics = self.lyrics[lyric_offsets[0]:lyric_offsets[-1]].tolist()
+        for i in range(len(self)):
+            yield (
+                [symbols[id_] for id_ in ids[chord_offsets[i]-chord_offsets[0]:chord_offsets[i+1]-chord_offsets[0]]],
+                lyrics[lyric_offsets[i]-lyric_offsets[0]:lyric_offsets[i+1]-lyric_offsets[0]],
+            )
+
+def concat_pools(pools):
+    """ Join `StringPool` (views) into one, without decoding the strings. """
+    offsets, data = [np.zeros(1, dtype=np.int64)], [np.zeros(0, dtype=np.uint8)]
+    size = 0
+    for pool in pools:
+        start, stop = int(pool.offsets[0]), int(pool.offsets[-1])
+        offsets.append(pool.offsets[1:] - start + size)
+        data.append(pool.data[start:stop])
+        size += stop-start
+    return StringPool(np.concatenate(offsets), np.concatenate(data))
+
+def _sections(songs):
+    """ Column arrays of all ``songs`` (with one vocabulary) for `save_corpus` """
+    vocabulary = {}
+    titles, int_keys, song_rows = [], [], [0]
+    keys, chord_ids, lyrics = [], [], []
+    chord_offsets, lyric_offsets = [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+    num_chords = num_lyrics = 0
+    for song in songs:
+        if not isinstance(song, Song):
+            song = Song.from_dict(song)
+        # Local ids -> corpus ids
+        mapping = np.asarray([vocabulary.setdefault(symbol, len(vocabulary)) for symbol in song.symbols], dtype=np.int32)
+        lyric_start, lyric_stop = int(song.lyric_offsets[0]), int(song.lyric_offsets[-1])
+        chord_ids.append(mapping[song.ids])
+        chord_offsets.append(song.chord_offsets[1:] - song.chord_offsets[0] + num_chords)
+        lyric_offsets.append(song.lyric_offsets[1:] - lyric_start + num_lyrics)
+        lyrics.append(song.lyrics[lyric_start:lyric_stop])
+        keys.append(song.keys)
+        num_chords += song.num_chords
+        num_lyrics += lyric_stop-lyric_start
+        titles.append(song.title)
+        int_keys.append(song.int_keys)
+        song_rows.append(song_rows[-1]+len(song))
+
+    pools = {
+        "symbol": StringPool.from_strings(list(vocabulary.keys())),
+        "title" : StringPool.from_strings(titles),
+        "key"   : concat_pools(keys),
+        "lyric" : concat_pools(lyrics),
+    }
+    sections = {
+        "song_rows"         : np.asarray(song_rows, dtype="<i8"),
+        "int_keys"          : np.asarray(int_keys, dtype=np.uint8),
+        "row_chord_offsets" : np.concatenate(chord_offsets).astype("<i8"),
+        "row_lyric_offsets" : np.concatenate(lyric_offsets).astype("<i8"),
+        "chord_ids"         : np.concatenate([np.zeros(0, dtype=np.int32)]+chord_ids).astype("<i4"),
+    }
+    for name,pool in pools.items():
+        sections[f"{name}_offsets"] = pool.offsets.astype("<i8")
+        sections[f"{name}_data"] = pool.data
+    return sections
+
+def save_corpus(path, songs):
+    """ Save songs in the binary corpus format, which `Corpus` opens with ``mmap``.
+    A 16-byte magic, the length (uint64) of a json table of contents, the table of contents
+    ({"version": 1, "num_songs": n, "sections": {name: [dtype, offset, count]}}), and the sections
+    (flat little-endian arrays, each aligned to 8 bytes.)
+    @params songs : Iterable of `Song`, or chord books in the dict format.
+    @return num_songs : (int)
+    """
+    sections = _sections(songs)
+    # The table of contents holds the offsets, so its length is fixed before they are known.
+    layout = {name: [array.dtype.str, 0, len(array)] for name,array in sections.items()}
+    toc = lambda: json.dumps({
+        "version": CORPUS_VERSION, "num_songs": len(sections["song_rows"])-1, "sections": layout,
+    }).encode("utf-8")
+    header_size = len(CORPUS_MAGIC) + 8 + len(toc()) + 20*len(layout)
+    offset = -(-header_size//ALIGNMENT)*ALIGNMENT
+    for name,array in sections.items():
+        layout[name][1] = offset
+        offset += -(-array.nbytes//ALIGNMENT)*ALIGNMENT
+    toc = toc().ljust(header_size-len(CORPUS_MAGIC)-8)
+    with open(path, mode="wb") as f:
+        f.write(CORPUS_MAGIC)
+        f.write(np.asarray([len(toc)], dtype="<u8").tobytes())
+        f.write(toc)
+        for name,array in sections.items():
+            f.seek(layout[name][1])
+            f.write(array.tobytes())
+        f.truncate(offset)
+    return layout["song_rows"][2]-1
+
+class Corpus():
+    """ Songs in a file saved by `save_corpus`. The file is memory-mapped, so opening it only reads
+    the table of contents and the chord symbols, and each `Song` is a view (no copy) of the file.
+    @params path : (str)
+    ~~~
+    examples)
+    >>> save_corpus("songs.pgc", (Song.from_dict(json.load(open(path)), title=path) for path in paths))
+    >>> corpus = Corpus("songs.pgc")
+    >>> song = corpus[42]
+    >>> song.to_dict()
+    """
+    def __init__(self, path):
+        self.path = path
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if self.buffer[:len(CORPUS_MAGIC)].tobytes() != CORPUS_MAGIC:
+            raise ValueError(f"{path} is not a PyGuitar corpus.")
+        toc_size = int(self.buffer[len(CORPUS_MAGIC):len(CORPUS_MAGIC)+8].view("<u8")[0])
+        start = len(CORPUS_MAGIC)+8
+        toc = json.loads(self.buffer[start:start+toc_size].tobytes().decode("utf-8"))
+        if toc["version"] != CORPUS_VERSION:
+            raise ValueError(f"Unsupported corpus version {toc['version']} of {path}")
+        self.num_songs = toc["num_songs"]
+        self.sections = {
+            name: self.buffer[offset:offset+count*np.dtype(dtype).itemsize].view(dtype)
+            for name,(dtype,offset,count) in toc["sections"].items()
+        }
+        pool = lambda name: StringPool(self.sections[f"{name}_offsets"], self.sections[f"{name}_data"])
+        self.symbols = tuple(pool("symbol").tolist())
+        self.titles = pool("title")
+        self.keys = pool("key")
+        self.lyrics = pool("lyric")
+        self.song_rows = self.sections["song_rows"]
+        self.chord_offsets = self.sections["row_chord_offsets"]
+        self.chord_ids = self.sections["chord_ids"]
+
+    def __len__(self):
+        return self.num_songs
+
+    def __repr__(self):
+        return f"Corpus({repr(self.path)}, songs={len(self)}, chords={len(self.chord_ids)}, symbols={len(self.symbols)})"
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"song index out of range: {i}")
+        r0, r1 = int(self.song_rows[i]), int(self.song_rows[i+1])
+        return Song(
+            symbols=self.symbols, title=self.titles[i],
+            chord_offsets=self.chord_offsets[r0:r1+1], chord_ids=self.chord_ids,
+            lyric_offsets=self.sections["row_lyric_offsets"][r0:r1+1], lyrics=self.lyrics,
+            keys=self.keys[r0:r1], int_keys=bool(self.sections["int_keys"][i]),
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,79 @@
+# coding: utf-8
+from ..env import NOTES, LEN_OCTAVES
+from .chord_utils import CHORD_SYMBOL_PATTERN, note2pitch
+
+FLAT_NOTES = ['C', 'D♭', 'D', 'E♭', 'E', 'F', 'G♭', 'G', 'A♭', 'A', 'B♭', 'B']
+
+def pitch2note(pitch, flat=False):
+    return (FLAT_NOTES if flat else NOTES)[pitch % LEN_OCTAVES]
+
+def transpose_note(note, semitones, flat=None):
+    """ Transpose a single note.
+    @params note      : (str) e.g. "G#", "B♭", "Bb"
+    @params semitones : (int) Positive is up, negative is down.
+    @params flat      : (bool) Spell the result with ♭. None keeps the spelling of ``note``.
+                               (An ASCII "b" flat gives an ASCII "b" flat.)
+    """
+    if flat is None:
+        flat = "♭" in note or "b" in note[1:]
+    transposed = pitch2note(note2pitch(note)+semitones, flat=flat)
+    if "b" in note[1:]:
+        transposed = transposed.replace("♭", "b")
+    return transposed
+
+def transpose_chord(chord, semitones, flat=None):
+    """ Transpose a U-FRET chord symbol, including the bass note of slash chords.
+    The symbol is split by the grammar of `parse_chord` (``CHORD_SYMBOL_PATTERN``).
+    ~~~
+    examples)
+    >>> transpose_chord("G#m7/D#", 2)
+    'A#m7/F'
+    >>> transpose_chord("B♭/D", -1)
+    'A/D♭'
+    >>> transpose_chord("Ebm", 2)
+    'Fm'
+    >>> transpose_chord("Bb7", 2)
+    'C7'
+    >>> transpose_chord("C/Bb", 2)
+    'D/C'
+    >>> transpose_chord("Eb", 3)
+    'Gb'
+    """
+    if chord == "":
+        return chord
+    match = CHORD_SYMBOL_PATTERN.match(chord)
+    if match is None:
+        raise ValueError(f"Couldn't transpose the chord '{chord}'")
+    root, quality, bass = match.groups()
+    if flat is None:
+        # Spell the bass note the same way as the root.
+        flat = "♭" in root or "b" in root[1:]
+    transposed = transpose_note(root, semitones, flat=flat) + quality
+    if bass is not None:
+        transposed += "/" + transpose_note(bass, semitones, flat=flat)
+    return transposed
+
+def transpose_data(data, semitones, flat=None):
+    """ Transpose the whole song.
+    @params data      : {i : {'chord': [], 'lyric': []}}
+    @params semitones : (int) Positive is up, negative is down.
+    @return data      : A new dict with the same structure. (lyrics are shared, not copied.)
+    """
+    if semitones % LEN_OCTAVES == 0 and flat is None:
+        return {i: {"chord": list(row.get("chord")), "lyric": row.get("lyric")} for i,row in data.items()}
+    # A song has only a handful of distinct chords, so transpose each of them once.
+    memo = {}
+    def _transpose(chord):
+        if chord not in memo:
+            memo[chord] = transpose_chord(chord, semitones, flat=flat)
+        return memo[chord]
+    return {
+        i: {
+            "chord": [_transpose(chord) for chord in row.get("chord")],
+            "lyric": row.get("lyric")
+        } for i,row in data.items()
+    }
+
+def transpose_all(data, flat=None):
+    """ All 12 transpositions of ``data`` ({semitones : data} for semitones in 0..11) """
+    return {semitones: transpose_data(data, semitones, flat=flat) for semitones in range(LEN_OCTAVES)}
@@ -0,0 +1,115 @@
+# coding: utf-8
+import functools
+import itertools
+
+from .generic_utils import handleKeyError
+from ..env import LEN_OCTAVES, CHORD_FORMULAS
+
+PERFECT_FIFTH = 7
+
+def chord_tones(quality):
+    """ -> (required intervals, all intervals) of the chord quality.
+    The perfect fifth may be left out of chords with 4 or more tones.
+    """
+    handleKeyError(lst=list(CHORD_FORMULAS.keys()), quality=quality)
+    tones = set(CHORD_FORMULAS.get(quality))
+    if len(tones) >= 4:
+        return (tones - {PERFECT_FIFTH}, tones)
+    return (tones, tones)
+
+def is_mute(offset):
+    return isinstance(offset, bool) and offset == False
+
+def voicing_cost(voicing, root_row, intervals, tones):
+    """ Lower is easier to play (and sounds fuller.)
+    @params voicing   : (list) Fret offsets from the root fret (False = mute), from the lowest string.
+    @params root_row  : (int)  Row of the root string.
+    @params intervals : (set)  Intervals sounded by the voicing.
+    @params tones     : (set)  Intervals of the chord.
+    """
+    played = [row for row,offset in enumerate(voicing) if not is_mute(offset)]
+    frets = [voicing[row] for row in played]
+    # Muted strings between played ones are hard to damp.
+    inner_mutes = sum(is_mute(offset) for offset in voicing[root_row:played[-1]+1])
+    unplayed = len(voicing) - root_row - len(played)
+    return (
+        4.0 * inner_mutes
+        + 1.0 * unplayed
+        + 0.5 * max(frets)
+        + 0.5 * sum(fret > 0 for fret in frets)
+        + 0.5 * len(tones - intervals)
+    )
+
+def search_voicings(fretboard, quality, string, max_span=3, max_fingers=4):
+    """ Playable voicings of ``quality`` with the lowest note (the root) on ``string``, easiest first.
+    Only the frets from the root fret to ``max_span`` frets above it are used (fret offset 0 is
+    barred by the index finger), so a voicing is movable: the same shape serves all 12 roots.
+    @params fretboard   : (Fretboard)
+    @params quality     : (str) Key of ``CHORD_FORMULAS`` (e.g. "minor7th-flatted5th")
+    @params string      : (int) String number of the root.
+    @params max_span    : (int) Maximum fret offset from the root fret.
+    @params max_fingers : (int) Maximum number of fingers (including the barre.)
+    @return voicings    : [[offset or False, ...], ...] from the lowest string, like ``chord.json``
+    """
+    required, tones = chord_tones(quality)
+    root_row = fretboard.row(string)
+    open_pitches = fretboard.open_pitches.tolist()
+    interval = lambda row, offset: (open_pitches[row] - open_pitches[root_row] + offset) % LEN_OCTAVES
+
+    # Each string above the root is muted, or plays a chord tone within the span.
+    options = [
+        [False] + [offset for offset in range(max_span+1) if interval(row, offset) in tones]
+        for row in range(root_row+1, fretboard.num_strings)
+    ]
+    candidates = []
+    for upper in itertools.product(*options):
+        voicing = [False]*root_row + [0] + list(upper)
+        played = [(row, offset) for row,offset in enumerate(voicing) if not is_mute(offset)]
+        intervals = {interval(row, offset) for row,offset in played}
+        if not required <= intervals:
+            continue
+        if 1 + sum(offset > 0 for _,offset in played) > max_fingers:
+            continue
+        cost = voicing_cost(voicing, root_row, intervals, tones)
+        candidates.append((cost, [-1 if is_mute(offset) else offset for offset in voicing], voicing))
+    return [voicing for _,_,voicing in sorted(candidates, key=lambda c: c[:2])]
+
+class VoicingTable():
+    """ The best voicings of every chord quality x root string of a fretboard, searched once.
+    Voicings are movable (see `search_voicings`), so each entry covers all 12 roots and a lookup is
+    a single dict access. Use `get_voicing_table` to share one table per fretboard.
+    @params fretboard   : (Fretboard)
+    @params top         : (int) Number of voicings kept per entry.
+    @params max_stretch : (int) The span is widened up to this if no voicing fits in ``max_span``
+    ~~~
+    examples)
+    >>> table = get_voicing_table(get_fretboard())
+    >>> table.get("minor7th-flatted5th", string=5)
+    [False, 0, 1, 0, 1, False]
+    """
+    def __init__(self, fretboard, top=5, max_span=3, max_fingers=4, max_stretch=4):
+        self.fretboard = fretboard
+        self.table = {}
+        for quality in CHORD_FORMULAS.keys():
+            # Chord books put the root on the 5th or 6th string (or lower ones of 7/8-string instruments.)
+            for string in range(5, fretboard.num_strings+1):
+                # Stretch the hand only if nothing fits in the normal span.
+                for span in range(max_span, max(max_span, max_stretch)+1):
+                    voicings = search_voicings(fretboard, quality, string, max_span=span, max_fingers=max_fingers)
+                    if len(voicings)>0:
+                        break
+                self.table[(quality, string)] = tuple(tuple(voicing) for voicing in voicings[:top])
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, quality, string, rank=0):
+        """ The ``rank``-th easiest voicing (a list like the shapes in ``chord.json``), or None. """
+        voicings = self.table.get((quality, string), ())
+        if rank < len(voicings):
+            return list(voicings[rank])
+        return None
+
+@functools.lru_cache(maxsize=None)
+def get_voicing_table(fretboard):
+    return VoicingTable(fretboard)
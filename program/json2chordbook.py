@@ -1,40 +1,155 @@
 #coding: utf-8
 import os
 import re
+import sys
 import json
+import time
+import signal
 import argparse
-from kerasy.utils import toBLUE
+import traceback
+import multiprocessing
+from guitar.utils.generic_utils import toBLUE, toGREEN, toRED
+from guitar.utils.cache_utils import RenderManifest, file_hash
 
-from guitar import Guitar
-from guitar.ufret import get_ufret_chords
-from guitar.utils import get_chord_components
-from guitar.utils import find_key_major_scale
+MANIFEST = ".pyguitar-manifest.json"
 
-if __name__ == "__main__":
+def init_worker(font_family=None):
+    """ Set up matplotlib and fonts once per worker process. The font chain (with the CJK fallback)
+    and its files are resolved here, so that the first song of each worker doesn't pay for it.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from guitar import Guitar
+    from guitar.utils.font_utils import find_font_paths
+    for weight in ["normal", "bold"]:
+        find_font_paths(font_family, weight=weight)
+
+class SongTimeout(BaseException):
+    """ Derived from BaseException so that ``except Exception`` in libraries can't swallow it. """
+
+def _raise_timeout(signum, frame):
+    raise SongTimeout("Rendering took too long.")
+
+def render_song(path, output_dir=".", theme="rainbow", scale="major", nrows=5, font_family="Comic Sans MS", repeats=False, timeout=None):
+    """ Render one json file, and return a summary dict (never raises.) """
+    from guitar import Guitar
+    from guitar.utils import get_chord_components
+    from guitar.utils import find_key_major_scale
+
+    fn = os.path.basename(path)
+    summary = {"input": path, "output": None, "status": "ok", "seconds": None, "error": None}
+    use_alarm = timeout is not None and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        titles = re.findall(pattern=r"'(.*)'", string=fn)
+        title = titles[0] if len(titles)>0 else os.path.splitext(fn)[0]
+        with open(path) as f:
+            data = json.load(f)
+        majors, minors = get_chord_components(data, fmt="ufret")
+        key = find_key_major_scale(majors=majors, minors=minors)
+        guitar = Guitar(key=key, scale=scale, dark_mode=False, theme=theme, name=title, font_family=font_family)
+        # The name of the written file (see `create_chord_book_stream`) is recorded in the manifest.
+        summary["output"] = guitar.create_chord_book(data=data, nrows=nrows, filename=os.path.join(output_dir, guitar.pdf),
+                                                     verbose=-1, repeats=repeats)
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        summary["status"] = "timeout" if isinstance(e, SongTimeout) else "error"
+        summary["error"] = traceback.format_exc()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        summary["seconds"] = time.perf_counter() - start
+    return summary
+
+def _render_song(kwargs):
+    return render_song(**kwargs)
+
+def main(argv=sys.argv[1:]):
     parser = argparse.ArgumentParser()
-    parser.add_argument("-i",   "--input",  type=str, required=True)
-    parser.add_argument("-o",   "--output", type=str, default=".")
-    parser.add_argument("-t",   "--theme",  type=str, default="rainbow")
-    parser.add_argument("-s",   "--scale",  type=str, default="major")
-    args = parser.parse_args()
-
-    base_dir = args.input
-    output_dir = args.output
-    theme = args.theme
-    scale = args.scale
-
-    for fn in os.listdir(base_dir):
-        if os.path.splitext(fn)[1] != ".json": 
-            continue
-        try:
-            title = re.findall(pattern=r"'(.*)'", string=fn)[0]
-            path = os.path.join(base_dir, fn)
-            with open(path) as f:
-                data = json.load(f)
-            majors, minors = get_chord_components(data, fmt="ufret")
-            key = find_key_major_scale(majors=majors, minors=minors)
-            guitar = Guitar(key=key, scale=scale, dark_mode=False, theme=theme, name=title)
-            filename = os.path.join(output_dir, guitar.pdf)
-            guitar.create_chord_book(data=data, nrows=5, filename=filename, verbose=1)
-        except:
-            print(f"Error occured in {toBLUE(fn)}")
\ No newline at end of file
+    parser.add_argument("-i",   "--input",   type=str, required=True)
+    parser.add_argument("-o",   "--output",  type=str, default=".")
+    parser.add_argument("-t",   "--theme",   type=str, default="rainbow")
+    parser.add_argument("-s",   "--scale",   type=str, default="major")
+    parser.add_argument("-n",   "--nrows",   type=int, default=5)
+    parser.add_argument("-f",   "--font_family", type=str, default="Comic Sans MS")
+    parser.add_argument("-j",   "--jobs",    type=int, default=1, help="The number of worker processes.")
+    parser.add_argument("--timeout",         type=float, help="Timeout [s] for each song.")
+    parser.add_argument("--report",          type=str, help="Save the summary as json here.")
+    parser.add_argument("--force",           action="store_true", help="Render every song, even if its output is up to date.")
+    parser.add_argument("--repeats",         action="store_true", help="Draw repeated blocks of rows once, as references to the first one.")
+    args = parser.parse_args(argv)
+
+    paths = [
+        os.path.join(args.input, fn) for fn in sorted(os.listdir(args.input))
+        if os.path.splitext(fn)[1] == ".json"
+    ]
+    os.makedirs(args.output, exist_ok=True)
+    # Songs whose input and render parameters are the same as last time are skipped.
+    from guitar import __version__
+    manifest = RenderManifest(os.path.join(args.output, MANIFEST), params={
+        "theme": args.theme, "scale": args.scale, "nrows": args.nrows,
+        "font_family": args.font_family, "repeats": args.repeats, "version": __version__,
+    })
+    digests = {path: file_hash(path) for path in paths}
+    skipped = [] if args.force else [path for path in paths if manifest.is_fresh(path, digests[path])]
+    to_render = set(paths) - set(skipped)
+    tasks = [dict(
+        path=path, output_dir=args.output, theme=args.theme, scale=args.scale,
+        nrows=args.nrows, font_family=args.font_family, repeats=args.repeats, timeout=args.timeout
+    ) for path in paths if path in to_render]
+    if len(skipped)>0:
+        print(f"Skip {toGREEN(len(skipped))} up-to-date songs (--force to render them.)")
+
+    start = time.perf_counter()
+    results = []
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(processes=args.jobs, initializer=init_worker, initargs=(args.font_family,))
+        summaries = pool.imap(_render_song, tasks)
+    else:
+        init_worker(args.font_family)
+        pool = None
+        summaries = map(_render_song, tasks)
+    try:
+        # imap keeps the input order, so progress is reported in order.
+        for i,summary in enumerate(summaries):
+            results.append(summary)
+            if summary["status"]=="ok":
+                manifest.set(summary["input"], digests[summary["input"]], output=summary["output"])
+            else:
+                manifest.invalidate(summary["input"])
+            status = toGREEN(summary["status"]) if summary["status"]=="ok" else toRED(summary["status"])
+            print(f"[{i+1:>{len(str(len(tasks)))}}/{len(tasks)}] {status} {toBLUE(os.path.basename(summary['input']))} ({summary['seconds']:.2f}[s])")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        # Outputs of deleted inputs are stale.
+        removed = manifest.prune()
+        manifest.save()
+        for output in removed:
+            print(f"Remove the stale output {toBLUE(output)}")
+    wall_time = time.perf_counter() - start
+
+    failures = [r for r in results if r["status"] != "ok"]
+    print(f"\n{len(results)-len(failures)} succeeded, {len(failures)} failed, {len(skipped)} skipped in {wall_time:.2f}[s]")
+    for r in failures:
+        print(f"\n{toRED(r['status'])} {toBLUE(r['input'])}\n{r['error']}")
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump({
+                "wall_time" : wall_time,
+                "jobs"      : args.jobs,
+                "succeeded" : len(results)-len(failures),
+                "failed"    : len(failures),
+                "skipped"   : skipped,
+                "removed"   : removed,
+                "songs"     : results,
+            }, f, indent=2, ensure_ascii=False)
+    return 1 if len(failures)>0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
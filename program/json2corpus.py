@@ -0,0 +1,35 @@
+#coding: utf-8
+import os
+import re
+import sys
+import json
+import argparse
+from guitar.utils.generic_utils import toBLUE, toGREEN
+from guitar.utils.song_utils import Song, Corpus, save_corpus
+
+def load_songs(paths):
+    """ Read chord books (json) one by one, so that only one of them is held as dicts at a time. """
+    for path in paths:
+        fn = os.path.basename(path)
+        titles = re.findall(pattern=r"'(.*)'", string=fn)
+        title = titles[0] if len(titles)>0 else os.path.splitext(fn)[0]
+        with open(path) as f:
+            yield Song.from_dict(json.load(f), title=title)
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i",   "--input",   type=str, required=True, help="Directory of chord books (json)")
+    parser.add_argument("-o",   "--output",  type=str, default="corpus.pgc")
+    args = parser.parse_args(argv)
+
+    paths = [
+        os.path.join(args.input, fn) for fn in sorted(os.listdir(args.input))
+        if os.path.splitext(fn)[1] == ".json"
+    ]
+    num_songs = save_corpus(args.output, load_songs(paths))
+    corpus = Corpus(args.output)
+    print(f"Save {toGREEN(num_songs)} songs ({len(corpus.chord_ids)} chords, {len(corpus.symbols)} symbols) at {toBLUE(args.output)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#coding: utf-8
+import os
+import sys
+import time
+import argparse
+from guitar.utils.generic_utils import toBLUE, toGREEN
+from guitar.utils.index_utils import SongIndex
+
+def main(argv=sys.argv[1:]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i",   "--input",  type=str, help="Directory of chord books (json) to (re-)index.")
+    parser.add_argument("-x",   "--index",  type=str, default="songs.index.json")
+    parser.add_argument("--playable",    type=str, nargs="+", help="Songs which use only these chords.")
+    parser.add_argument("--chords",      type=str, nargs="+", help="Songs which use all of these chords.")
+    parser.add_argument("--progression", type=str, nargs="+", help="Songs which contain this progression (e.g. I V vi IV) in any key.")
+    args = parser.parse_args(argv)
+
+    index = SongIndex(args.index)
+    if args.input is not None:
+        start = time.perf_counter()
+        stats = index.update(args.input)
+        print(f"Update {toBLUE(args.index)} in {time.perf_counter()-start:.2f}[s]: {stats}")
+
+    for name,query,func in [("playable", args.playable, index.playable_with),
+                            ("chords", args.chords, index.with_chords),
+                            ("progression", args.progression, index.with_progression)]:
+        if query is None:
+            continue
+        start = time.perf_counter()
+        paths = func(query)
+        print(f"{len(paths)} songs ({name}: {toGREEN(' '.join(query))}, {(time.perf_counter()-start)*1e3:.2f}[ms])")
+        for path in paths:
+            song = index.songs[index.ids[path]]
+            print(f"  {toBLUE(os.path.basename(path))} key={song['key']} {song['scale']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,12 @@
 import os
 import json
 import argparse
-from kerasy.utils import toBLUE, toGREEN
+from guitar.utils.generic_utils import toBLUE, toGREEN
 
 from guitar import Guitar
-from guitar.ufret import get_ufret_chords
+from guitar.ufret import get_ufret_chords_many
+from guitar.utils import DriverPool
+from guitar.utils import ScrapeCache
 from guitar.utils import get_chord_components
 from guitar.utils import find_key_major_scale
 from guitar.utils import japanize
@@ -15,7 +17,7 @@ print(f"Here is {toBLUE(here)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("-u",   "--url",     type=str, required=True)
+    parser.add_argument("-u",   "--url",     type=str, required=True, nargs="+")
     parser.add_argument("-t",   "--theme",   type=str, default="rainbow")
     parser.add_argument("-s",   "--scale",   type=str, default="major")
     parser.add_argument("-c",   "--capo",    type=str, default="0")
@@ -24,37 +26,56 @@ if __name__ == "__main__":
     parser.add_argument("-fmt", "--format",  type=str, default="pdf")
     parser.add_argument("--font_path",  type=str, default="/font/ipam.ttf")
     parser.add_argument("--family",     type=str, default="IPAPMincho")
+    parser.add_argument("-w",   "--workers",   type=int, default=1)
+    parser.add_argument("--max_pages",  type=int, default=100)
+    parser.add_argument("--cache_dir",  type=str)
+    parser.add_argument("--no-cache",   action="store_true")
+    parser.add_argument("--refresh",    action="store_true")
+    parser.add_argument("--local_capo", action="store_true")
     args = parser.parse_args()
 
-    url   = args.url
+    urls  = args.url
     theme = args.theme
     scale = args.scale
     capo  = args.capo
-    key   = args.key
+    key_  = args.key
     dir   = args.dir
     fmt   = args.format
     font_path = args.font_path
     family    = args.family
+    workers   = max(1, min(args.workers, len(urls)))
+    cache     = None if args.no_cache else ScrapeCache(cache_dir=args.cache_dir)
 
-    title, capo, data = get_ufret_chords(url=url, capo=capo)
-    if key is None:
-        majors, minors = get_chord_components(data, fmt="ufret")
-        key = find_key_major_scale(majors=majors, minors=minors)
-    title = repr(title.replace("/", "|"))
-    print(f"""Create the following chordbooks:
-    * url   : {toBLUE(url)}
-    * theme : {toGREEN(theme)}
-    * scale : {toGREEN(scale)}
-    * capo  : {toGREEN(capo)}
-    * key   : {toGREEN(key)}
-    """)
-    guitar = Guitar(key=key, scale=args.scale, dark_mode=False, theme=args.theme, name=title)
-    filename = os.path.join(dir, guitar.pdf) if dir is not None else None
-    if fmt=="pdf":
-        japanize(font_path=font_path, family=family)
-        guitar.create_chord_book(data=data, nrows=5, filename=filename, verbose=1)
-    else:
-        filename = filename.replace(".pdf", ".json")
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"Save data at {toBLUE(filename)}")
\ No newline at end of file
+    with DriverPool(size=workers, max_pages=args.max_pages) as pool:
+        results = get_ufret_chords_many(urls, capo=capo, workers=workers, pool=pool,
+                                        cache=cache, refresh=args.refresh, local_capo=args.local_capo,
+                                        return_exceptions=True)
+        for url, result in results:
+            if isinstance(result, Exception):
+                print(f"Error occured in {toBLUE(url)}: {result}")
+                continue
+            title, capo_, data = result
+            key = key_
+            if key is None:
+                majors, minors = get_chord_components(data, fmt="ufret")
+                key = find_key_major_scale(majors=majors, minors=minors)
+            title = repr(title.replace("/", "|"))
+            print(f"""Create the following chordbooks:
+            * url   : {toBLUE(url)}
+            * theme : {toGREEN(theme)}
+            * scale : {toGREEN(scale)}
+            * capo  : {toGREEN(capo_)}
+            * key   : {toGREEN(key)}
+            """)
+            guitar = Guitar(key=key, scale=args.scale, dark_mode=False, theme=args.theme, name=title,
+                            font_family=japanize(font_path=font_path, family=family) or "Comic Sans MS")
+            filename = os.path.join(dir, guitar.pdf) if dir is not None else None
+            if fmt=="pdf":
+                guitar.create_chord_book(data=data, nrows=5, filename=filename, verbose=1)
+            else:
+                filename = filename.replace(".pdf", ".json")
+                with open(filename, 'w') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                print(f"Save data at {toBLUE(filename)}")
+    if cache is not None:
+        print(f"Scrape cache: {cache.stats}")
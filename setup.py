@@ -58,6 +58,8 @@ def setup_package():
         entry_points = {
             "console_scripts": [
                 "ufret=guitar.main:export_ufret_chordbooks",
+                "pyguitar-server=guitar.server:main",
+                "ufret-batch=guitar.pipeline:main",
             ],
         },
     )
@@ -0,0 +1,23 @@
+# coding: utf-8
+import os
+import sys
+import tempfile
+
+# Before guitar is imported: keep caches (scrape, themes, renders) out of the home directory.
+os.environ.setdefault("PYGUITAR_CACHE_DIR", tempfile.mkdtemp(prefix="pyguitar-tests-"))
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES_DIR = os.path.join(REPO_DIR, "examples")
+EXAMPLE = os.path.join(EXAMPLES_DIR, "欲望に満ちた青年団  ONE OK ROCK | key-0.json")
+sys.path.insert(0, REPO_DIR)
+
+@pytest.fixture
+def example():
+    import json
+    with open(EXAMPLE) as f:
+        return json.load(f)
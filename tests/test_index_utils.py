@@ -0,0 +1,35 @@
+# coding: utf-8
+import os
+import json
+
+from guitar.utils.index_utils import SongIndex
+
+def write_song(path, chords):
+    with open(path, "w") as f:
+        json.dump({str(i): {"chord": row, "lyric": [""]*len(row)} for i,row in enumerate(chords)}, f)
+
+def test_song_index_update_and_query(tmp_path):
+    songs = tmp_path/"songs"
+    songs.mkdir()
+    pop, minor = str(songs/"pop.json"), str(songs/"minor.json")
+    write_song(pop, [["C", "G", "Am", "F"], ["C", "G", "Am", "F"]])
+    write_song(minor, [["Am", "Dm", "E7", "Am"]])
+    index = SongIndex(str(tmp_path/"songs.index.json"))
+    assert index.update(str(songs)) == {"added": 2, "updated": 0, "removed": 0, "unchanged": 0}
+
+    assert index.playable_with(["C", "G", "Am", "F", "Dm"]) == [pop]
+    assert index.with_chords(["Am"]) == [minor, pop]
+    # In any key, with chord symbols or roman numerals.
+    assert index.with_progression(["I", "V", "vi", "IV"]) == [pop]
+    assert index.with_progression(["D", "A", "Bm", "G"]) == [pop]
+    assert index.with_progression(["G", "C"]) == []
+
+    # The index on disk is the same, and only changed files are indexed again.
+    index = SongIndex(str(tmp_path/"songs.index.json"))
+    assert len(index) == 2
+    write_song(pop, [["G", "D", "Em", "C"]])
+    os.remove(minor)
+    assert index.update(str(songs)) == {"added": 0, "updated": 1, "removed": 1, "unchanged": 0}
+    assert index.playable_with(["G", "D", "Em", "C"]) == [pop]
+    assert index.with_chords(["Am"]) == []
+    assert index.update(str(songs)) == {"added": 0, "updated": 0, "removed": 0, "unchanged": 1}
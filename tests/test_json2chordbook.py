@@ -0,0 +1,57 @@
+# coding: utf-8
+import os
+import json
+import shutil
+import importlib.util
+
+from conftest import REPO_DIR, EXAMPLE
+
+def load_program():
+    spec = importlib.util.spec_from_file_location("json2chordbook", os.path.join(REPO_DIR, "program", "json2chordbook.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def short_example(dirname, rows=2):
+    """ The bundled example (its name has "|", which isn't kept in the name of the pdf) with only a few rows. """
+    with open(EXAMPLE) as f:
+        data = json.load(f)
+    path = os.path.join(dirname, os.path.basename(EXAMPLE))
+    with open(path, "w") as f:
+        json.dump({k: data[k] for k in list(data)[:rows]}, f, ensure_ascii=False)
+    return path
+
+def test_second_run_skips_rendered_songs(tmp_path, capsys):
+    program = load_program()
+    input_dir, output_dir = tmp_path/"songs", tmp_path/"books"
+    input_dir.mkdir()
+    short_example(str(input_dir))
+    argv = ["-i", str(input_dir), "-o", str(output_dir), "-f", "DejaVu Sans"]
+
+    assert program.main(argv) == 0
+    assert "1 succeeded, 0 failed, 0 skipped" in capsys.readouterr().out
+    with open(output_dir/program.MANIFEST) as f:
+        entries = json.load(f)["entries"]
+    outputs = [entry["output"] for entry in entries.values()]
+    assert len(outputs) == 1 and os.path.exists(outputs[0])
+
+    assert program.main(argv) == 0
+    assert "0 succeeded, 0 failed, 1 skipped" in capsys.readouterr().out
+
+    # The same directory spelled differently is the same input.
+    assert program.main(["-i", os.path.join(str(input_dir), "."), "-o", str(output_dir), "-f", "DejaVu Sans"]) == 0
+    assert "1 skipped" in capsys.readouterr().out
+
+def test_deleted_input_removes_its_book(tmp_path, capsys):
+    program = load_program()
+    input_dir, output_dir = tmp_path/"songs", tmp_path/"books"
+    input_dir.mkdir()
+    path = short_example(str(input_dir))
+    argv = ["-i", str(input_dir), "-o", str(output_dir), "-f", "DejaVu Sans"]
+    program.main(argv)
+    books = [fn for fn in os.listdir(output_dir) if fn.endswith(".pdf")]
+    assert len(books) == 1
+
+    os.remove(path)
+    program.main(argv)
+    assert [fn for fn in os.listdir(output_dir) if fn.endswith(".pdf")] == []
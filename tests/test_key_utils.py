@@ -0,0 +1,53 @@
+# coding: utf-8
+import random
+
+import pytest
+
+from guitar.env import NOTES, WHOLE_NOTES, LEN_OCTAVES, SCALE2INTERVALS
+from guitar.utils.guitar_utils import get_notes, get_chord_components, find_key_major_scale
+from guitar.utils.key_utils import best_key, detect_keys, detect_keys_batch
+
+def find_key_major_scale_loop(majors, minors):
+    """ `find_key_major_scale` as it was written before `detect_keys`: one key at a time. """
+    is_majors = [1,0,0,1,1,0,0]
+    num_majors, num_minors = len(majors), len(minors)
+    best_score, best_key = -1, None
+    for key in WHOLE_NOTES[:LEN_OCTAVES]:
+        maj = min = 0
+        for is_maj,note in zip(is_majors, get_notes(key, SCALE2INTERVALS.get("major"))):
+            if is_maj and note in majors:
+                maj += majors[note]
+            elif not is_maj and note in minors:
+                min += minors[note]
+        score = (maj/num_majors if num_majors else 0) + (min/num_minors if num_minors else 0)
+        if score > best_score:
+            best_score, best_key = score, key
+    return best_key
+
+def random_components(seed):
+    rng = random.Random(seed)
+    majors = {note: rng.randint(1, 9) for note in rng.sample(NOTES, rng.randint(0, 6))}
+    minors = {note: rng.randint(1, 9) for note in rng.sample(NOTES, rng.randint(1 if len(majors)==0 else 0, 6))}
+    return majors, minors
+
+@pytest.mark.parametrize("seed", range(200))
+def test_detect_keys_agrees_with_find_key_major_scale(seed):
+    majors, minors = random_components(seed)
+    expected = find_key_major_scale_loop(majors, minors)
+    assert find_key_major_scale(majors=majors, minors=minors) == expected
+    assert detect_keys(majors, minors, scales=["major"], top=1, tonic_weight=0)[0].key == expected
+
+def test_detect_keys_of_the_example(example):
+    majors, minors = get_chord_components(example)
+    assert find_key_major_scale(majors=majors, minors=minors) == find_key_major_scale_loop(majors, minors) == "B"
+    candidates = detect_keys(majors, minors, top=None)
+    assert len(candidates) == LEN_OCTAVES*len(SCALE2INTERVALS)
+    assert detect_keys_batch([(majors, minors), ({}, {})], top=3) == [candidates[:3], []]
+
+def test_best_key(example):
+    assert best_key(example).key == "B"
+    assert best_key(example, key="G#", scale="minor").scale == "minor"
+    with pytest.raises(ValueError):
+        best_key(example, key="H")
+    with pytest.raises(ValueError):
+        best_key({"0": {"chord": [""], "lyric": [""]}})
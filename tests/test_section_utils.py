@@ -0,0 +1,42 @@
+# coding: utf-8
+import random
+
+import pytest
+
+from guitar.utils.section_utils import RepeatRow, fold_repeats
+
+def expand(folded):
+    """ Chords of the rows before `fold_repeats`, from the rows it drew. """
+    drawn, chords = [], []
+    for row in folded:
+        drawn.append(row)
+        if isinstance(row, RepeatRow):
+            first, last = row.source
+            assert not any(isinstance(r, RepeatRow) for r in drawn[first:last+1])
+            chords.extend([r[0] for r in drawn[first:last+1]] * row.times)
+        else:
+            chords.append(row[0])
+    return chords
+
+def random_song(seed, num_rows=60):
+    rng = random.Random(seed)
+    blocks = [[([rng.choice(["C", "G", "Am", "F", "Em"]) for _ in range(2)], ["la"]) for _ in range(rng.randint(1, 5))]
+              for _ in range(4)]
+    rows = []
+    while len(rows) < num_rows:
+        rows.extend(rng.choice(blocks))
+    return rows[:num_rows]
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("min_rows,max_rows", [(2, 16), (1, 4), (3, 8)])
+def test_fold_repeats_expands_to_the_input(seed, min_rows, max_rows):
+    rows = random_song(seed)
+    folded = list(fold_repeats(rows, nrows=5, min_rows=min_rows, max_rows=max_rows))
+    assert expand(folded) == [chords for chords,_ in rows]
+    assert any(isinstance(row, RepeatRow) for row in folded)
+    assert len(folded) < len(rows)
+
+def test_fold_repeats_matches_lyrics():
+    rows = [(["C", "G"], ["a"]), (["Am", "F"], ["b"]), (["C", "G"], ["c"]), (["Am", "F"], ["d"])]
+    assert len(list(fold_repeats(rows, nrows=5))) == 3
+    assert list(fold_repeats(rows, nrows=5, match_lyrics=True)) == rows
@@ -0,0 +1,70 @@
+# coding: utf-8
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from guitar.server import BadRequest, RenderHandler, RenderService, normalize_request, render_request
+
+SONG = {"0": {"chord": ["C", "G"], "lyric": ["la", "la"]}}
+
+@pytest.mark.parametrize("body", [
+    [],
+    {"data": {}},
+    {"data": {"0": {"chord": "C", "lyric": []}}},
+    {"data": {"0": {"chord": [1], "lyric": [""]}}},
+    {"data": {"0": {"chord": ["C"], "lyric": [None]}}},
+    {"data": SONG, "options": []},
+    {"data": SONG, "options": {"colour": "red"}},
+    {"data": SONG, "options": {"key": "H"}},
+    {"data": SONG, "options": {"scale": "ionian"}},
+    {"data": SONG, "format": "svg"},
+    {"data": SONG, "format": "png", "page": 0},
+    {"data": SONG, "format": "png", "dpi": "high"},
+])
+def test_normalize_request_rejects(body):
+    with pytest.raises(BadRequest):
+        normalize_request(body)
+
+def test_normalize_request_fills_options():
+    request = normalize_request({"data": {0: SONG["0"]}, "options": {"theme": "magma"}})
+    assert request == normalize_request({"data": SONG, "options": {"theme": "magma", "scale": "major"}})
+    assert request["guitar"]["theme"] == "magma" and request["page"] is None
+
+def test_render_request_errors_are_plain_text():
+    with pytest.raises(BadRequest) as e:
+        render_request(normalize_request({"data": SONG, "options": {"key": "C", "theme": "no-such-theme"}}))
+    assert "theme" in str(e.value) and "\x1b" not in str(e.value)
+
+@pytest.fixture
+def server():
+    # Bad requests never reach the workers, so they aren't started.
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RenderHandler)
+    server.service = RenderService(workers=1, warm=False)
+    server.render_timeout = 10
+    server.verbose = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+def post(server, body):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    connection.request("POST", "/render", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    "あ".encode("shift_jis"),
+    json.dumps({"data": {"0": {"chord": [None], "lyric": [""]}}}).encode(),
+    json.dumps({"data": SONG, "options": {"key": "H"}}).encode(),
+])
+def test_bad_requests_are_400(server, body):
+    status, content = post(server, body)
+    assert status == 400 and isinstance(content["error"], str)
+    assert server.service.stats["requests"] == 0
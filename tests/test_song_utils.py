@@ -0,0 +1,32 @@
+# coding: utf-8
+import pytest
+
+from guitar.utils.song_utils import Song, Corpus, save_corpus
+
+def test_song_round_trip(example):
+    song = Song.from_dict(example, title="example")
+    assert len(song) == len(example)
+    assert song.to_dict() == example
+    assert list(song.rows())[-1] == song.row(-1)
+
+def test_corpus_round_trip(tmp_path, example):
+    # Scraped chord books have int keys, and json ones str keys.
+    scraped = {i: row for i,row in enumerate(example.values())}
+    songs = [Song.from_dict(example, title="json"), scraped, {"0": {"chord": ["C", "Am"], "lyric": ["ラ", ""]}}]
+    path = str(tmp_path/"songs.pgc")
+    assert save_corpus(path, songs) == 3
+
+    corpus = Corpus(path)
+    assert len(corpus) == 3
+    assert [song.title for song in corpus] == ["json", "", ""]
+    assert corpus[0].to_dict() == example
+    assert corpus[1].to_dict() == scraped
+    assert corpus[-1].to_dict() == {"0": {"chord": ["C", "Am"], "lyric": ["ラ", ""]}}
+    with pytest.raises(IndexError):
+        corpus[3]
+
+def test_corpus_rejects_other_files(tmp_path):
+    path = tmp_path/"songs.json"
+    path.write_bytes(b"{}" * 16)
+    with pytest.raises(ValueError):
+        Corpus(str(path))